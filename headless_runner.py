@@ -0,0 +1,405 @@
+"""
+Headless simulation runner for the disaster response scenarios (Labs 2-4).
+
+Runs a lab scenario on a virtual clock with the in-process transport from
+lab2/local_runtime.py: no XMPP server is needed, timers fire as soon as the
+agents are idle, and the run stops after a number of simulated events or
+simulated hours. One JSON summary line is written per scenario.
+
+Usage:
+    python headless_runner.py lab4-multi-agent --hours 24
+    python headless_runner.py lab3-fsm --events 500 --seed 7
+    python headless_runner.py all --hours 2 --output summaries.jsonl
+
+Scenarios run in separate processes when several are requested (`all`),
+so each one starts from fresh metrics and a fresh clock. Agent output is
+discarded unless --verbose is given; log files and incident databases are
+written under --workdir (a temporary directory by default).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+for lab in ("lab2", "lab3", "lab4"):
+    sys.path.insert(0, os.path.join(ROOT, lab))
+
+import agent_runtime
+import local_runtime
+
+SENSOR_JID = "kwasisensoragent1@xmpp.jp"
+RESCUE_JID = "kwasirescueagent1@xmpp.jp"
+BROKER_JID = "kwasialertbroker1@xmpp.jp"
+LOGISTICS_JID = "kwasilogisticsagent1@xmpp.jp"
+BASIC_JID = "basicagent1@xmpp.jp"
+
+# Every run starts its virtual clock at the same instant (2025-01-01 UTC),
+# so timestamps, and the float rounding done on them, repeat run to run
+START_NS = 1_735_689_600 * local_runtime.NS_PER_SECOND
+MONOTONIC_START_NS = 1_000 * local_runtime.NS_PER_SECOND
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SCENARIOS
+# ═══════════════════════════════════════════════════════════════════
+# Each builder imports its lab module (only after the virtual clock is
+# installed and the local transport selected) and returns the agents in
+# start order.
+# The second element is the counter that counts "events" for --events.
+
+def build_lab2_perception():
+    from sensor_agent import SensorAgent
+    return [SensorAgent(BASIC_JID, "password123")], "sensor_disasters_detected_total"
+
+
+def build_lab3_fsm():
+    from rescue_agent import RescueAgent
+    return [RescueAgent(BASIC_JID, "password123")], "rescue_events_received_total"
+
+
+def build_lab3_units():
+    from rescue_agent import RescueUnitsAgent
+    return [RescueUnitsAgent(BASIC_JID, "password123")], "rescue_events_received_total"
+
+
+def build_lab4_communication():
+    from communication_agents import SensorAgent, RescueAgent
+    return ([RescueAgent(RESCUE_JID, "rescue123"), SensorAgent(SENSOR_JID, "sensor123")],
+            "sensor_disasters_detected_total")
+
+
+def build_lab4_multi_agent():
+    from multi_agent_communication import SensorAgent, RescueAgent
+    return ([RescueAgent(RESCUE_JID, "rescue123"), SensorAgent(SENSOR_JID, "sensor123")],
+            "sensor_disasters_detected_total")
+
+
+def build_lab4_demo():
+    from communication_demo import CommunicationDemoAgent
+    return [CommunicationDemoAgent(BASIC_JID, "password123")], "sensor_disasters_detected_total"
+
+
+def build_lab4_pubsub():
+    from pubsub_demo import PublishingSensorAgent, LogisticsAgent
+    from multi_agent_communication import RescueAgent
+    from alert_bus import AlertBrokerAgent, SubscribeBehaviour, DROP
+
+    class SubscribedRescueAgent(RescueAgent):
+        async def setup(self):
+            await super().setup()
+            self.add_behaviour(SubscribeBehaviour(BROKER_JID))
+
+    class SubscribedLogisticsAgent(LogisticsAgent):
+        async def setup(self):
+            await super().setup()
+            self.add_behaviour(SubscribeBehaviour(BROKER_JID, severities=["High", "Critical"],
+                                                  maxsize=10, policy=DROP))
+
+    return ([AlertBrokerAgent(BROKER_JID, "broker123"),
+             SubscribedRescueAgent(RESCUE_JID, "rescue123"),
+             SubscribedLogisticsAgent(LOGISTICS_JID, "logistics123"),
+             PublishingSensorAgent(SENSOR_JID, "sensor123")],
+            "sensor_disasters_detected_total")
+
+
+def build_lab4_coordinator():
+    from coordinator_demo import build_agents
+    return build_agents(), "sensor_disasters_detected_total"
+
+
+def build_lab4_load():
+    from load_agent import LoadSensorAgent
+    from multi_agent_communication import RescueAgent
+    return ([RescueAgent(RESCUE_JID, "rescue123"), LoadSensorAgent(SENSOR_JID, "sensor123", RESCUE_JID)],
+            "sensor_disasters_detected_total")
+
+
+SCENARIOS = {
+    "lab2-perception": build_lab2_perception,
+    "lab3-fsm": build_lab3_fsm,
+    "lab3-units": build_lab3_units,
+    "lab4-communication": build_lab4_communication,
+    "lab4-multi-agent": build_lab4_multi_agent,
+    "lab4-demo": build_lab4_demo,
+    "lab4-pubsub": build_lab4_pubsub,
+    "lab4-coordinator": build_lab4_coordinator,
+    "lab4-load": build_lab4_load,
+}
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SUMMARY
+# ═══════════════════════════════════════════════════════════════════
+
+def counter_total(name):
+    from agent_metrics import REGISTRY
+    family = REGISTRY.get(name)
+    if family is None:
+        return 0
+    return sum(child.value for child in family.children().values())
+
+
+def counter_by_label(name, label):
+    from agent_metrics import REGISTRY
+    family = REGISTRY.get(name)
+    totals = {}
+    if family is None:
+        return totals
+    index = family.labelnames.index(label)
+    for values, child in family.children().items():
+        totals[values[index]] = totals.get(values[index], 0) + child.value
+    return totals
+
+
+def histogram_mean(name):
+    from agent_metrics import REGISTRY
+    family = REGISTRY.get(name)
+    children = family.children().values() if family is not None else ()
+    count = sum(child.count for child in children)
+    total = sum(child.sum for child in children)
+    return count, (total / count if count else None)
+
+
+def summarize(name, args, agents, transport, clock, wall, stopped_by):
+    latency_count, latency_mean = histogram_mean("event_end_to_end_latency_seconds")
+    summary = {
+        "scenario": name,
+        "seed": args.seed,
+        "stopped_by": stopped_by,
+        "simulated_seconds": round(clock.elapsed, 3),
+        "wall_seconds": round(wall, 3),
+        "speedup": round(clock.elapsed / wall, 1) if wall > 0 else None,
+        "perception_cycles": counter_total("sensor_perception_cycles_total"),
+        "disasters_detected": counter_total("sensor_disasters_detected_total"),
+        "detected_by_severity": counter_by_label("sensor_disasters_detected_total", "severity"),
+        "rescue_events": counter_total("rescue_events_received_total"),
+        "rescue_responses": counter_total("rescue_responses_total"),
+        "fusion": {
+            "reports": counter_total("fusion_reports_total"),
+            "incidents": counter_by_label("fusion_incidents_total", "reason"),
+        },
+        "coordinator": {
+            "reports": counter_total("coordinator_reports_total"),
+            "forwarded": counter_total("coordinator_forwarded_total"),
+            "status_requests": counter_by_label("coordinator_status_requests_total", "outcome"),
+        },
+        "messages_sent": counter_by_label("agent_messages_sent_total", "performative"),
+        "messages_received": counter_by_label("agent_messages_received_total", "performative"),
+        "fsm_state_entries": counter_by_label("rescue_fsm_state_entries_total", "state"),
+        "mailbox": {
+            "dropped": counter_total("agent_mailbox_dropped_total"),
+            "coalesced": counter_total("agent_mailbox_coalesced_total"),
+            "rejected": counter_total("agent_mailbox_rejected_total"),
+        },
+        "event_latency_ms": {
+            "count": latency_count,
+            "mean": round(latency_mean * 1000, 3) if latency_mean is not None else None,
+        },
+        "delivery": {
+            "sent": counter_by_label("reliable_messages_sent_total", "attempt"),
+            "acks": counter_by_label("reliable_acks_total", "direction"),
+            "duplicates": counter_total("reliable_duplicates_total"),
+            "given_up": counter_by_label("reliable_given_up_total", "reason"),
+        },
+        "transport": {"delivered": transport.delivered, "undeliverable": transport.undeliverable,
+                      "lost": transport.lost},
+        "errors": transport.errors,
+    }
+    for agent in agents:
+        analytics = getattr(agent, "analytics", None)
+        if analytics is not None:
+            window = max(analytics.windows)
+            summary["analytics"] = {
+                "agent": str(agent.jid),
+                "events_seen": analytics.events_seen,
+                "window_seconds": window,
+                "by_severity": {str(k): v for k, v in analytics.breakdown(window, "severity").items()},
+                "casualties_p50": analytics.casualty_quantile(window, 0.5),
+                "casualties_p95": analytics.casualty_quantile(window, 0.95),
+            }
+    return summary
+
+
+# ═══════════════════════════════════════════════════════════════════
+# RUNNING ONE SCENARIO
+# ═══════════════════════════════════════════════════════════════════
+
+async def simulate(name, args, clock, transport, detector=None):
+    agents, event_metric = SCENARIOS[name]()
+    limit = args.hours * 3600 if args.hours is not None else None
+    start = clock.elapsed
+    for agent in agents:
+        await agent.start(auto_register=True)
+
+    stopped_by = None
+    next_snapshot = start + args.soak_warmup
+    while stopped_by is None:
+        await asyncio.sleep(args.check_interval)
+        if detector is not None and clock.elapsed >= next_snapshot:
+            detector.snapshot(counter_total(event_metric), round(clock.elapsed - start, 3))
+            next_snapshot += args.snapshot_every
+        if args.events is not None and counter_total(event_metric) >= args.events:
+            stopped_by = "events"
+        elif limit is not None and clock.elapsed - start >= limit:
+            stopped_by = "hours"
+        elif transport.errors and args.fail_fast:
+            stopped_by = "error"
+
+    for agent in reversed(agents):
+        await agent.stop()
+    # Let behaviours see the kill and run on_end()
+    await asyncio.sleep(0)
+    return agents, stopped_by
+
+
+def run_scenario(name, args):
+    """Run one scenario in this process and return its summary"""
+    clock = local_runtime.VirtualClock(START_NS, MONOTONIC_START_NS)
+    clock.install()
+    transport = local_runtime.set_transport(local_runtime.LocalTransport(
+        args.latency_ms / 1000, args.loss, args.seed))
+
+    random.seed(args.seed)
+    from conditions_service import shared_conditions
+    from disaster_environment import DisasterEnvironment, LOCATIONS
+    environment = DisasterEnvironment(shared_conditions(LOCATIONS, seed=args.seed))
+    agent_runtime.configure("local", environment=environment)
+
+    workdir = os.path.join(args.workdir, name)
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    output = sys.stdout if args.verbose else open(os.devnull, "w")
+    detector = None
+    if args.soak:
+        from leak_detector import LeakDetector
+        detector = LeakDetector(args.leak_threshold)
+        detector.start()
+    wall_start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            agents, stopped_by = local_runtime.run(
+                simulate(name, args, clock, transport, detector), clock)
+            for agent in agents:
+                store = getattr(agent, "store", None)
+                if store is not None:
+                    store.close()
+    finally:
+        wall = time.perf_counter() - wall_start
+        os.chdir(cwd)
+        if output is not sys.stdout:
+            output.close()
+        clock.uninstall()
+        if detector is not None:
+            detector.stop()
+    summary = summarize(name, args, agents, transport, clock, wall, stopped_by)
+    if detector is not None:
+        summary["memory"] = detector.report()
+    return summary
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("scenario", nargs="+", choices=sorted(SCENARIOS) + ["all"])
+    parser.add_argument("--hours", type=float, help="simulated hours to run (default 1 without --events)")
+    parser.add_argument("--events", type=int, help="stop after this many simulated events")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=5.0,
+                        help="simulated delivery latency of the local transport")
+    parser.add_argument("--loss", type=float, default=0.0,
+                        help="fraction of messages the local transport loses")
+    parser.add_argument("--check-interval", type=float, default=1.0,
+                        help="simulated seconds between stop-condition checks")
+    parser.add_argument("--workdir", help="directory for logs and databases (default: temporary)")
+    parser.add_argument("--output", help="append JSON summaries to this file instead of stdout")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="scenarios to run in parallel")
+    parser.add_argument("--fail-fast", action="store_true", help="stop when a behaviour raises")
+    parser.add_argument("--soak", action="store_true",
+                        help="trace memory and fail if it grows with the number of events")
+    parser.add_argument("--soak-warmup", type=float, default=3600.0,
+                        help="simulated seconds before the baseline memory snapshot")
+    parser.add_argument("--snapshot-every", type=float, default=1800.0,
+                        help="simulated seconds between memory snapshots in a soak run")
+    parser.add_argument("--leak-threshold", type=float,
+                        help="retained bytes per million events that fail a soak run")
+    parser.add_argument("--verbose", action="store_true", help="show the agents' console output")
+    args = parser.parse_args(argv)
+    if args.hours is None and args.events is None:
+        args.hours = 1.0
+    if "all" in args.scenario:
+        args.scenario = list(SCENARIOS)
+    return args
+
+
+def child_command(name, args):
+    command = [sys.executable, os.path.abspath(__file__), name, "--seed", str(args.seed),
+               "--latency-ms", str(args.latency_ms), "--loss", str(args.loss),
+               "--check-interval", str(args.check_interval),
+               "--workdir", args.workdir]
+    if args.hours is not None:
+        command += ["--hours", str(args.hours)]
+    if args.events is not None:
+        command += ["--events", str(args.events)]
+    if args.fail_fast:
+        command.append("--fail-fast")
+    if args.soak:
+        command += ["--soak", "--soak-warmup", str(args.soak_warmup),
+                    "--snapshot-every", str(args.snapshot_every)]
+        if args.leak_threshold is not None:
+            command += ["--leak-threshold", str(args.leak_threshold)]
+    return command
+
+
+def run_child(name, args):
+    result = subprocess.run(child_command(name, args), capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    # A soak run that finds a leak still prints its summary before exiting with 1
+    if result.returncode != 0 and not lines:
+        return {"scenario": name, "errors": [result.stderr.strip()[-2000:]]}
+    return json.loads(lines[-1])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    temporary = args.workdir is None
+    if temporary:
+        args.workdir = tempfile.mkdtemp(prefix="headless-")
+    args.workdir = os.path.abspath(args.workdir)
+    try:
+        if len(args.scenario) == 1:
+            summaries = [run_scenario(args.scenario[0], args)]
+        else:
+            with ThreadPoolExecutor(max(1, args.jobs)) as pool:
+                summaries = list(pool.map(lambda name: run_child(name, args), args.scenario))
+    finally:
+        if temporary:
+            shutil.rmtree(args.workdir, ignore_errors=True)
+
+    lines = "".join(json.dumps(summary) + "\n" for summary in summaries)
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(lines)
+    else:
+        sys.stdout.write(lines)
+    failed = any(summary.get("errors") or summary.get("memory", {}).get("leak")
+                 for summary in summaries)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Adaptive perception rate for sensor behaviours.
+
+Sensors used to poll at a fixed PeriodicBehaviour period whether the region
+was quiet or on fire. AdaptiveSampler adjusts the behaviour's period after
+every cycle instead:
+
+  - high wind or poor visibility in the conditions, or a Critical event
+    within the last `alert_hold` seconds, drops the period to `min_period`
+    straight away
+  - every all-clear cycle doubles the period, up to `max_period`
+
+The simulated sensors detect a disaster with a fixed chance per cycle;
+detection_chance() rescales that chance to the current period so sampling
+faster does not make the simulated world produce more disasters.
+
+Receivers that are falling behind answer with REFUSE/FAILURE; throttle()
+then holds the period at a backed-off floor for the requested time, in
+either mode.
+
+The effective rate is published as the sensor_sampling_rate_hz gauge. Set
+AGENT_SAMPLING=fixed to keep the configured period.
+"""
+
+import os
+import time
+
+from agent_metrics import REGISTRY
+from disaster_models import Severity, Visibility
+
+SAMPLING_MODE = os.environ.get("AGENT_SAMPLING", "adaptive")
+
+SAMPLING_RATE = REGISTRY.gauge(
+    "sensor_sampling_rate_hz", "Current perception cycles per second of a sensor", ("agent",))
+
+
+class AdaptiveSampler:
+    """Raises a PeriodicBehaviour's rate under risk and backs off when clear"""
+
+    def __init__(self, base_period, min_period=None, max_period=None, backoff=2.0,
+                 wind_threshold=75, alert_severity=Severity.CRITICAL, alert_hold=None,
+                 enabled=None, clock=time.monotonic):
+        self.base_period = base_period
+        self.min_period = min_period if min_period is not None else base_period / 2
+        self.max_period = max_period if max_period is not None else base_period * 8
+        self.backoff = backoff
+        self.wind_threshold = wind_threshold
+        self.alert_severity = alert_severity
+        self.alert_hold = alert_hold if alert_hold is not None else base_period * 3
+        self.enabled = SAMPLING_MODE != "fixed" if enabled is None else enabled
+        self.clock = clock
+        self.period = base_period
+        self.reason = None
+        self._last_alert = None
+        self._throttle_period = None
+        self._throttled_until = None
+
+    @property
+    def rate(self):
+        return 1 / self.period if self.period else 0.0
+
+    def detection_chance(self, chance_per_base_period):
+        """Chance of a detection this cycle, for a chance quoted per base period"""
+        return 1 - (1 - chance_per_base_period) ** (self.period / self.base_period)
+
+    def risk(self, conditions=(), event=None):
+        """Why the region is at risk right now, or None when all is clear"""
+        now = self.clock()
+        if event is not None and event.severity.rank >= self.alert_severity.rank:
+            self._last_alert = now
+        if self._last_alert is not None and now - self._last_alert < self.alert_hold:
+            return f"recent {self.alert_severity} alert"
+        for zone in conditions:
+            if zone.wind_speed >= self.wind_threshold:
+                return f"high wind ({zone.wind_speed} km/h)"
+            if zone.visibility is Visibility.POOR:
+                return "poor visibility"
+        return None
+
+    def throttle(self, retry_after=None):
+        """Slow down after a receiver signalled back-pressure; returns the new floor"""
+        floor = max(self.period, self.base_period) * self.backoff
+        if self._throttle_period is not None:
+            floor = max(floor, self._throttle_period * self.backoff)
+        self._throttle_period = min(floor, self.max_period)
+        hold = max(retry_after or 0, self._throttle_period)
+        self._throttled_until = self.clock() + hold
+        return self._throttle_period
+
+    def update(self, conditions=(), event=None):
+        """Work out the next period from this cycle's conditions and event"""
+        if self.enabled:
+            self.reason = self.risk(conditions, event)
+            if self.reason is not None:
+                period = self.min_period
+            else:
+                period = min(self.period * self.backoff, self.max_period)
+        else:
+            period, self.reason = self.base_period, None
+        if self._throttled_until is not None:
+            if self.clock() < self._throttled_until:
+                period = max(period, self._throttle_period)
+                self.reason = "receiver back-pressure"
+            else:
+                self._throttle_period = self._throttled_until = None
+        self.period = period
+        return period
+
+    def adjust(self, behaviour, conditions=(), event=None):
+        """Update the period and apply it to the behaviour's next activation"""
+        previous = self.period
+        period = self.update(conditions, event)
+        if period != previous:
+            behaviour.period = period
+            print(f"[SAMPLING] Period {previous:g}s -> {period:g}s "
+                  f"({self.reason or 'all clear'})")
+        SAMPLING_RATE.labels(str(behaviour.agent.jid)).set(self.rate)
+        return period
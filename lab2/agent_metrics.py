@@ -0,0 +1,373 @@
+"""
+Shared metrics registry for the disaster response agents (Labs 2-4).
+
+Counters, gauges and histograms live in one process-wide registry and are
+exposed in the Prometheus text exposition format by a small HTTP endpoint
+served from the agent's own asyncio event loop:
+
+    await start_metrics_server()          # http://127.0.0.1:9100/metrics
+
+Metrics are created with get-or-create semantics, so every agent module can
+ask the registry for the same family and share it.
+"""
+
+import asyncio
+import math
+import os
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_HOST = os.environ.get("AGENT_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("AGENT_METRICS_PORT", "9100"))
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+# ═══════════════════════════════════════════════════════════════════
+# METRIC VALUES (one per label combination)
+# ═══════════════════════════════════════════════════════════════════
+
+class CounterValue:
+    """Monotonically increasing value"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        self.value += amount
+
+    def samples(self, name):
+        yield name, (), self.value
+
+
+class GaugeValue:
+    """Value that can go up and down, or be read from a callback"""
+
+    __slots__ = ("value", "_function")
+
+    def __init__(self):
+        self.value = 0
+        self._function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set_function(self, function):
+        """Evaluate `function()` at scrape time instead of a stored value"""
+        self._function = function
+
+    def get(self):
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception:
+                return math.nan
+        return self.value
+
+    def samples(self, name):
+        yield name, (), self.get()
+
+
+class HistogramValue:
+    """Bucketed distribution of observations"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self):
+        """Context manager observing the elapsed wall time of a block"""
+        return _Timer(self)
+
+    def samples(self, name):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{name}_bucket", (("le", _format_value(float(bound))),), cumulative
+        yield f"{name}_bucket", (("le", "+Inf"),), self.count
+        yield f"{name}_sum", (), self.sum
+        yield f"{name}_count", (), self.count
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+# ═══════════════════════════════════════════════════════════════════
+# METRIC FAMILIES
+# ═══════════════════════════════════════════════════════════════════
+
+class MetricFamily:
+    """A named metric with an optional set of label names"""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **labels):
+        """Return the value for one label combination, creating it if needed"""
+        if labels:
+            values = tuple(str(labels[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_value()
+        return child
+
+    def children(self):
+        """{label values: value object} for every label combination seen so far"""
+        return dict(self._children)
+
+    def collect(self):
+        """Yield (sample_name, label_text, value) tuples"""
+        for values, child in list(self._children.items()):
+            for name, extra, value in child.samples(self.name):
+                yield name, _label_text(self.labelnames, values, extra), value
+
+    def __getattr__(self, attr):
+        # Unlabelled families forward inc()/set()/observe()... to their only child
+        if attr.startswith("_") or self.labelnames:
+            raise AttributeError(attr)
+        return getattr(self.labels(), attr)
+
+
+class Counter(MetricFamily):
+    kind = "counter"
+
+    def _new_value(self):
+        return CounterValue()
+
+
+class Gauge(MetricFamily):
+    kind = "gauge"
+
+    def _new_value(self):
+        return GaugeValue()
+
+
+class Histogram(MetricFamily):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def _new_value(self):
+        return HistogramValue(self.buckets)
+
+
+class MetricsRegistry:
+    """Process-wide collection of metric families"""
+
+    def __init__(self):
+        self._families = {}
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = cls(name, documentation, labelnames, **kwargs)
+        elif not isinstance(family, cls) or family.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} already registered with a different type or labels")
+        return family
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._families.get(name)
+
+    def render(self):
+        """Render every family in the Prometheus text exposition format"""
+        lines = []
+        for family in self._families.values():
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, labels, value in family.collect():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# STANDARD AGENT METRICS
+# ═══════════════════════════════════════════════════════════════════
+
+PERCEPTION_CYCLES = REGISTRY.counter(
+    "sensor_perception_cycles_total", "Perception/detection cycles run by a sensor", ("agent",))
+DISASTERS_DETECTED = REGISTRY.counter(
+    "sensor_disasters_detected_total", "Disaster events detected", ("agent", "type", "severity"))
+RESCUE_EVENTS = REGISTRY.counter(
+    "rescue_events_received_total", "Disaster alerts received by a rescue agent", ("agent",))
+RESCUE_RESPONSES = REGISTRY.counter(
+    "rescue_responses_total", "Rescue operations triggered or completed", ("agent",))
+FSM_TRANSITIONS = REGISTRY.counter(
+    "rescue_fsm_state_entries_total", "Times a rescue FSM entered a state", ("agent", "state"))
+MESSAGES_SENT = REGISTRY.counter(
+    "agent_messages_sent_total", "FIPA-ACL messages sent", ("agent", "performative"))
+MESSAGES_RECEIVED = REGISTRY.counter(
+    "agent_messages_received_total", "FIPA-ACL messages received", ("agent", "performative"))
+HANDLER_LATENCY = REGISTRY.histogram(
+    "agent_handler_latency_seconds", "Time spent handling one message or cycle", ("agent", "handler"))
+EVENT_LATENCY = REGISTRY.histogram(
+    "event_end_to_end_latency_seconds", "Sensor detection to rescue receipt latency", ("agent",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+MAILBOX_DEPTH = REGISTRY.gauge(
+    "agent_mailbox_depth", "Messages waiting in a behaviour mailbox", ("agent", "behaviour"))
+MAILBOX_DROPPED = REGISTRY.counter(
+    "agent_mailbox_dropped_total", "Messages evicted from a full bounded mailbox", ("agent", "behaviour"))
+MAILBOX_COALESCED = REGISTRY.counter(
+    "agent_mailbox_coalesced_total", "Queued messages replaced by a newer duplicate", ("agent", "behaviour"))
+MAILBOX_REJECTED = REGISTRY.counter(
+    "agent_mailbox_rejected_total", "Messages refused because a bounded mailbox was full",
+    ("agent", "behaviour"))
+
+
+def record_event_latency(agent, event):
+    """Observe and return the ms since the sensor stamped `event.detected_ns`"""
+    if event.detected_ns is None:
+        return None
+    latency = (time.time_ns() - event.detected_ns) / 1_000_000
+    EVENT_LATENCY.labels(str(agent.jid)).observe(latency / 1000)
+    return latency
+
+
+def track_mailbox(behaviour, name):
+    """Expose a SPADE behaviour's mailbox size as a gauge read at scrape time"""
+    MAILBOX_DEPTH.labels(str(behaviour.agent.jid), name).set_function(behaviour.mailbox_size)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# HTTP EXPOSITION ENDPOINT
+# ═══════════════════════════════════════════════════════════════════
+
+_servers = {}
+
+
+async def _handle_scrape(reader, writer, registry):
+    try:
+        request_line = await reader.readline()
+        # Drain the request headers
+        while True:
+            line = await reader.readline()
+            if not line or line in (b"\r\n", b"\n"):
+                break
+        parts = request_line.decode("latin-1").split()
+        path = parts[1].split("?", 1)[0] if len(parts) > 1 else ""
+
+        if path in ("/metrics", "/"):
+            status, body = "200 OK", registry.render().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            status, body = "404 Not Found", b"Not Found\n"
+            content_type = "text/plain; charset=utf-8"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST, registry=REGISTRY):
+    """Serve /metrics from the running event loop (idempotent per host/port)
+
+    If the port is taken (another lab running, or a socket from a previous
+    run still lingering) the endpoint falls back to a free port rather than
+    failing the agents it reports on.
+    """
+    server = _servers.get((host, port))
+    if server is None:
+        handler = lambda r, w: _handle_scrape(r, w, registry)
+        try:
+            server = await asyncio.start_server(handler, host, port)
+        except OSError as e:
+            server = await asyncio.start_server(handler, host, 0)
+            print(f"⚠️  Metrics port {port} unavailable ({e.strerror}); using a free port instead")
+        _servers[(host, port)] = server
+        bound = server.sockets[0].getsockname()[1]
+        print(f"Metrics endpoint: http://{host}:{bound}/metrics")
+    return server
+
+
+async def stop_metrics_servers():
+    """Close every metrics endpoint started in this process"""
+    for server in _servers.values():
+        server.close()
+        await server.wait_closed()
+    _servers.clear()
@@ -0,0 +1,96 @@
+"""
+Agent framework selection for the disaster response agents (Labs 2-4).
+
+Agent modules import the SPADE classes from here instead of from spade:
+
+    from agent_runtime import Agent, CyclicBehaviour, PeriodicBehaviour, Message
+
+AGENT_TRANSPORT (or configure()) chooses the implementation the first time
+one of these names is used:
+
+    xmpp   SPADE over XMPP (default); spade and aioxmpp are imported only then
+    local  local_runtime.py: in-process transport, no XMPP packages needed
+    mux    local_runtime.py agents sharing one client session, addressed by
+           resource; see session_mux.open_session()
+
+Every Agent takes an optional `environment` keyword. Agents built without
+one share the process-wide shared_environment(), so a thousand sensors read
+one DisasterEnvironment instead of building their own.
+"""
+
+import importlib
+import os
+
+TRANSPORTS = ("xmpp", "local", "mux")
+TRANSPORT = os.environ.get("AGENT_TRANSPORT", "xmpp")
+
+# Public name -> spade submodule that defines it
+_SPADE_MODULES = {
+    "Agent": "spade.agent",
+    "CyclicBehaviour": "spade.behaviour",
+    "OneShotBehaviour": "spade.behaviour",
+    "PeriodicBehaviour": "spade.behaviour",
+    "TimeoutBehaviour": "spade.behaviour",
+    "FSMBehaviour": "spade.behaviour",
+    "State": "spade.behaviour",
+    "Message": "spade.message",
+    "Template": "spade.template",
+}
+
+_loaded = {}
+_environment = None
+
+
+def configure(transport=None, environment=None):
+    """Choose the transport and/or the shared environment before agents are built"""
+    global TRANSPORT, _environment
+    if transport is not None:
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Transport must be one of {TRANSPORTS}")
+        if _loaded and transport != TRANSPORT:
+            raise RuntimeError(f"Agent classes were already loaded for the {TRANSPORT} transport")
+        TRANSPORT = transport
+    if environment is not None:
+        _environment = environment
+
+
+def shared_environment():
+    """The DisasterEnvironment given to agents that were not passed one"""
+    global _environment
+    if _environment is None:
+        from disaster_environment import DisasterEnvironment
+        _environment = DisasterEnvironment()
+    return _environment
+
+
+def _agent_class(base):
+    class Agent(base):
+        """SPADE agent with an injected DisasterEnvironment"""
+
+        def __init__(self, jid, password, *args, environment=None, **kwargs):
+            super().__init__(jid, password, *args, **kwargs)
+            self.environment = environment if environment is not None else shared_environment()
+
+    Agent.__module__ = __name__
+    return Agent
+
+
+def _load(name):
+    if TRANSPORT not in TRANSPORTS:
+        raise ValueError(f"AGENT_TRANSPORT must be one of {TRANSPORTS}, not {TRANSPORT!r}")
+    if TRANSPORT in ("local", "mux"):
+        import local_runtime
+        value = getattr(local_runtime, name)
+    else:
+        value = getattr(importlib.import_module(_SPADE_MODULES[name]), name)
+    return _agent_class(value) if name == "Agent" else value
+
+
+def __getattr__(name):
+    # Resolved on first use, so only the selected transport's packages are imported
+    if name not in _SPADE_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = _loaded.get(name)
+    if value is None:
+        value = _loaded[name] = _load(name)
+    return value
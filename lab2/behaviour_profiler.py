@@ -0,0 +1,290 @@
+"""
+Opt-in profiling for SPADE agent behaviours.
+
+BehaviourProfiler tags the task running each behaviour (including the
+states of an FSMBehaviour) and times every event loop step of that task:
+the wall and CPU time the behaviour actually held the loop, not the time
+it spent awaiting receive() or sleep() while other coroutines ran. A
+watchdog thread samples the event loop thread's stack, reports event-loop
+stalls longer than a threshold together with the behaviour found on that
+stack, and when the agent stops writes a flamegraph-compatible
+collapsed-stack file:
+
+    profiler = maybe_profile(agent)       # enabled with AGENT_PROFILE=1
+
+    flamegraph.pl profile_sensor.collapsed > sensor.svg
+"""
+
+import asyncio
+import asyncio.events
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from agent_metrics import REGISTRY
+
+BEHAVIOUR_STEP_SECONDS = REGISTRY.histogram(
+    "behaviour_step_seconds", "Event loop time of one step of a behaviour's task",
+    ("agent", "behaviour"))
+EVENT_LOOP_STALLS = REGISTRY.counter(
+    "event_loop_stalls_total", "Event loop stalls above the profiler threshold", ("agent",))
+
+# (task, profiler, behaviour name) of the behaviour a task is running. Tasks
+# copy their creator's context, so the task is kept to ignore inherited values.
+_BEHAVIOUR = contextvars.ContextVar("profiled_behaviour", default=None)
+
+_original_handle_run = None
+_installed = 0
+
+
+def _timed_handle_run(handle):
+    """asyncio Handle._run that charges the step of a profiled task to its behaviour"""
+    task = getattr(handle._callback, "__self__", None)
+    before = handle._context.get(_BEHAVIOUR)
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        return _original_handle_run(handle)
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        # A step that starts a behaviour only names it once it has run
+        tagged = before if before is not None and before[0] is task else handle._context.get(_BEHAVIOUR)
+        if tagged is not None and tagged[0] is task:
+            tagged[1].record(tagged[2], wall, cpu)
+
+
+def _install():
+    global _original_handle_run, _installed
+    if _installed == 0:
+        _original_handle_run = asyncio.events.Handle._run
+        asyncio.events.Handle._run = _timed_handle_run
+    _installed += 1
+
+
+def _uninstall():
+    global _installed
+    _installed -= 1
+    if _installed == 0:
+        asyncio.events.Handle._run = _original_handle_run
+
+
+class BehaviourStats:
+    """Accumulated timings for one behaviour"""
+
+    __slots__ = ("calls", "steps", "wall_total", "wall_max", "cpu_total", "histogram")
+
+    def __init__(self, histogram):
+        self.calls = 0
+        self.steps = 0
+        self.wall_total = 0.0
+        self.wall_max = 0.0
+        self.cpu_total = 0.0
+        self.histogram = histogram
+
+    def add_step(self, wall, cpu):
+        self.steps += 1
+        self.wall_total += wall
+        self.cpu_total += cpu
+        if wall > self.wall_max:
+            self.wall_max = wall
+        self.histogram.observe(wall)
+
+
+class BehaviourProfiler:
+    """Per-behaviour timings, stall detection and stack sampling for one agent"""
+
+    def __init__(self, stall_threshold=0.1, sample_interval=0.005, output_path=None):
+        self.stall_threshold = stall_threshold
+        self.sample_interval = sample_interval
+        self.output_path = output_path
+        self.stats = {}
+        self.stalls = []
+        self.samples = Counter()
+        self._agent_name = "agent"
+        # Frame of each profiled run() in progress -> behaviour name, for the sampler
+        self._frames = {}
+        self._last_beat = time.perf_counter()
+        self._loop_thread_id = None
+        self._stop = threading.Event()
+        self._watchdog = None
+        self._heartbeat = None
+
+    # ── Instrumentation ──
+
+    def instrument(self, agent):
+        """Wrap the agent's behaviours and start stall detection"""
+        self._agent_name = str(agent.jid)
+        if self.output_path is None:
+            self.output_path = f"profile_{self._agent_name.split('@')[0]}.collapsed"
+
+        for behaviour in list(agent.behaviours):
+            self.wrap_behaviour(behaviour)
+
+        original_add = agent.add_behaviour
+
+        def add_behaviour(behaviour, *args, **kwargs):
+            self.wrap_behaviour(behaviour)
+            return original_add(behaviour, *args, **kwargs)
+
+        agent.add_behaviour = add_behaviour
+
+        original_stop = agent.stop
+
+        async def stop(*args, **kwargs):
+            result = await original_stop(*args, **kwargs)
+            self.stop()
+            return result
+
+        agent.stop = stop
+        self.start()
+        return self
+
+    def wrap_behaviour(self, behaviour, name=None):
+        """Replace behaviour.run with a wrapper that tags its task (idempotent)"""
+        name = name or type(behaviour).__name__
+        if getattr(behaviour.run, "_profiled", False):
+            return
+
+        # FSM states are behaviours too and are run by the FSM itself
+        states = getattr(behaviour, "_states", None)
+        if isinstance(states, dict):
+            for state_name, state in states.items():
+                self.wrap_behaviour(state, f"{name}.{state_name}")
+
+        original = behaviour.run
+        stats = self._stats_for(name)
+
+        async def run():
+            task = asyncio.current_task()
+            outer = _BEHAVIOUR.get()
+            _BEHAVIOUR.set((task, self, name))
+            frame = sys._getframe()
+            self._frames[frame] = name
+            stats.calls += 1
+            try:
+                return await original()
+            finally:
+                del self._frames[frame]
+                # A state hands the rest of the step back to its FSM; a behaviour
+                # keeps its task's tag, as the task runs nothing else
+                if outer is not None and outer[0] is task:
+                    _BEHAVIOUR.set(outer)
+
+        run._profiled = True
+        behaviour.run = run
+
+    def _stats_for(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = BehaviourStats(
+                BEHAVIOUR_STEP_SECONDS.labels(self._agent_name, name))
+        return stats
+
+    def record(self, name, wall, cpu):
+        """One event loop step of a task running behaviour `name`"""
+        self._stats_for(name).add_step(wall, cpu)
+
+    # ── Watchdog ──
+
+    def start(self):
+        """Time loop steps, start the heartbeat coroutine and the sampling thread"""
+        loop = asyncio.get_running_loop()
+        _install()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._heartbeat = loop.create_task(self._beat())
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._sample, name="behaviour-profiler", daemon=True)
+        self._watchdog.start()
+
+    async def _beat(self):
+        interval = self.stall_threshold / 4
+        while not self._stop.is_set():
+            self._last_beat = time.perf_counter()
+            await asyncio.sleep(interval)
+
+    def _sample(self):
+        reported_beat = None
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            behaviour, stack = self._collapse(frame)
+            self.samples[stack] += 1
+
+            beat = self._last_beat
+            stalled_for = time.perf_counter() - beat
+            if stalled_for <= self.stall_threshold:
+                continue
+            if beat == reported_beat:
+                # Same stall still in progress: extend its recorded duration
+                _, behaviour, first_stack = self.stalls[-1]
+                self.stalls[-1] = (stalled_for, behaviour, first_stack)
+                continue
+            reported_beat = beat
+            self.stalls.append((stalled_for, behaviour, stack))
+            EVENT_LOOP_STALLS.labels(self._agent_name).inc()
+            print(f"⚠️  [PROFILER] Event loop stalled > {self.stall_threshold*1000:.0f} ms "
+                  f"in {behaviour or 'unknown'}: {stack.split(';')[-1]}")
+
+    def _collapse(self, frame):
+        """(innermost profiled behaviour on the stack, collapsed stack)"""
+        frames = []
+        behaviour = None
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            if behaviour is None:
+                behaviour = self._frames.get(frame)
+            frame = frame.f_back
+        frames.append(f"behaviour:{behaviour or 'event-loop'}")
+        return behaviour, ";".join(reversed(frames))
+
+    # ── Reporting ──
+
+    def stop(self):
+        """Stop sampling, write the collapsed-stack file and print a report"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        _uninstall()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+        self.write_collapsed(self.output_path)
+        self.print_report()
+
+    def write_collapsed(self, path):
+        """Write samples as 'frame;frame;frame count' lines (flamegraph.pl format)"""
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def print_report(self):
+        print(f"\n{'='*60}")
+        print(f"BEHAVIOUR PROFILE — {self._agent_name}")
+        print(f"{'='*60}")
+        print(f"{'Behaviour':<28}{'calls':>6}{'steps':>7}{'loop ms':>10}{'max ms':>9}{'cpu ms':>9}")
+        ranked = sorted(self.stats.items(), key=lambda item: item[1].wall_total, reverse=True)
+        for name, s in ranked:
+            print(f"{name[:27]:<28}{s.calls:>6}{s.steps:>7}{s.wall_total*1000:>10.1f}"
+                  f"{s.wall_max*1000:>9.1f}{s.cpu_total*1000:>9.1f}")
+        print(f"Event loop stalls > {self.stall_threshold*1000:.0f} ms: {len(self.stalls)}")
+        for stalled_for, behaviour, stack in self.stalls[:5]:
+            print(f"  {stalled_for*1000:.0f} ms in {behaviour or 'unknown'}")
+            print(f"    at {stack.split(';')[-1]}")
+        print(f"Collapsed stacks: {self.output_path}")
+        print(f"{'='*60}\n")
+
+
+def maybe_profile(agent):
+    """Instrument `agent` when AGENT_PROFILE=1; returns the profiler or None"""
+    if os.environ.get("AGENT_PROFILE", "") in ("", "0"):
+        return None
+    threshold_ms = float(os.environ.get("AGENT_PROFILE_STALL_MS", "100"))
+    return BehaviourProfiler(stall_threshold=threshold_ms / 1000).instrument(agent)
@@ -0,0 +1,75 @@
+"""
+Benchmark for choosing rescue teams from the fleet.
+
+Assigns random incidents to fleets of increasing size and compares the
+per-(capability, position) heaps with a linear scan over every team,
+checking that both pick a team arriving at the same time (the scan is
+skipped above 1,000 teams).
+
+Usage:
+    python bench_fleet.py [team_count ...]
+"""
+
+import math
+import random
+import sys
+import time
+
+from conditions_service import ConditionsService
+from disaster_environment import DisasterEnvironment, LOCATIONS
+from rescue_fleet import RescueFleet
+from road_network import RoadNetwork, minutes_to_seconds
+
+ASSIGNMENTS = 20_000
+
+
+def linear_arrival(fleet, event, now):
+    """Earliest arrival over all capable teams, by scanning them"""
+    best = math.inf
+    for team in fleet.teams.values():
+        if team.capability != event.resources_needed:
+            continue
+        minutes = fleet.roads.travel_minutes(team.position, event.location)
+        best = min(best, max(team.busy_until, now) + minutes_to_seconds(minutes))
+    return best
+
+
+def run(team_count, events, check):
+    clock = [0.0]
+    conditions = ConditionsService(LOCATIONS, clock=lambda: clock[0], seed=403)
+    fleet = RescueFleet.default(RoadNetwork(conditions), size=team_count, clock=lambda: clock[0])
+    heap_time = linear_time = 0.0
+    for i, event in enumerate(events):
+        clock[0] += 0.5
+        if check:
+            start = time.perf_counter()
+            expected = linear_arrival(fleet, event, clock[0])
+            linear_time += time.perf_counter() - start
+        start = time.perf_counter()
+        assignment = fleet.assign(event)
+        heap_time += time.perf_counter() - start
+        if check:
+            arrival = assignment.arrive_at if assignment is not None else math.inf
+            assert arrival == expected or abs(arrival - expected) < 1e-9, (arrival, expected)
+    return len(events) / heap_time, (len(events) / linear_time if check else None)
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100, 1_000, 10_000]
+    random.seed(403)
+    environment = DisasterEnvironment()
+    events = [environment.generate_disaster_event() for _ in range(ASSIGNMENTS)]
+
+    print(f"\n{'='*60}")
+    print(f"FLEET ASSIGNMENT ({ASSIGNMENTS:,} incidents)")
+    print(f"{'='*60}")
+    print(f"{'teams':>8} {'heaps':>16} {'linear scan':>16}")
+    for count in counts:
+        heap_rate, linear_rate = run(count, events, check=count <= 1_000)
+        linear = f"{linear_rate:>14,.0f}/s" if linear_rate is not None else f"{'-':>16}"
+        print(f"{count:>8,} {heap_rate:>14,.0f}/s {linear}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
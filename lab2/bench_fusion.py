@@ -0,0 +1,74 @@
+"""
+Benchmark for event fusion.
+
+First checks the release rules on hand-made reports (a report that makes
+a released incident worse releases it again, one that does not is folded
+in), then joins random reports from several sensors and reports the cost
+per report and how many incidents were released for each reason.
+
+Usage:
+    python bench_fusion.py [reports]
+"""
+
+import random
+import sys
+import time
+from dataclasses import replace
+
+from disaster_environment import DisasterEnvironment
+from disaster_models import DisasterEvent, DisasterType, Resource, Severity
+from event_fusion import EventFusion, ESCALATION, LATENCY
+
+SENSORS = 8
+
+
+def check_escalation():
+    """A worse report after release escalates the incident; a milder one does not"""
+    fusion = EventFusion("check", window=10, max_latency=2.5, confidence=0.99)
+    low = DisasterEvent(DisasterType.FIRE, "Zone B", Severity.LOW, 5, Resource.FOOD, 0)
+    assert fusion.add(low, "s1", now=0) is None
+    released = fusion.release_due(now=2.5)
+    assert [incident.reason for incident in released] == [LATENCY], released
+
+    assert fusion.add(replace(low, casualties=1), "s3", now=4) is None
+    critical = replace(low, severity=Severity.CRITICAL, casualties=40)
+    escalated = fusion.add(critical, "s2", now=5)
+    assert escalated is not None and escalated.reason == ESCALATION, escalated
+    assert escalated.event.severity == Severity.CRITICAL
+    assert fusion.release_due(now=9) == [] and fusion.release_due(now=20) == []
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    check_escalation()
+
+    random.seed(403)
+    environment = DisasterEnvironment()
+    events = [environment.generate_disaster_event() for _ in range(count)]
+    sources = [f"sensor{random.randrange(SENSORS)}" for _ in range(count)]
+    fusion = EventFusion("bench", clock=lambda: 0.0)
+    reasons = {}
+
+    start = time.perf_counter()
+    for i, (event, source) in enumerate(zip(events, sources)):
+        now = i * 0.05
+        incident = fusion.add(event, source, now=now)
+        released = fusion.release_due(now=now)
+        if incident is not None:
+            released.append(incident)
+        for incident in released:
+            reasons[incident.reason] = reasons.get(incident.reason, 0) + 1
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{'='*60}")
+    print(f"EVENT FUSION ({count:,} reports from {SENSORS} sensors)")
+    print(f"{'='*60}")
+    print(f"Cost per report : {elapsed / count * 1e6:.2f} us")
+    print(f"Incidents       : {sum(reasons.values()):,}")
+    for reason, released in sorted(reasons.items()):
+        print(f"  {reason:<14}: {released:,}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
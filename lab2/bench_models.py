@@ -0,0 +1,97 @@
+"""
+Memory and speed benchmark: DisasterEvent models vs the old ad-hoc dicts.
+
+Usage:
+    python bench_models.py [event_count]
+"""
+
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from disaster_models import DisasterEvent, DisasterType, Severity, Resource
+
+LOCATIONS = ['Zone A', 'Zone B', 'Zone C', 'Zone D', 'Zone E']
+
+
+def make_dict(i):
+    return {
+        'type': random.choice(['Fire', 'Flood', 'Earthquake', 'Storm']),
+        'location': random.choice(LOCATIONS),
+        'severity': random.choice(['Low', 'Medium', 'High', 'Critical']),
+        'casualties': random.randint(0, 50),
+        'resources_needed': random.choice(['Medical', 'Food', 'Shelter', 'Rescue']),
+        'timestamp_ns': time.time_ns() + i,
+        'monotonic_ns': i,
+    }
+
+
+def make_model(i):
+    return DisasterEvent(
+        type=random.choice(list(DisasterType)),
+        location=random.choice(LOCATIONS),
+        severity=random.choice(list(Severity)),
+        casualties=random.randint(0, 50),
+        resources_needed=random.choice(list(Resource)),
+        timestamp_ns=time.time_ns() + i,
+        monotonic_ns=i,
+    )
+
+
+def measure_memory(factory, count):
+    tracemalloc.start()
+    items = [factory(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return size / count
+
+
+def measure_time(function, items):
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return (time.perf_counter() - start) / len(items) * 1e9
+
+
+def dict_access(event):
+    if event['severity'] in ('Medium', 'High', 'Critical'):
+        return event['type'], event['location'], event['casualties'], event['resources_needed']
+
+
+def model_access(event):
+    if event.severity in (Severity.MEDIUM, Severity.HIGH, Severity.CRITICAL):
+        return event.type, event.location, event.casualties, event.resources_needed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    random.seed(403)
+
+    dicts = [make_dict(i) for i in range(count)]
+    models = [DisasterEvent.from_wire(d) for d in dicts]
+    dict_bodies = [json.dumps(d) for d in dicts]
+    model_bodies = [m.to_json() for m in models]
+
+    rows = [
+        ("bytes per event", measure_memory(make_dict, count), measure_memory(make_model, count)),
+        ("to wire (ns)", measure_time(json.dumps, dicts), measure_time(DisasterEvent.to_json, models)),
+        ("from wire + validate (ns)", measure_time(json.loads, dict_bodies),
+         measure_time(DisasterEvent.from_json, model_bodies)),
+        ("handler field access (ns)", measure_time(dict_access, dicts), measure_time(model_access, models)),
+    ]
+
+    print(f"\n{'='*60}")
+    print(f"EVENT MODEL BENCHMARK ({count:,} events)")
+    print(f"{'='*60}")
+    print(f"{'':<28}{'dict':>12}{'DisasterEvent':>16}")
+    for name, dict_value, model_value in rows:
+        print(f"{name:<28}{dict_value:>12.1f}{model_value:>16.1f}")
+    print("(dict 'from wire' is json.loads only; the model also validates every field)")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
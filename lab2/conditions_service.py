@@ -0,0 +1,139 @@
+"""
+Per-zone environmental conditions shared by many agents.
+
+ConditionsService keeps temperature, wind speed, visibility and
+accessibility for every zone and evolves them incrementally, one random-walk
+step per `tick` seconds, instead of drawing fresh values on every read.
+Updates are applied lazily when a read finds the model out of date, and
+reads are served from a cache with a TTL, so the common case is a clock
+read plus a dictionary lookup.
+
+Reads return frozen EnvironmentalConditions snapshots shared by all callers.
+"""
+
+import random
+import time
+
+from event_time import now_ns
+from disaster_models import EnvironmentalConditions, Visibility, Accessibility, ValidationError
+
+VISIBILITY_LEVELS = list(Visibility)
+ACCESSIBILITY_LEVELS = list(Accessibility)
+
+TEMPERATURE_RANGE = (15, 40)
+WIND_SPEED_RANGE = (0, 100)
+
+
+def _clamp(value, bounds):
+    low, high = bounds
+    return low if value < low else high if value > high else value
+
+
+class ZoneConditions:
+    """Mutable model state for one zone"""
+
+    __slots__ = ("temperature", "wind_speed", "visibility", "accessibility")
+
+    def __init__(self, rng):
+        self.temperature = rng.randint(*TEMPERATURE_RANGE)
+        self.wind_speed = rng.randint(*WIND_SPEED_RANGE)
+        self.visibility = rng.randrange(len(VISIBILITY_LEVELS))
+        self.accessibility = rng.randrange(len(ACCESSIBILITY_LEVELS))
+
+    def step(self, rng, level_change=0.15):
+        """Advance the zone by one tick of weather drift"""
+        self.temperature = _clamp(self.temperature + rng.randint(-1, 1), TEMPERATURE_RANGE)
+        self.wind_speed = _clamp(self.wind_speed + rng.randint(-5, 5), WIND_SPEED_RANGE)
+        if rng.random() < level_change:
+            self.visibility = _clamp(self.visibility + rng.choice((-1, 1)),
+                                     (0, len(VISIBILITY_LEVELS) - 1))
+        if rng.random() < level_change:
+            self.accessibility = _clamp(self.accessibility + rng.choice((-1, 1)),
+                                        (0, len(ACCESSIBILITY_LEVELS) - 1))
+
+
+class ConditionsService:
+    """Lazily updated, cached environmental conditions for a set of zones"""
+
+    def __init__(self, zones, tick=5.0, ttl=1.0, max_catch_up=100, clock=time.monotonic, seed=None):
+        self.zones = list(zones)
+        self.tick = tick
+        self.ttl = ttl
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.ticks = 0
+        self._model = {zone: ZoneConditions(self.rng) for zone in self.zones}
+        self._last_tick = clock()
+        self._snapshots = {}
+        self._cache = {}
+        self._publish()
+
+    def get(self, zone=None):
+        """
+        Conditions for `zone`, or a region-wide (median) overview when zone
+        is None. Raises ValidationError for a zone the service does not model.
+        """
+        now = self.clock()
+        entry = self._cache.get(zone)
+        if entry is not None and now < entry[0]:
+            return entry[1]
+
+        self._advance(now)
+        snapshot = self._snapshots.get(zone)
+        if snapshot is None:
+            raise ValidationError(f"Unknown zone {zone!r}; expected one of {self.zones}")
+        self._cache[zone] = (now + self.ttl, snapshot)
+        return snapshot
+
+    def _advance(self, now):
+        steps = int((now - self._last_tick) // self.tick)
+        if steps <= 0:
+            return
+        self._last_tick += steps * self.tick
+        # After a long idle period only the most recent drift matters
+        for _ in range(min(steps, self.max_catch_up)):
+            for zone_model in self._model.values():
+                zone_model.step(self.rng)
+        self.ticks += steps
+        self._publish()
+
+    def _publish(self):
+        """Rebuild the read-only snapshots after the model changed"""
+        timestamp_ns = now_ns()
+        snapshots = {}
+        for zone, m in self._model.items():
+            snapshots[zone] = EnvironmentalConditions(
+                zone=zone,
+                temperature=m.temperature,
+                wind_speed=m.wind_speed,
+                visibility=VISIBILITY_LEVELS[m.visibility],
+                accessibility=ACCESSIBILITY_LEVELS[m.accessibility],
+                timestamp_ns=timestamp_ns
+            )
+
+        # Region-wide overview: the median zone for each field
+        models = list(self._model.values())
+        middle = len(models) // 2
+        snapshots[None] = EnvironmentalConditions(
+            zone=None,
+            temperature=sorted(m.temperature for m in models)[middle],
+            wind_speed=sorted(m.wind_speed for m in models)[middle],
+            visibility=VISIBILITY_LEVELS[sorted(m.visibility for m in models)[middle]],
+            accessibility=ACCESSIBILITY_LEVELS[sorted(m.accessibility for m in models)[middle]],
+            timestamp_ns=timestamp_ns
+        )
+        self._snapshots = snapshots
+        self._cache.clear()
+
+
+_shared = {}
+
+
+def shared_conditions(zones, **kwargs):
+    """One ConditionsService per zone list, shared by every caller in the process"""
+    key = tuple(zones)
+    service = _shared.get(key)
+    if service is None:
+        service = _shared[key] = ConditionsService(zones, **kwargs)
+    return service
@@ -1,34 +1,34 @@
 import random
-import time
-from datetime import datetime
+from conditions_service import shared_conditions
+from event_time import now_ns, monotonic_ns
+from disaster_models import DisasterEvent, DisasterType, Severity, Resource
+
+LOCATIONS = ('Zone A', 'Zone B', 'Zone C', 'Zone D', 'Zone E')
 
 class DisasterEnvironment:
     """Simulates a disaster environment with various events"""
     
-    def __init__(self):
-        self.disaster_types = ['Fire', 'Flood', 'Earthquake', 'Storm']
-        self.severity_levels = ['Low', 'Medium', 'High', 'Critical']
-        self.locations = ['Zone A', 'Zone B', 'Zone C', 'Zone D', 'Zone E']
+    def __init__(self, conditions=None, locations=LOCATIONS):
+        self.disaster_types = list(DisasterType)
+        self.severity_levels = list(Severity)
+        self.resource_types = list(Resource)
+        # Events are generated in `locations` (a region's zones, or all of them)
+        self.locations = list(locations)
+        # Conditions model shared by every environment in the process unless one is given
+        self.conditions = conditions or shared_conditions(LOCATIONS)
         
     def generate_disaster_event(self):
         """Generate a random disaster event"""
-        event = {
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'type': random.choice(self.disaster_types),
-            'location': random.choice(self.locations),
-            'severity': random.choice(self.severity_levels),
-            'casualties': random.randint(0, 50),
-            'resources_needed': random.choice(['Medical', 'Food', 'Shelter', 'Rescue'])
-        }
-        return event
+        return DisasterEvent(
+            type=random.choice(self.disaster_types),
+            location=random.choice(self.locations),
+            severity=random.choice(self.severity_levels),
+            casualties=random.randint(0, 50),
+            resources_needed=random.choice(self.resource_types),
+            timestamp_ns=now_ns(),
+            monotonic_ns=monotonic_ns()
+        )
     
-    def get_environmental_conditions(self):
-        """Get current environmental conditions"""
-        conditions = {
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'temperature': random.randint(15, 40),
-            'wind_speed': random.randint(0, 100),
-            'visibility': random.choice(['Clear', 'Moderate', 'Poor']),
-            'accessibility': random.choice(['Normal', 'Restricted', 'Blocked'])
-        }
-        return conditions
\ No newline at end of file
+    def get_environmental_conditions(self, zone=None):
+        """Get current environmental conditions for a zone (or the whole region)"""
+        return self.conditions.get(zone)
@@ -0,0 +1,305 @@
+"""
+Typed event, conditions, request and status models for the disaster response agents.
+
+Events used to be ad-hoc dicts rebuilt by json.loads on every receiver and
+then read by string key throughout each handler. These frozen, slotted
+dataclasses replace them:
+
+  - enum-backed type, severity, resource, visibility and accessibility
+    (the enums are str subclasses, so they compare and hash equal to their
+    wire values and print as them)
+  - to_wire()/from_wire() for fast conversion to and from the JSON body
+  - validation done once, in from_wire(), at the edge of the system
+
+Run bench_models.py for a memory and speed comparison with plain dicts.
+"""
+
+import json
+from dataclasses import dataclass, replace
+from enum import Enum
+
+
+class ValidationError(ValueError):
+    """Raised when a wire payload does not describe a valid model"""
+
+
+class _WireEnum(str, Enum):
+    """Enum whose members are their wire strings"""
+
+    def __str__(self):
+        return self.value
+
+    def __format__(self, spec):
+        return format(self.value, spec)
+
+    @classmethod
+    def parse(cls, value):
+        try:
+            member = cls._value2member_map_.get(value)
+        except TypeError:
+            member = None
+        if member is None:
+            raise ValidationError(f"Unknown {cls.__name__} {value!r}")
+        return member
+
+
+class DisasterType(_WireEnum):
+    FIRE = 'Fire'
+    FLOOD = 'Flood'
+    EARTHQUAKE = 'Earthquake'
+    STORM = 'Storm'
+
+
+class Severity(_WireEnum):
+    LOW = 'Low'
+    MEDIUM = 'Medium'
+    HIGH = 'High'
+    CRITICAL = 'Critical'
+
+    @property
+    def rank(self):
+        """0 for Low up to 3 for Critical"""
+        return _SEVERITY_RANK[self]
+
+
+_SEVERITY_RANK = {severity: rank for rank, severity in enumerate(Severity)}
+
+
+class Resource(_WireEnum):
+    MEDICAL = 'Medical'
+    FOOD = 'Food'
+    SHELTER = 'Shelter'
+    RESCUE = 'Rescue'
+
+
+class Visibility(_WireEnum):
+    CLEAR = 'Clear'
+    MODERATE = 'Moderate'
+    POOR = 'Poor'
+
+
+class Accessibility(_WireEnum):
+    NORMAL = 'Normal'
+    RESTRICTED = 'Restricted'
+    BLOCKED = 'Blocked'
+
+
+def _require_text(data, key):
+    value = data[key]
+    if not isinstance(value, str) or not value:
+        raise ValidationError(f"{key} must be a non-empty string")
+    return value
+
+
+_REQUIRED = object()
+
+
+def _require_int(data, key, default=_REQUIRED, minimum=0):
+    value = data.get(key, default)
+    if value is _REQUIRED:
+        raise ValidationError(f"Missing field {key!r}")
+    if value is None and default is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+        raise ValidationError(f"{key} must be an integer >= {minimum}")
+    return value
+
+
+def _parse_payload(text):
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Body is not valid JSON: {e}") from None
+    if not isinstance(data, dict):
+        raise ValidationError("Body must be a JSON object")
+    return data
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MODELS
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True, slots=True)
+class DisasterEvent:
+    """A detected disaster, as sent in INFORM bodies"""
+
+    type: DisasterType
+    location: str
+    severity: Severity
+    casualties: int
+    resources_needed: Resource
+    timestamp_ns: int
+    monotonic_ns: int = 0
+    detected_ns: int = None
+
+    def detected(self, detected_ns):
+        """Copy of this event stamped with the sensor's detection time"""
+        return replace(self, detected_ns=detected_ns)
+
+    def to_wire(self):
+        wire = {
+            'type': self.type.value,
+            'location': self.location,
+            'severity': self.severity.value,
+            'casualties': self.casualties,
+            'resources_needed': self.resources_needed.value,
+            'timestamp_ns': self.timestamp_ns,
+            'monotonic_ns': self.monotonic_ns,
+        }
+        if self.detected_ns is not None:
+            wire['detected_ns'] = self.detected_ns
+        return wire
+
+    def to_json(self):
+        return json.dumps(self.to_wire())
+
+    @classmethod
+    def from_wire(cls, data):
+        try:
+            return cls(
+                DisasterType.parse(data['type']),
+                _require_text(data, 'location'),
+                Severity.parse(data['severity']),
+                _require_int(data, 'casualties'),
+                Resource.parse(data['resources_needed']),
+                _require_int(data, 'timestamp_ns', 0),
+                _require_int(data, 'monotonic_ns', 0),
+                _require_int(data, 'detected_ns', None),
+            )
+        except KeyError as e:
+            raise ValidationError(f"Missing field {e.args[0]!r}") from None
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_wire(_parse_payload(text))
+
+
+@dataclass(frozen=True, slots=True)
+class EnvironmentalConditions:
+    """Conditions in one zone, or across the region when zone is None"""
+
+    zone: str
+    temperature: int
+    wind_speed: int
+    visibility: Visibility
+    accessibility: Accessibility
+    timestamp_ns: int
+
+    def to_wire(self):
+        return {
+            'zone': self.zone,
+            'temperature': self.temperature,
+            'wind_speed': self.wind_speed,
+            'visibility': self.visibility.value,
+            'accessibility': self.accessibility.value,
+            'timestamp_ns': self.timestamp_ns,
+        }
+
+    @classmethod
+    def from_wire(cls, data):
+        try:
+            zone = data.get('zone')
+            if zone is not None:
+                zone = _require_text(data, 'zone')
+            return cls(
+                zone,
+                _require_int(data, 'temperature', minimum=-100),
+                _require_int(data, 'wind_speed'),
+                Visibility.parse(data['visibility']),
+                Accessibility.parse(data['accessibility']),
+                _require_int(data, 'timestamp_ns', 0),
+            )
+        except KeyError as e:
+            raise ValidationError(f"Missing field {e.args[0]!r}") from None
+
+
+@dataclass(frozen=True, slots=True)
+class StatusRequest:
+    """A REQUEST for a detailed status update about one location"""
+
+    location: str
+    timestamp_ns: int
+    request_type: str = 'status_update'
+    details_needed: tuple = ()
+
+    def to_wire(self):
+        return {
+            'request_type': self.request_type,
+            'location': self.location,
+            'timestamp_ns': self.timestamp_ns,
+            'details_needed': list(self.details_needed),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_wire())
+
+    @classmethod
+    def from_wire(cls, data):
+        try:
+            details = data.get('details_needed', [])
+            if not isinstance(details, list) or not all(isinstance(d, str) for d in details):
+                raise ValidationError("details_needed must be a list of strings")
+            return cls(
+                _require_text(data, 'location'),
+                _require_int(data, 'timestamp_ns', 0),
+                _require_text(data, 'request_type'),
+                tuple(details),
+            )
+        except KeyError as e:
+            raise ValidationError(f"Missing field {e.args[0]!r}") from None
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_wire(_parse_payload(text))
+
+
+@dataclass(frozen=True, slots=True)
+class StatusReport:
+    """The answer to a StatusRequest, built from what a coordinator has seen"""
+
+    location: str
+    timestamp_ns: int
+    reports: int
+    last_report_ns: int = None
+    incidents: tuple = ()
+    conditions: EnvironmentalConditions = None
+
+    def to_wire(self):
+        wire = {
+            'location': self.location,
+            'timestamp_ns': self.timestamp_ns,
+            'reports': self.reports,
+            'incidents': [event.to_wire() for event in self.incidents],
+        }
+        if self.last_report_ns is not None:
+            wire['last_report_ns'] = self.last_report_ns
+        if self.conditions is not None:
+            wire['conditions'] = self.conditions.to_wire()
+        return wire
+
+    def to_json(self):
+        return json.dumps(self.to_wire())
+
+    @classmethod
+    def from_wire(cls, data):
+        try:
+            incidents = data.get('incidents', [])
+            if not isinstance(incidents, list) or not all(isinstance(i, dict) for i in incidents):
+                raise ValidationError("incidents must be a list of events")
+            conditions = data.get('conditions')
+            if conditions is not None and not isinstance(conditions, dict):
+                raise ValidationError("conditions must be an object")
+            return cls(
+                _require_text(data, 'location'),
+                _require_int(data, 'timestamp_ns', 0),
+                _require_int(data, 'reports'),
+                _require_int(data, 'last_report_ns', None),
+                tuple(DisasterEvent.from_wire(i) for i in incidents),
+                EnvironmentalConditions.from_wire(conditions) if conditions is not None else None,
+            )
+        except KeyError as e:
+            raise ValidationError(f"Missing field {e.args[0]!r}") from None
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_wire(_parse_payload(text))
@@ -0,0 +1,300 @@
+"""
+Rule-table dispatch decisions for rescue agents.
+
+Whether a rescue agent dispatches a team for an event, or only logs it, is
+decided by rules loaded from a JSON file (dispatch_rules.json by default,
+or the path in AGENT_RULES_PATH):
+
+    {
+      "default": {"action": "log"},
+      "rules": [
+        {"name": "critical", "when": {"severity": ["Critical"]},
+         "action": "dispatch", "request_info": true},
+        {"name": "mass-casualty", "when": {"casualties_min": 40}, "action": "dispatch"}
+      ]
+    }
+
+A rule matches when every field in its `when` block matches; the first
+matching rule in file order wins. Fields: type, severity, min_severity,
+zone, casualties_min, casualties_max, visibility, accessibility.
+
+Rules are compiled into one bitset per field value, so a decision is the
+AND of six integers followed by a lowest-set-bit, and repeated field
+combinations are answered from a memoized table. The file is re-read when
+it changes on disk, so rules can be edited while agents are running.
+"""
+
+import json
+import os
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+
+from disaster_models import (ValidationError, DisasterType, Severity, Visibility,
+                             Accessibility)
+
+RULES_PATH = os.environ.get(
+    "AGENT_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dispatch_rules.json"))
+
+ACTIONS = ("dispatch", "log")
+
+_FIELDS = {"type", "severity", "min_severity", "zone", "casualties_min", "casualties_max",
+           "visibility", "accessibility"}
+
+
+@dataclass(frozen=True, slots=True)
+class Decision:
+    """Outcome of evaluating the rules for one event"""
+
+    action: str
+    rule: str
+    request_info: bool = False
+
+    @property
+    def dispatch(self):
+        return self.action == "dispatch"
+
+
+# ═══════════════════════════════════════════════════════════════════
+# RULE PARSING
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True, slots=True)
+class Rule:
+    """One parsed rule; None for a field means 'any value'"""
+
+    name: str
+    decision: Decision
+    types: frozenset = None
+    severities: frozenset = None
+    zones: frozenset = None
+    casualties_min: int = 0
+    casualties_max: int = None
+    visibilities: frozenset = None
+    accessibilities: frozenset = None
+
+
+def _enum_set(when, key, enum):
+    values = when.get(key)
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    if not isinstance(values, list) or not values:
+        raise ValidationError(f"{key} must be a value or a non-empty list")
+    return frozenset(enum.parse(v) for v in values)
+
+
+def _decision(data, name):
+    action = data.get("action")
+    if action not in ACTIONS:
+        raise ValidationError(f"Rule {name!r}: action must be one of {ACTIONS}")
+    return Decision(action, name, bool(data.get("request_info", False)))
+
+
+def parse_rule(data, index=0):
+    """Build a Rule from one entry of the config's "rules" list"""
+    if not isinstance(data, dict):
+        raise ValidationError(f"Rule #{index} must be an object")
+    name = data.get("name") or f"rule-{index}"
+    when = data.get("when", {})
+    if not isinstance(when, dict):
+        raise ValidationError(f"Rule {name!r}: when must be an object")
+    unknown = set(when) - _FIELDS
+    if unknown:
+        raise ValidationError(f"Rule {name!r}: unknown fields {sorted(unknown)}")
+
+    try:
+        severities = _enum_set(when, "severity", Severity)
+        if "min_severity" in when:
+            floor = Severity.parse(when["min_severity"]).rank
+            at_least = frozenset(s for s in Severity if s.rank >= floor)
+            severities = at_least if severities is None else severities & at_least
+        zones = when.get("zone")
+        if isinstance(zones, str):
+            zones = [zones]
+        if zones is not None and (not isinstance(zones, list) or not zones):
+            raise ValidationError("zone must be a value or a non-empty list")
+        low = when.get("casualties_min", 0)
+        high = when.get("casualties_max")
+        if not isinstance(low, int) or low < 0 or (high is not None and (
+                not isinstance(high, int) or high < low)):
+            raise ValidationError("casualties_min/casualties_max must be integers with min <= max")
+        return Rule(
+            name=name,
+            decision=_decision(data, name),
+            types=_enum_set(when, "type", DisasterType),
+            severities=severities,
+            zones=None if zones is None else frozenset(zones),
+            casualties_min=low,
+            casualties_max=high,
+            visibilities=_enum_set(when, "visibility", Visibility),
+            accessibilities=_enum_set(when, "accessibility", Accessibility),
+        )
+    except ValidationError as e:
+        if str(e).startswith("Rule "):
+            raise
+        raise ValidationError(f"Rule {name!r}: {e}") from None
+
+
+def parse_config(data):
+    """Return (rules, default Decision) from a decoded config document"""
+    if not isinstance(data, dict) or not isinstance(data.get("rules"), list):
+        raise ValidationError("Rules config must be an object with a 'rules' list")
+    default = _decision(data.get("default", {"action": "log"}), "default")
+    return [parse_rule(rule, i) for i, rule in enumerate(data["rules"])], default
+
+
+# ═══════════════════════════════════════════════════════════════════
+# COMPILED TABLE
+# ═══════════════════════════════════════════════════════════════════
+
+def _categorical(rules, attr, values):
+    """Map each value to the bitset of rules accepting it; rules with no
+    constraint set their bit under every value and under None (unknown)"""
+    wildcard = 0
+    specific = {}
+    for bit, rule in enumerate(rules):
+        accepted = getattr(rule, attr)
+        if accepted is None:
+            wildcard |= 1 << bit
+        else:
+            for value in accepted:
+                specific[value] = specific.get(value, 0) | (1 << bit)
+    table = {value: wildcard | specific.pop(value, 0) for value in values}
+    table.update({value: wildcard | bits for value, bits in specific.items()})
+    table[None] = wildcard
+    return table
+
+
+class DecisionTable:
+    """Rules compiled into per-field bitsets with a memoized decision cache"""
+
+    def __init__(self, rules, default, memo_size=65536):
+        self.rules = list(rules)
+        self.default = default
+        self.memo_size = memo_size
+        self._decisions = [rule.decision for rule in self.rules]
+        self._types = _categorical(self.rules, "types", DisasterType)
+        self._severities = _categorical(self.rules, "severities", Severity)
+        self._zones = _categorical(self.rules, "zones", ())
+        self._visibilities = _categorical(self.rules, "visibilities", Visibility)
+        self._accessibilities = _categorical(self.rules, "accessibilities", Accessibility)
+        self._compile_casualties()
+        self._memo = {}
+
+    def _compile_casualties(self):
+        # Split the casualty axis at every rule bound; each interval gets the
+        # bitset of rules covering it, found by bisecting the sorted bounds
+        bounds = sorted({rule.casualties_min for rule in self.rules} |
+                        {rule.casualties_max + 1 for rule in self.rules
+                         if rule.casualties_max is not None} | {0})
+        index = {bound: i for i, bound in enumerate(bounds)}
+        starts = [0] * len(bounds)
+        ends = [0] * (len(bounds) + 1)
+        for bit, rule in enumerate(self.rules):
+            starts[index[rule.casualties_min]] |= 1 << bit
+            if rule.casualties_max is not None:
+                ends[index[rule.casualties_max + 1]] |= 1 << bit
+        active = 0
+        self._casualty_bits = []
+        for i in range(len(bounds)):
+            active = (active & ~ends[i]) | starts[i]
+            self._casualty_bits.append(active)
+        self._casualty_bounds = bounds
+
+    def decide(self, event, conditions=None):
+        """Decision for an event, given the conditions in its zone if known"""
+        # bounds[0] is 0, so only a negative count would land before it
+        bucket = max(bisect_right(self._casualty_bounds, event.casualties) - 1, 0)
+        if conditions is None:
+            visibility = accessibility = None
+        else:
+            visibility, accessibility = conditions.visibility, conditions.accessibility
+        key = (event.type, event.severity, event.location, bucket, visibility, accessibility)
+
+        decision = self._memo.get(key)
+        if decision is None:
+            zones = self._zones
+            matches = (self._types[event.type] & self._severities[event.severity]
+                       & zones.get(event.location, zones[None]) & self._casualty_bits[bucket]
+                       & self._visibilities[visibility] & self._accessibilities[accessibility])
+            if matches:
+                decision = self._decisions[(matches & -matches).bit_length() - 1]
+            else:
+                decision = self.default
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            self._memo[key] = decision
+        return decision
+
+
+# ═══════════════════════════════════════════════════════════════════
+# HOT-RELOADING ENGINE
+# ═══════════════════════════════════════════════════════════════════
+
+class RuleEngine:
+    """
+    Decision table backed by a rules file that is reloaded when it changes.
+
+    The file's modification time is checked at most once per
+    `reload_interval` seconds. A file that fails to load is reported and the
+    previous table stays in use.
+    """
+
+    def __init__(self, path=RULES_PATH, reload_interval=1.0, clock=time.monotonic):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.clock = clock
+        self.table = None
+        self._mtime = None
+        self._next_check = 0.0
+        self.reload()
+
+    def reload(self):
+        """Load and compile the rules file; return True if the table changed"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path) as f:
+                data = json.load(f)
+            rules, default = parse_config(data)
+        except (OSError, json.JSONDecodeError, ValidationError) as e:
+            if self.table is None:
+                raise
+            print(f"[Rules] ⚠️  Keeping previous rules; could not load {self.path}: {e}")
+            self._mtime = self._current_mtime()
+            return False
+        self.table = DecisionTable(rules, default)
+        self._mtime = mtime
+        print(f"[Rules] Loaded {len(rules)} dispatch rules from {self.path}")
+        return True
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def check_reload(self):
+        now = self.clock()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.reload_interval
+        if self._current_mtime() == self._mtime:
+            return False
+        return self.reload()
+
+    def decide(self, event, conditions=None):
+        self.check_reload()
+        return self.table.decide(event, conditions)
+
+
+_shared = {}
+
+
+def shared_rules(path=RULES_PATH, **kwargs):
+    """One RuleEngine per rules file, shared by every agent in the process"""
+    engine = _shared.get(path)
+    if engine is None:
+        engine = _shared[path] = RuleEngine(path, **kwargs)
+    return engine
@@ -0,0 +1,230 @@
+"""
+Streaming aggregation over disaster events.
+
+Rescue agents feed every event into a StreamingEventAnalytics instance as
+it arrives. The aggregator keeps sliding-window counts and casualty sums
+for every (type, location, severity) combination, including wildcards, and
+approximate casualty quantiles from a log-bucket sketch. Memory depends only
+on the window resolution and the number of distinct keys, never on the
+number of events, and a query such as
+
+    analytics.count(300, location='Zone B', severity='Critical')
+
+is a single dictionary lookup.
+"""
+
+import math
+import time
+from itertools import product
+
+ANY = None
+
+
+# ═══════════════════════════════════════════════════════════════════
+# QUANTILE SKETCH
+# ═══════════════════════════════════════════════════════════════════
+
+class QuantileSketch:
+    """
+    Log-bucket quantile sketch with bounded relative error.
+
+    Values are counted in buckets whose bounds grow geometrically, so the
+    number of buckets depends on the value range and the accuracy, not on
+    the number of values. Bucket counts can be subtracted, which lets a
+    sliding window expire old slots without rebuilding.
+    """
+
+    __slots__ = ("relative_accuracy", "_gamma_log", "buckets", "zero_count", "count")
+
+    def __init__(self, relative_accuracy=0.02):
+        self.relative_accuracy = relative_accuracy
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._gamma_log = math.log(gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value, weight=1):
+        if value <= 0:
+            self.zero_count += weight
+        else:
+            key = math.ceil(math.log(value) / self._gamma_log)
+            remaining = self.buckets.get(key, 0) + weight
+            if remaining:
+                self.buckets[key] = remaining
+            else:
+                del self.buckets[key]
+        self.count += weight
+
+    def merge(self, other, sign=1):
+        """Add (sign=1) or subtract (sign=-1) another sketch's counts"""
+        self.zero_count += sign * other.zero_count
+        self.count += sign * other.count
+        for key, weight in other.buckets.items():
+            remaining = self.buckets.get(key, 0) + sign * weight
+            if remaining:
+                self.buckets[key] = remaining
+            else:
+                del self.buckets[key]
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), or None when empty"""
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(k-1), gamma^k]
+                return 2 * math.exp(key * self._gamma_log) / (1 + math.exp(self._gamma_log))
+        return None
+
+    def clear(self):
+        self.buckets.clear()
+        self.zero_count = 0
+        self.count = 0
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SLIDING-WINDOW AGGREGATOR
+# ═══════════════════════════════════════════════════════════════════
+
+class _Slot:
+    """Aggregates for one time slice of the ring"""
+
+    __slots__ = ("counts", "casualties", "sketch")
+
+    def __init__(self, relative_accuracy):
+        self.counts = {}
+        self.casualties = {}
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def clear(self):
+        self.counts.clear()
+        self.casualties.clear()
+        self.sketch.clear()
+
+
+class StreamingEventAnalytics:
+    """
+    Sliding-window counts, casualty sums and quantiles over disaster events.
+
+    Time is split into slots of `resolution` seconds held in a ring large
+    enough for the longest window. Each configured window keeps running
+    totals that are updated when an event arrives and when a slot expires,
+    so queries never scan the ring.
+    """
+
+    def __init__(self, windows=(60, 300, 3600), resolution=5, relative_accuracy=0.02,
+                 clock=time.monotonic):
+        self.resolution = resolution
+        self.clock = clock
+        self._window_slots = {w: max(1, math.ceil(w / resolution)) for w in windows}
+        self._ring_size = max(self._window_slots.values())
+        self._ring = [_Slot(relative_accuracy) for _ in range(self._ring_size)]
+        self._totals = {w: _Slot(relative_accuracy) for w in windows}
+        self._head = int(clock() // resolution)
+        self.events_seen = 0
+
+    @property
+    def windows(self):
+        return tuple(self._window_slots)
+
+    # ── Ingestion ──
+
+    def record(self, event, now=None):
+        """Add one DisasterEvent to the current slot and every window"""
+        self._advance(self.clock() if now is None else now)
+        casualties = event.casualties
+        slot = self._ring[self._head % self._ring_size]
+        targets = (slot,) + tuple(self._totals.values())
+
+        for key in product((event.type, ANY), (event.location, ANY), (event.severity, ANY)):
+            for target in targets:
+                target.counts[key] = target.counts.get(key, 0) + 1
+                target.casualties[key] = target.casualties.get(key, 0) + casualties
+        for target in targets:
+            target.sketch.add(casualties)
+        self.events_seen += 1
+
+    def _advance(self, now):
+        head = int(now // self.resolution)
+        if head <= self._head:
+            return
+        if head - self._head >= self._ring_size:
+            # Everything has expired; start again from an empty ring
+            for slot in self._ring:
+                slot.clear()
+            for total in self._totals.values():
+                total.clear()
+            self._head = head
+            return
+
+        while self._head < head:
+            self._head += 1
+            for window, slots in self._window_slots.items():
+                expired = self._ring[(self._head - slots) % self._ring_size]
+                self._subtract(self._totals[window], expired)
+            self._ring[self._head % self._ring_size].clear()
+
+    @staticmethod
+    def _subtract(total, expired):
+        for key, count in expired.counts.items():
+            remaining = total.counts[key] - count
+            if remaining:
+                total.counts[key] = remaining
+                total.casualties[key] -= expired.casualties[key]
+            else:
+                del total.counts[key]
+                del total.casualties[key]
+        total.sketch.merge(expired.sketch, sign=-1)
+
+    # ── Queries ──
+
+    def _window(self, window):
+        total = self._totals.get(window)
+        if total is None:
+            raise ValueError(f"Window {window}s is not tracked; choose one of {self.windows}")
+        self._advance(self.clock())
+        return total
+
+    def count(self, window, type=ANY, location=ANY, severity=ANY):
+        """Events in the last `window` seconds matching the given fields"""
+        return self._window(window).counts.get((type, location, severity), 0)
+
+    def casualties(self, window, type=ANY, location=ANY, severity=ANY):
+        """Sum of estimated casualties over matching events in the window"""
+        return self._window(window).casualties.get((type, location, severity), 0)
+
+    def casualty_quantile(self, window, q):
+        """Approximate casualty quantile over all events in the window"""
+        return self._window(window).sketch.quantile(q)
+
+    def breakdown(self, window, field):
+        """Counts per value of 'type', 'location' or 'severity' in the window"""
+        index = ('type', 'location', 'severity').index(field)
+        result = {}
+        for key, count in self._window(window).counts.items():
+            if key[index] is not ANY and sum(k is not ANY for k in key) == 1:
+                result[key[index]] = count
+        return result
+
+    def print_summary(self, window=None):
+        window = window or max(self.windows)
+        median = self.casualty_quantile(window, 0.5)
+        p95 = self.casualty_quantile(window, 0.95)
+        print(f"\n{'='*60}")
+        print(f"STREAMING ANALYTICS (last {window}s)")
+        print(f"{'='*60}")
+        print(f"Events in window   : {self.count(window)} (total seen: {self.events_seen})")
+        print(f"Casualties (sum)   : {self.casualties(window)}")
+        print(f"Casualties p50/p95 : "
+              f"{'-' if median is None else round(median)} / {'-' if p95 is None else round(p95)}")
+        for field in ('type', 'location', 'severity'):
+            counts = self.breakdown(window, field)
+            summary = ", ".join(f"{value}={counts[value]}" for value in sorted(counts))
+            print(f"By {field:<16}: {summary or '-'}")
+        print(f"{'='*60}\n")
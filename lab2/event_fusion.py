@@ -0,0 +1,217 @@
+"""
+Multi-sensor fusion of disaster reports into incidents.
+
+Several sensors that see the same fire in the same zone each send an
+INFORM. EventFusion joins reports with the same (type, zone) that arrive
+within `window` seconds of the first one into a single incident and
+releases it for dispatch once either
+
+  - its confidence reaches `confidence` (enough independent sensors agree), or
+  - `max_latency` seconds have passed since its first report.
+
+Confidence is a noisy-OR over the sensors that reported it: each of the k
+independent observations is right with probability `reliability`, so the
+incident is real with probability 1 - (1 - reliability) ** k. A sensor
+counts once however often it repeats itself; a coordinator summary counts
+as many observations as its "reports" metadata says.
+
+The merged event keeps the highest severity (and that report's resource
+need), the earliest detection time and the mean casualty estimate. Reports
+that arrive after release are folded in without releasing it again,
+unless they make it worse (a higher severity or casualty estimate than
+was released): then the updated incident is released at once as an
+escalation. The first report after the window opens a new incident, so a
+zone under continuous reports still yields one incident per window.
+
+Each report can carry a receipt (the incident store's report id): a
+released incident lists the receipts it accounts for, and settled()
+hands back those of reports folded into an incident already released.
+
+The join is incremental: one dict lookup per report finds the open
+incident for its key, and two heaps ordered by deadline hand out latency
+releases and expire finished incidents, so the cost per report is
+O(log n) in the number of open incidents.
+"""
+
+import heapq
+import itertools
+import os
+import time
+from dataclasses import dataclass, replace
+
+from agent_metrics import REGISTRY
+
+WINDOW_SECONDS = float(os.environ.get("AGENT_FUSION_WINDOW", "10"))
+MAX_LATENCY_SECONDS = float(os.environ.get("AGENT_FUSION_LATENCY", "2"))
+CONFIDENCE_THRESHOLD = float(os.environ.get("AGENT_FUSION_CONFIDENCE", "0.8"))
+SENSOR_RELIABILITY = float(os.environ.get("AGENT_FUSION_RELIABILITY", "0.6"))
+
+# asyncio runs timers up to a clock tick early; deadlines this close count as due
+CLOCK_SLACK = 1e-6
+
+CONFIDENCE = "confidence"
+LATENCY = "latency"
+ESCALATION = "escalation"
+
+FUSION_REPORTS = REGISTRY.counter(
+    "fusion_reports_total", "Sensor reports joined by event fusion", ("agent",))
+FUSION_INCIDENTS = REGISTRY.counter(
+    "fusion_incidents_total", "Fused incidents released for dispatch", ("agent", "reason"))
+
+
+def report_count(msg):
+    """Sensor reports an INFORM stands for (coordinator summaries carry several)"""
+    try:
+        return max(1, int(msg.get_metadata("reports") or 1))
+    except ValueError:
+        return 1
+
+
+@dataclass(frozen=True, slots=True)
+class FusedIncident:
+    """An incident released for dispatch"""
+
+    event: object
+    confidence: float
+    reports: int
+    sources: tuple
+    reason: str
+    receipts: tuple = ()
+
+
+class _Cluster:
+    """Reports joined into one open incident"""
+
+    __slots__ = ("key", "event", "first", "reports", "casualty_sum", "sources", "released",
+                 "sent_rank", "sent_casualties", "receipts")
+
+    def __init__(self, key, event, now):
+        self.key = key
+        self.event = event
+        self.first = now
+        self.reports = 0
+        self.casualty_sum = 0
+        self.sources = {}
+        self.released = False
+        # Severity rank and casualty estimate of the last release
+        self.sent_rank = -1
+        self.sent_casualties = -1
+        # Receipts of the reports joined since the last release
+        self.receipts = []
+
+    def add(self, event, source, reports):
+        current = self.event
+        if self.reports:
+            worse = event if event.severity.rank > current.severity.rank else current
+            detected = [ns for ns in (current.detected_ns, event.detected_ns) if ns is not None]
+            self.event = replace(worse, timestamp_ns=min(current.timestamp_ns, event.timestamp_ns),
+                                 monotonic_ns=current.monotonic_ns,
+                                 detected_ns=min(detected) if detected else None)
+        self.reports += reports
+        self.casualty_sum += event.casualties * reports
+        self.sources[source] = max(self.sources.get(source, 0), reports)
+
+    def observations(self):
+        return sum(self.sources.values())
+
+    def casualties(self):
+        return round(self.casualty_sum / self.reports)
+
+    def escalated(self):
+        """True if the incident got worse since it was last released"""
+        return self.event.severity.rank > self.sent_rank or self.casualties() > self.sent_casualties
+
+
+class EventFusion:
+    """Windowed join of sensor reports into confidence-scored incidents"""
+
+    def __init__(self, name, window=WINDOW_SECONDS, max_latency=MAX_LATENCY_SECONDS,
+                 confidence=CONFIDENCE_THRESHOLD, reliability=SENSOR_RELIABILITY,
+                 clock=time.monotonic):
+        self.name = name
+        self.window = window
+        self.max_latency = max_latency
+        self.threshold = confidence
+        self.reliability = reliability
+        self.clock = clock
+        self._open = {}
+        self._deadlines = []     # (release_at, seq, cluster)
+        self._expiry = []        # (expire_at, seq, cluster)
+        self._seq = itertools.count()
+        self._settled = []
+        self.released = 0
+
+    def confidence_of(self, observations):
+        return 1 - (1 - self.reliability) ** observations
+
+    def add(self, event, source, reports=1, now=None, receipt=None):
+        """Join one report; returns the FusedIncident if this report released (or escalated) it"""
+        now = self.clock() if now is None else now
+        self._expire(now)
+        FUSION_REPORTS.labels(self.name).inc(reports)
+        key = (event.type, event.location)
+        cluster = self._open.get(key)
+        if cluster is None or now - cluster.first > self.window:
+            cluster = self._open[key] = _Cluster(key, event, now)
+            seq = next(self._seq)
+            heapq.heappush(self._deadlines, (now + self.max_latency, seq, cluster))
+            heapq.heappush(self._expiry, (now + self.window, seq, cluster))
+        cluster.add(event, source, reports)
+        if receipt is not None:
+            cluster.receipts.append(receipt)
+
+        if cluster.released:
+            if cluster.escalated():
+                return self._release(cluster, ESCALATION)
+            self._settled.extend(cluster.receipts)
+            cluster.receipts.clear()
+            return None
+        if self.confidence_of(cluster.observations()) >= self.threshold:
+            return self._release(cluster, CONFIDENCE)
+        return None
+
+    def release_due(self, now=None):
+        """Incidents whose latency deadline has passed, oldest first"""
+        now = self.clock() if now is None else now
+        due = []
+        while self._deadlines and self._deadlines[0][0] <= now + CLOCK_SLACK:
+            _, _, cluster = heapq.heappop(self._deadlines)
+            if not cluster.released:
+                due.append(self._release(cluster, LATENCY))
+        self._expire(now)
+        return due
+
+    def next_timeout(self, limit, now=None):
+        """Seconds until the next latency release, at most `limit`"""
+        now = self.clock() if now is None else now
+        while self._deadlines and self._deadlines[0][2].released:
+            heapq.heappop(self._deadlines)
+        if not self._deadlines:
+            return limit
+        return max(0.0, min(limit, self._deadlines[0][0] - now))
+
+    def pending(self):
+        return sum(1 for cluster in self._open.values() if not cluster.released)
+
+    def settled(self):
+        """Receipts of reports folded into incidents that were already released"""
+        settled, self._settled = self._settled, []
+        return settled
+
+    def _release(self, cluster, reason):
+        cluster.released = True
+        cluster.sent_rank = cluster.event.severity.rank
+        cluster.sent_casualties = cluster.casualties()
+        self.released += 1
+        FUSION_INCIDENTS.labels(self.name, reason).inc()
+        event = replace(cluster.event, casualties=cluster.casualties())
+        receipts, cluster.receipts = tuple(cluster.receipts), []
+        return FusedIncident(event, self.confidence_of(cluster.observations()), cluster.reports,
+                             tuple(cluster.sources), reason, receipts)
+
+    def _expire(self, now):
+        while self._expiry and self._expiry[0][0] < now:
+            _, _, cluster = heapq.heappop(self._expiry)
+            # The key may already belong to a newer cluster
+            if self._open.get(cluster.key) is cluster:
+                del self._open[cluster.key]
@@ -0,0 +1,35 @@
+"""
+Numeric timestamps for events, conditions and messages.
+
+Events and messages carry integer nanosecond timestamps: epoch time
+(`time.time_ns()`) for values that cross process boundaries and monotonic
+time (`time.monotonic_ns()`) for interval math inside one process. Turning
+them into text is left to display code, via format_timestamp().
+"""
+
+import time
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_MS = 1_000_000
+
+now_ns = time.time_ns
+monotonic_ns = time.monotonic_ns
+
+_formatted_second = [None, ""]
+
+
+def format_timestamp(epoch_ns, millis=False):
+    """Render an epoch-ns timestamp as 'YYYY-mm-dd HH:MM:SS[.mmm]' local time"""
+    seconds, remainder = divmod(epoch_ns, NS_PER_SECOND)
+    # Many log lines fall in the same second; only call strftime once for it
+    if _formatted_second[0] != seconds:
+        _formatted_second[0] = seconds
+        _formatted_second[1] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(seconds))
+    if millis:
+        return f"{_formatted_second[1]}.{remainder // NS_PER_MS:03d}"
+    return _formatted_second[1]
+
+
+def elapsed_ms(start_ns, end_ns=None):
+    """Milliseconds between two epoch-ns timestamps (end defaults to now)"""
+    return ((time.time_ns() if end_ns is None else end_ns) - start_ns) / NS_PER_MS
@@ -0,0 +1,268 @@
+"""
+Embedded incident store with crash recovery for rescue agents.
+
+Incidents (the event, its current FSM state and whether it is closed), the
+agent's event log and its response counters are kept in a local SQLite
+database in WAL mode. Writes never run on the event loop: they are queued
+and applied by a writer thread that group-commits everything queued while
+the previous commit was in progress, so bursts of state changes cost one
+fsync instead of one each.
+
+On restart an agent reads back its open incidents and resumes them at
+their last recorded state. At most the writes of the last in-flight batch
+can be lost if the process dies; a caller that must not acknowledge work
+before it is on disk awaits flushed() first.
+
+Reports still waiting in event fusion are recorded too (add_report) and
+removed once the incident they joined is opened (settle_reports), so a
+restarted agent can fuse them again (pending_reports).
+
+Several agents (and processes) can share one database: incident ids are
+numbered per agent. A statement that fails is reported and skipped; the
+rest of its batch is still committed.
+"""
+
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+
+from disaster_models import DisasterEvent
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    agent      TEXT NOT NULL,
+    id         INTEGER NOT NULL,
+    event      TEXT NOT NULL,
+    state      TEXT NOT NULL,
+    opened_at  REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    closed     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (agent, id)
+);
+CREATE INDEX IF NOT EXISTS incidents_open ON incidents (agent, closed);
+CREATE TABLE IF NOT EXISTS counters (
+    agent TEXT NOT NULL,
+    name  TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (agent, name)
+);
+CREATE TABLE IF NOT EXISTS reports (
+    agent       TEXT NOT NULL,
+    id          INTEGER NOT NULL,
+    event       TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    reports     INTEGER NOT NULL,
+    received_at REAL NOT NULL,
+    PRIMARY KEY (agent, id)
+);
+"""
+
+# Version 2 had no reports table; SCHEMA adds it
+SCHEMA_VERSION = 3
+
+# Version 1 numbered incidents across all agents, so two stores sharing a
+# file could hand out the same id
+MIGRATE_V1 = """
+ALTER TABLE incidents RENAME TO incidents_v1;
+DROP INDEX IF EXISTS incidents_open;
+""" + SCHEMA + """
+INSERT INTO incidents (agent, id, event, state, opened_at, updated_at, closed)
+    SELECT agent, id, event, state, opened_at, updated_at, closed FROM incidents_v1;
+DROP TABLE incidents_v1;
+"""
+
+# How long flush() and close() wait for the writer thread
+FLUSH_TIMEOUT = 10.0
+
+_CLOSE = object()
+
+
+class IncidentStore:
+    """Durable incidents, event log and counters for one agent"""
+
+    def __init__(self, path, agent, batch_size=256):
+        self.path = path
+        self.agent = agent
+        self.batch_size = batch_size
+        self.commits = 0
+        self.failed = 0
+
+        self._conn = self._connect()
+        self._migrate()
+        self._next_id = self._max_id("incidents") + 1
+        self._next_report_id = self._max_id("reports") + 1
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="incident-store", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate(self):
+        """Create or upgrade the schema; the write lock keeps other processes out meanwhile"""
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+            existing = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'incidents'").fetchone()
+            for statement in (MIGRATE_V1 if existing and version < 2 else SCHEMA).split(";"):
+                if statement.strip():
+                    self._conn.execute(statement)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _max_id(self, table):
+        row = self._conn.execute(
+            f"SELECT COALESCE(MAX(id), 0) FROM {table} WHERE agent = ?", (self.agent,)).fetchone()
+        return row[0]
+
+    # ── Writes (queued, never block the caller) ──
+
+    def open_incident(self, event, state):
+        """Record a new incident and return its id"""
+        incident_id = self._next_id
+        self._next_id += 1
+        now = time.time()
+        self._queue.put((
+            "INSERT INTO incidents (agent, id, event, state, opened_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.agent, incident_id, event.to_json(), state, now, now)))
+        return incident_id
+
+    def update_state(self, incident_id, state):
+        self._queue.put((
+            "UPDATE incidents SET state = ?, updated_at = ? WHERE agent = ? AND id = ?",
+            (state, time.time(), self.agent, incident_id)))
+
+    def close_incident(self, incident_id, state="CLOSED"):
+        self._queue.put((
+            "UPDATE incidents SET state = ?, updated_at = ?, closed = 1 WHERE agent = ? AND id = ?",
+            (state, time.time(), self.agent, incident_id)))
+
+    def set_counter(self, name, value):
+        self._queue.put((
+            "INSERT INTO counters (agent, name, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (agent, name) DO UPDATE SET value = excluded.value",
+            (self.agent, name, value)))
+
+    def add_report(self, event, source, reports=1):
+        """Record a report waiting in event fusion and return its id"""
+        report_id = self._next_report_id
+        self._next_report_id += 1
+        self._queue.put((
+            "INSERT INTO reports (agent, id, event, source, reports, received_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.agent, report_id, event.to_json(), source, reports, time.time())))
+        return report_id
+
+    def settle_reports(self, report_ids):
+        """Forget reports that an opened incident now accounts for"""
+        if report_ids:
+            self._queue.put((
+                f"DELETE FROM reports WHERE agent = ? AND id IN ({', '.join('?' * len(report_ids))})",
+                (self.agent, *report_ids)))
+
+    def _write_loop(self):
+        # The writer owns its own connection; readers never see half a batch
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            # Group commit: take everything queued while the last commit ran
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            closing = any(op is _CLOSE for op in batch)
+            waiters = [op for op in batch if isinstance(op, threading.Event)]
+            statements = [op for op in batch if op is not _CLOSE and not isinstance(op, threading.Event)]
+            try:
+                self._commit(conn, statements)
+            finally:
+                # Even a failed batch must not leave flush() waiting
+                for waiter in waiters:
+                    waiter.set()
+            if closing:
+                conn.close()
+                return
+
+    def _commit(self, conn, statements):
+        try:
+            with conn:
+                for op in statements:
+                    conn.execute(*op)
+            self.commits += 1
+            return
+        except sqlite3.Error as e:
+            print(f"⚠️  [STORE] Batch of {len(statements)} writes failed ({e}); retrying one by one")
+        # Keep every write but the failing ones
+        for op in statements:
+            try:
+                with conn:
+                    conn.execute(*op)
+                self.commits += 1
+            except sqlite3.Error as e:
+                self.failed += 1
+                print(f"⚠️  [STORE] Dropped write for {self.agent}: {e} ({op[0].split()[0]})")
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Block until every write queued so far is committed; False if that timed out"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    async def flushed(self, timeout=FLUSH_TIMEOUT):
+        """flush() for coroutines: waits in an executor so the event loop keeps running"""
+        committed = await asyncio.get_running_loop().run_in_executor(None, self.flush, timeout)
+        if not committed:
+            print(f"⚠️  [STORE] Writes for {self.agent} not committed within {timeout:g}s")
+        return committed
+
+    def close(self, timeout=FLUSH_TIMEOUT):
+        """Commit pending writes and stop the writer thread"""
+        if self._writer.is_alive():
+            self._queue.put(_CLOSE)
+            self._writer.join(timeout)
+            if self._writer.is_alive():
+                print(f"⚠️  [STORE] Writer for {self.agent} did not finish within {timeout:g}s")
+        self._conn.close()
+
+    # ── Reads (used at startup for recovery) ──
+
+    def open_incidents(self):
+        """Open incidents as (id, event, state), oldest first"""
+        rows = self._conn.execute(
+            "SELECT id, event, state FROM incidents WHERE agent = ? AND closed = 0 ORDER BY id",
+            (self.agent,)).fetchall()
+        return [(incident_id, DisasterEvent.from_json(event), state) for incident_id, event, state in rows]
+
+    def pending_reports(self):
+        """Reports not yet part of an incident, as (id, event, source, reports), oldest first"""
+        rows = self._conn.execute(
+            "SELECT id, event, source, reports FROM reports WHERE agent = ? ORDER BY id",
+            (self.agent,)).fetchall()
+        return [(report_id, DisasterEvent.from_json(event), source, reports)
+                for report_id, event, source, reports in rows]
+
+    def event_log(self, limit=None):
+        """Events of every incident this agent has recorded, oldest first"""
+        sql = "SELECT id, event FROM incidents WHERE agent = ? ORDER BY id DESC"
+        params = (self.agent,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        rows = self._conn.execute(sql, params).fetchall()
+        return [DisasterEvent.from_json(event) for _, event in reversed(rows)]
+
+    def counters(self):
+        rows = self._conn.execute(
+            "SELECT name, value FROM counters WHERE agent = ?", (self.agent,))
+        return dict(rows.fetchall())
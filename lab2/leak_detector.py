@@ -0,0 +1,140 @@
+"""
+Memory soak testing: does an agent run keep memory per event it handles?
+
+LeakDetector takes tracemalloc snapshots during a long run and relates the
+memory still allocated at each one to the number of events handled so far.
+A structure that grows with every event (a list nobody trims, a mailbox
+nobody drains, a cache without a bound) shows up as a steady slope of bytes
+per event; memory that is allocated once (imports, caches that fill and
+stay full) does not.
+
+    detector = LeakDetector()
+    detector.start()
+    ...                                    # every few simulated minutes:
+    detector.snapshot(events, clock.elapsed)
+    report = detector.report()             # report["leak"] is True above threshold
+
+The first snapshot is the baseline, so take it once bounded structures
+have filled up (after the longest analytics window, for instance). The
+report gives:
+
+  - bytes_per_million_events: least-squares slope of retained bytes over
+    events across all snapshots, scaled to a million events
+  - sites: the call sites whose retained memory grew most between the
+    baseline and the last snapshot. A site is the innermost frame in this
+    repository's code, so growth inside json or sqlite3 is charged to the
+    agent code that called it.
+
+A run fails (leak=True) when the slope exceeds `threshold` bytes per million
+events (128 MB by default: 128 bytes kept per event). Runs with
+fewer than MIN_EVENTS events after the baseline are not judged: memory
+moves by a few hundred KB between snapshots anyway, which a few hundred
+events would turn into a large rate.
+"""
+
+import os
+import tracemalloc
+
+LEAK_THRESHOLD = float(os.environ.get("AGENT_LEAK_THRESHOLD", "128e6"))
+TRACE_FRAMES = int(os.environ.get("AGENT_LEAK_FRAMES", "4"))
+MIN_EVENTS = 5000
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Snapshots and their grouping allocate too; leave those out of the totals
+_EXCLUDE = (tracemalloc.Filter(False, tracemalloc.__file__, all_frames=True),
+            tracemalloc.Filter(False, __file__, all_frames=True),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"))
+
+
+def call_site(traceback):
+    """'file:line' of the innermost frame in the repository, else the innermost frame"""
+    frames = list(traceback)
+    for frame in reversed(frames):
+        if frame.filename.startswith(REPO_ROOT):
+            return f"{os.path.relpath(frame.filename, REPO_ROOT)}:{frame.lineno}"
+    frame = frames[-1]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def slope(xs, ys):
+    """Least-squares slope of ys over xs"""
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if spread == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+
+class LeakDetector:
+    """Periodic tracemalloc snapshots of one run, related to the events it handled"""
+
+    def __init__(self, threshold=None, frames=TRACE_FRAMES, top=10):
+        self.threshold = LEAK_THRESHOLD if threshold is None else threshold
+        self.frames = frames
+        self.top = top
+        # (simulated seconds, events, retained bytes) per snapshot
+        self.samples = []
+        self._baseline = None
+        self._latest = None
+        self._started = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started = True
+
+    def stop(self):
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def snapshot(self, events, at=None):
+        """Record retained memory by call site after `events` events"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(_EXCLUDE)
+        sites = {}
+        for stat in snapshot.statistics("traceback"):
+            site = call_site(stat.traceback)
+            size, count = sites.get(site, (0, 0))
+            sites[site] = (size + stat.size, count + stat.count)
+        del snapshot
+        total = sum(size for size, _ in sites.values())
+        self.samples.append((at, events, total))
+        if self._baseline is None:
+            self._baseline = sites
+        self._latest = sites
+        return total
+
+    def report(self):
+        if len(self.samples) < 2:
+            return {"samples": self.samples, "bytes_per_million_events": None,
+                    "threshold": self.threshold, "leak": False, "sites": []}
+        events = self.samples[-1][1] - self.samples[0][1]
+        rate = slope([e for _, e, _ in self.samples], [b for _, _, b in self.samples])
+        per_million = rate * 1e6 if rate is not None and events >= MIN_EVENTS else None
+
+        growth = []
+        for site, (size, count) in self._latest.items():
+            base_size, base_count = self._baseline.get(site, (0, 0))
+            if size > base_size:
+                growth.append((size - base_size, count - base_count, site))
+        growth.sort(reverse=True)
+        sites = [{
+            "site": site,
+            "growth_bytes": size,
+            "growth_blocks": count,
+            "bytes_per_million_events": round(size / events * 1e6) if events else None,
+        } for size, count, site in growth[:self.top]]
+
+        return {
+            "samples": self.samples,
+            "events": events,
+            "retained_growth_bytes": self.samples[-1][2] - self.samples[0][2],
+            "bytes_per_million_events": round(per_million) if per_million is not None else None,
+            "threshold": self.threshold,
+            "leak": per_million is not None and per_million > self.threshold,
+            "sites": sites,
+        }
@@ -0,0 +1,276 @@
+"""
+Load generator: disaster events from configurable arrival processes.
+
+The sensors detect with a fixed chance per cycle, which gives a flat and
+low event rate. For stress-testing the rescue side the generator draws
+arrival times from one of these processes instead (rates are events per
+second):
+
+  poisson   constant rate
+  hawkes    self-exciting Earthquake cascades: every quake triggers on
+            average `branching` aftershocks in the same zone, spread over
+            `decay` seconds, so quakes come in bursts (it settles at its
+            mean rate after a few multiples of decay / (1 - branching))
+  diurnal   rate following a 24-hour cosine curve around its mean, peaking
+            at `peak_hour` (`day` can be shortened to compress a day)
+  step      base rate with surges (start, duration, rate) after the start
+  mixed     half poisson background, half hawkes Earthquakes
+
+An arrival's time is also its detection time: an agent that falls behind
+sends the event late, and the latency it reports includes the delay.
+
+Usage:
+    python load_generator.py hawkes --rate 20000 --seconds 10
+    python load_generator.py step --rate 100 --surge 2:3:50000 --seconds 10
+"""
+
+import argparse
+import heapq
+import math
+import os
+import random
+import time
+from collections import Counter
+
+from disaster_environment import DisasterEnvironment
+from disaster_models import DisasterEvent, DisasterType
+from event_time import now_ns, monotonic_ns, NS_PER_SECOND
+
+LOAD_PROCESS = os.environ.get("AGENT_LOAD_PROCESS", "poisson")
+LOAD_RATE = float(os.environ.get("AGENT_LOAD_RATE", "1"))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ARRIVAL PROCESSES
+# ═══════════════════════════════════════════════════════════════════
+# arrivals(rng, start) yields (time, overrides) in time order, forever;
+# overrides is None or a dict of event fields the process fixes.
+
+class PoissonArrivals:
+    """Constant-rate arrivals"""
+
+    def __init__(self, rate):
+        self.rate = rate
+
+    def arrivals(self, rng, start=0.0):
+        if self.rate <= 0:
+            return
+        t = start
+        while True:
+            t += rng.expovariate(self.rate)
+            yield t, None
+
+
+class StepArrivals:
+    """Base rate with surges of (start, duration, rate), in seconds after the start"""
+
+    def __init__(self, rate, surges=()):
+        self.rate = rate
+        self.surges = tuple(surges)
+
+    def rate_at(self, offset):
+        return max([rate for start, duration, rate in self.surges
+                    if start <= offset < start + duration], default=self.rate)
+
+    def arrivals(self, rng, start=0.0):
+        edges = sorted({0.0} | {s for s, _, _ in self.surges} | {s + d for s, d, _ in self.surges})
+        segments = [(a, b) for a, b in zip(edges, edges[1:] + [math.inf]) if b > a >= 0]
+        t = start
+        for begin, end in segments:
+            rate = self.rate_at(begin)
+            t = max(t, start + begin)
+            if rate <= 0:
+                continue
+            # The exponential gap is memoryless, so it can restart at each edge
+            while True:
+                gap = rng.expovariate(rate)
+                if t + gap >= start + end:
+                    break
+                t += gap
+                yield t, None
+
+
+class DiurnalArrivals:
+    """Rate following a daily cosine curve; `rate` is the daily mean"""
+
+    def __init__(self, rate, amplitude=0.6, peak_hour=18, start_hour=0, day=86400):
+        if not 0 <= amplitude <= 1:
+            raise ValueError("amplitude must be between 0 and 1")
+        self.rate = rate
+        self.amplitude = amplitude
+        self.peak_hour = peak_hour
+        self.start_hour = start_hour
+        self.day = day
+
+    def rate_at(self, offset):
+        hour = self.start_hour + offset * 24 / self.day
+        return self.rate * (1 + self.amplitude * math.cos(2 * math.pi * (hour - self.peak_hour) / 24))
+
+    def arrivals(self, rng, start=0.0):
+        peak = self.rate * (1 + self.amplitude)
+        if peak <= 0:
+            return
+        t = start
+        # Thinning: candidates at the peak rate, kept with probability rate(t) / peak
+        while True:
+            t += rng.expovariate(peak)
+            if rng.random() * peak < self.rate_at(t - start):
+                yield t, None
+
+
+class HawkesArrivals:
+    """Self-exciting Earthquake arrivals: main shocks and their aftershock cascades"""
+
+    def __init__(self, rate, branching=0.7, decay=30.0, locations=None):
+        if not 0 <= branching < 1:
+            raise ValueError("branching must be in [0, 1) for a stable cascade")
+        self.rate = rate
+        self.branching = branching
+        self.decay = decay
+        self.locations = list(locations or DisasterEnvironment().locations)
+
+    def _offspring(self, rng):
+        # Poisson(branching) by multiplying uniforms; branching < 1 keeps it short
+        limit, count, product = math.exp(-self.branching), 0, rng.random()
+        while product > limit:
+            count += 1
+            product *= rng.random()
+        return count
+
+    def arrivals(self, rng, start=0.0):
+        # Main shocks arrive at the background rate; each shock, main or not,
+        # has Poisson(branching) children, so the long-run rate is `rate`
+        background = self.rate * (1 - self.branching)
+        if background <= 0:
+            return
+        pending = []     # (time, seq, zone) of scheduled aftershocks
+        seq = 0
+        next_main = start + rng.expovariate(background)
+        while True:
+            if pending and pending[0][0] < next_main:
+                t, _, zone = heapq.heappop(pending)
+            else:
+                t, zone = next_main, rng.choice(self.locations)
+                next_main += rng.expovariate(background)
+            for _ in range(self._offspring(rng)):
+                seq += 1
+                heapq.heappush(pending, (t + rng.expovariate(1 / self.decay), seq, zone))
+            yield t, {"type": DisasterType.EARTHQUAKE, "location": zone}
+
+
+class MixedArrivals:
+    """Superposition of several arrival processes"""
+
+    def __init__(self, *processes):
+        self.processes = processes
+
+    def arrivals(self, rng, start=0.0):
+        return heapq.merge(*(p.arrivals(rng, start) for p in self.processes), key=lambda a: a[0])
+
+
+def make_process(name=LOAD_PROCESS, rate=LOAD_RATE, **options):
+    """Arrival process by name, with `rate` events per second on average"""
+    if name == "poisson":
+        return PoissonArrivals(rate)
+    if name == "hawkes":
+        return HawkesArrivals(rate, **options)
+    if name == "diurnal":
+        return DiurnalArrivals(rate, **options)
+    if name == "step":
+        options.setdefault("surges", ((60, 60, rate * 10),))
+        return StepArrivals(rate, **options)
+    if name == "mixed":
+        return MixedArrivals(PoissonArrivals(rate / 2), HawkesArrivals(rate / 2, **options))
+    raise ValueError(f"Unknown arrival process {name!r}")
+
+
+PROCESSES = ("poisson", "hawkes", "diurnal", "step", "mixed")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# EVENTS
+# ═══════════════════════════════════════════════════════════════════
+
+class LoadGenerator:
+    """Disaster events from `environment` at the times an arrival process draws"""
+
+    def __init__(self, process, environment=None, seed=None):
+        self.process = process
+        self.environment = environment or DisasterEnvironment()
+        # Without a seed, follow the global random state (seeded by the headless runner)
+        self.rng = random.Random(random.getrandbits(64) if seed is None else seed)
+
+    def schedule(self, start):
+        """(monotonic time, event) pairs from `start` on, each detected at its time"""
+        environment, rng = self.environment, self.rng
+        types, locations = environment.disaster_types, environment.locations
+        severities, resources = environment.severity_levels, environment.resource_types
+        epoch_offset = now_ns() - monotonic_ns()
+        choice, randint = rng.choice, rng.randint
+        for t, overrides in self.process.arrivals(rng, start):
+            at_ns = int(t * NS_PER_SECOND)
+            event = DisasterEvent(
+                type=overrides["type"] if overrides else choice(types),
+                location=overrides["location"] if overrides else choice(locations),
+                severity=choice(severities),
+                casualties=randint(0, 50),
+                resources_needed=choice(resources),
+                timestamp_ns=at_ns + epoch_offset,
+                monotonic_ns=at_ns,
+                detected_ns=at_ns + epoch_offset
+            )
+            yield t, event
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════
+
+def parse_surge(text):
+    start, duration, rate = (float(part) for part in text.split(":"))
+    return start, duration, rate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("process", choices=PROCESSES)
+    parser.add_argument("--rate", type=float, default=20_000, help="mean events per second")
+    parser.add_argument("--seconds", type=float, default=10, help="length of the generated load")
+    parser.add_argument("--surge", type=parse_surge, action="append",
+                        help="step surge as START:DURATION:RATE (repeatable)")
+    parser.add_argument("--day", type=float, help="seconds per simulated day (diurnal)")
+    parser.add_argument("--seed", type=int, default=403)
+    args = parser.parse_args(argv)
+
+    options = {}
+    if args.surge and args.process == "step":
+        options["surges"] = args.surge
+    if args.day and args.process == "diurnal":
+        options["day"] = args.day
+    generator = LoadGenerator(make_process(args.process, args.rate, **options), seed=args.seed)
+
+    per_second = Counter()
+    by_type = Counter()
+    count = 0
+    wall = time.perf_counter()
+    for t, event in generator.schedule(0.0):
+        if t >= args.seconds:
+            break
+        count += 1
+        per_second[int(t)] += 1
+        by_type[event.type] += 1
+    wall = time.perf_counter() - wall
+
+    print(f"\n{'='*60}")
+    print(f"LOAD: {args.process} at {args.rate:,.0f} events/s for {args.seconds:g} s")
+    print(f"{'='*60}")
+    print(f"Events          : {count:,} ({count / args.seconds:,.0f}/s simulated)")
+    print(f"Busiest second  : {max(per_second.values(), default=0):,}")
+    print(f"Quietest second : {min((per_second.get(s, 0) for s in range(int(args.seconds))), default=0):,}")
+    print(f"By type         : " + ", ".join(f"{t}={n:,}" for t, n in by_type.most_common()))
+    print(f"Generated at    : {count / wall:,.0f} events/s wall")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
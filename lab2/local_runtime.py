@@ -0,0 +1,758 @@
+"""
+In-process SPADE runtime on a virtual clock (Labs 2-4).
+
+Runs the lab agents unchanged, without an XMPP server and without waiting
+for real time to pass:
+
+  - VirtualClock: time.time()/time.monotonic() (and their _ns variants)
+    read a simulated clock once install() has been called
+  - VirtualTimeLoop: asyncio event loop on that clock; whenever every task
+    is waiting on a timer the clock jumps straight to the next timer
+    (run_in_executor jobs run inline, so they finish in a fixed order)
+  - LocalTransport: delivers messages between the agents started in this
+    process after a fixed simulated latency, optionally losing a fraction
+  - Agent, CyclicBehaviour, PeriodicBehaviour, OneShotBehaviour,
+    FSMBehaviour, State, Message, Template: the SPADE 3 API the labs use
+
+Agent modules get these classes through agent_runtime with
+AGENT_TRANSPORT=local. The clock must be installed before those modules are
+imported, because several of them bind time.monotonic as a default:
+
+    clock = VirtualClock()
+    clock.install()
+    agent_runtime.configure("local")
+    from multi_agent_communication import SensorAgent
+    run(main(), clock)
+
+Work done between awaits, and in executor jobs, takes no simulated time,
+so a run finishes as fast as the CPU can execute the agents' code. Pass
+start_ns and monotonic_start_ns for runs whose timestamps repeat exactly.
+"""
+
+import asyncio
+import collections
+import logging
+import math
+import random
+import selectors
+import time
+import traceback
+from datetime import datetime, timedelta
+
+logger = logging.getLogger("local_runtime")
+
+NS_PER_SECOND = 1_000_000_000
+
+_PATCHED = ("time", "time_ns", "monotonic", "monotonic_ns")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# VIRTUAL CLOCK
+# ═══════════════════════════════════════════════════════════════════
+
+class VirtualClock:
+    """Simulated wall and monotonic time, starting from the real time unless given"""
+
+    def __init__(self, start_ns=None, monotonic_start_ns=None):
+        self._real = {name: getattr(time, name) for name in _PATCHED}
+        self._epoch_ns = self._real["time_ns"]() if start_ns is None else start_ns
+        self._monotonic_ns = (self._real["monotonic_ns"]() if monotonic_start_ns is None
+                              else monotonic_start_ns)
+        self.elapsed_ns = 0
+        self.installed = False
+
+    @property
+    def elapsed(self):
+        """Simulated seconds since the clock was created"""
+        return self.elapsed_ns / NS_PER_SECOND
+
+    def advance(self, seconds):
+        if seconds > 0:
+            # Round up so a timer is never left a fraction of a nanosecond early
+            self.elapsed_ns += max(1, math.ceil(seconds * NS_PER_SECOND))
+
+    def time_ns(self):
+        return self._epoch_ns + self.elapsed_ns
+
+    def time(self):
+        return self.time_ns() / NS_PER_SECOND
+
+    def monotonic_ns(self):
+        return self._monotonic_ns + self.elapsed_ns
+
+    def monotonic(self):
+        return self.monotonic_ns() / NS_PER_SECOND
+
+    def install(self):
+        """Make the time module read this clock (perf_counter stays real)"""
+        for name in _PATCHED:
+            setattr(time, name, getattr(self, name))
+        self.installed = True
+
+    def uninstall(self):
+        for name, function in self._real.items():
+            setattr(time, name, function)
+        self.installed = False
+
+
+class _VirtualSelector:
+    """Selector that advances the clock instead of sleeping"""
+
+    def __init__(self, selector, clock):
+        self._selector = selector
+        self._clock = clock
+
+    def select(self, timeout=None):
+        ready = self._selector.select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            # No timer is pending: only real I/O or another thread can wake us
+            return self._selector.select(None)
+        self._clock.advance(timeout)
+        return []
+
+    def __getattr__(self, attr):
+        return getattr(self._selector, attr)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Event loop whose timers run on a VirtualClock"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        super().__init__(_VirtualSelector(selectors.DefaultSelector(), clock))
+
+    def time(self):
+        return self.clock.monotonic()
+
+    def run_in_executor(self, executor, func, *args):
+        """Run executor jobs inline: they take no simulated time and finish in call order"""
+        future = self.create_future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def run(main, clock):
+    """Run the coroutine `main` to completion on a VirtualTimeLoop"""
+    loop = VirtualTimeLoop(clock)
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(main)
+    finally:
+        tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MESSAGES
+# ═══════════════════════════════════════════════════════════════════
+
+class JID:
+    """localpart@domain/resource, compared by value like aioxmpp.JID"""
+
+    __slots__ = ("localpart", "domain", "resource")
+
+    def __init__(self, localpart, domain, resource=None):
+        self.localpart = localpart
+        self.domain = domain
+        self.resource = resource
+
+    @classmethod
+    def fromstr(cls, text):
+        bare, _, resource = text.partition("/")
+        localpart, _, domain = bare.rpartition("@")
+        return cls(localpart or None, domain, resource or None)
+
+    def bare(self):
+        return JID(self.localpart, self.domain)
+
+    def __str__(self):
+        text = f"{self.localpart}@{self.domain}" if self.localpart else self.domain
+        return f"{text}/{self.resource}" if self.resource else text
+
+    def __repr__(self):
+        return f"JID({str(self)!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, JID) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+
+class Message:
+    """FIPA-ACL message with SPADE's field checks and matching rules"""
+
+    def __init__(self, to=None, sender=None, body=None, thread=None, metadata=None):
+        self.sent = False
+        self.to = to
+        self.sender = sender
+        self.body = body
+        self.thread = thread
+        if metadata is None:
+            self.metadata = {}
+        else:
+            for key, value in metadata.items():
+                if not isinstance(key, str) or not isinstance(value, str):
+                    raise TypeError("Key and Value of metadata MUST be strings")
+            self.metadata = metadata
+
+    @property
+    def to(self):
+        return self._to
+
+    @to.setter
+    def to(self, jid):
+        if jid is not None and not isinstance(jid, str):
+            raise TypeError("'to' MUST be a string")
+        self._to = JID.fromstr(jid) if jid is not None else None
+
+    @property
+    def sender(self):
+        return self._sender
+
+    @sender.setter
+    def sender(self, jid):
+        if jid is not None and not isinstance(jid, str):
+            raise TypeError("'sender' MUST be a string")
+        self._sender = JID.fromstr(jid) if jid is not None else None
+
+    @property
+    def body(self):
+        return self._body
+
+    @body.setter
+    def body(self, body):
+        if body is not None and not isinstance(body, str):
+            raise TypeError("'body' MUST be a string")
+        self._body = body
+
+    @property
+    def thread(self):
+        return self._thread
+
+    @thread.setter
+    def thread(self, value):
+        if value is not None and not isinstance(value, str):
+            raise TypeError("'thread' MUST be a string")
+        self._thread = value
+
+    def set_metadata(self, key, value):
+        if not isinstance(key, str) or not isinstance(value, str):
+            raise TypeError("'key' and 'value' of metadata MUST be strings")
+        self.metadata[key] = value
+
+    def get_metadata(self, key):
+        return self.metadata.get(key)
+
+    def match(self, message):
+        """True if every field set on this message has the same value in `message`"""
+        if self.to and message.to != self.to:
+            return False
+        if self.sender and message.sender != self.sender:
+            return False
+        if self.body and message.body != self.body:
+            return False
+        if self.thread and message.thread != self.thread:
+            return False
+        for key, value in self.metadata.items():
+            if message.get_metadata(key) != value:
+                return False
+        return True
+
+    @property
+    def id(self):
+        return id(self)
+
+    def __eq__(self, other):
+        return self.match(other)
+
+    __hash__ = None
+
+    def copy(self):
+        """A separate message with the same fields, as a receiver would see it"""
+        return Message(to=str(self.to) if self.to else None,
+                       sender=str(self.sender) if self.sender else None,
+                       body=self.body, thread=self.thread, metadata=dict(self.metadata))
+
+    def make_reply(self):
+        return Message(to=str(self.sender), sender=str(self.to), body=self.body,
+                       thread=self.thread, metadata=self.metadata)
+
+    def __str__(self):
+        return (f"<message to=\"{self.to}\" from=\"{self.sender}\" thread=\"{self.thread}\" "
+                f"metadata={self.metadata}>\n{self.body}\n</message>")
+
+
+class Template(Message):
+    """Message used only to match incoming messages"""
+
+
+# ═══════════════════════════════════════════════════════════════════
+# TRANSPORT
+# ═══════════════════════════════════════════════════════════════════
+
+class LocalTransport:
+    """Routes messages between agents in this process by bare JID"""
+
+    def __init__(self, latency=0.005, loss=0.0, seed=None):
+        self.latency = latency
+        # Fraction of messages silently dropped, to exercise retransmission
+        self.loss = loss
+        self._rng = random.Random(seed)
+        self._agents = {}
+        self._in_flight = collections.deque()
+        self.delivered = 0
+        self.undeliverable = 0
+        self.lost = 0
+        self.errors = []
+
+    def register(self, agent):
+        self._agents[str(agent.jid.bare())] = agent
+
+    def unregister(self, agent):
+        if self._agents.get(str(agent.jid.bare())) is agent:
+            del self._agents[str(agent.jid.bare())]
+
+    @property
+    def agents(self):
+        return list(self._agents.values())
+
+    def send(self, msg):
+        """Deliver a copy of `msg` after the simulated latency (unless it is lost)"""
+        agent = self._agents.get(str(msg.to.bare())) if msg.to else None
+        if agent is None:
+            self.undeliverable += 1
+            logger.warning(f"No local agent for {msg.to}; message dropped")
+            return
+        if self.loss and self._rng.random() < self.loss:
+            self.lost += 1
+            return
+        self.delivered += 1
+        loop = asyncio.get_running_loop()
+        if self.latency > 0:
+            self._in_flight.append((agent, msg.copy()))
+            loop.call_later(self.latency, self._deliver_next)
+        else:
+            loop.call_soon(agent.dispatch, msg.copy())
+
+    def _deliver_next(self):
+        # Timers due at the same moment run in no particular order; deliver
+        # the oldest message, so messages arrive in the order they were sent
+        agent, msg = self._in_flight.popleft()
+        agent.dispatch(msg)
+
+    def behaviour_failed(self, behaviour, error):
+        """Record an exception that killed a behaviour"""
+        self.errors.append(f"{behaviour.agent.jid} {behaviour}: {error!r}")
+
+
+_transport = LocalTransport()
+
+
+def get_transport():
+    return _transport
+
+
+def set_transport(transport):
+    """Use `transport` for agents started from now on"""
+    global _transport
+    _transport = transport
+    return transport
+
+
+# ═══════════════════════════════════════════════════════════════════
+# BEHAVIOURS
+# ═══════════════════════════════════════════════════════════════════
+
+class BehaviourNotFinishedException(Exception):
+    pass
+
+
+class NotValidState(Exception):
+    pass
+
+
+class NotValidTransition(Exception):
+    pass
+
+
+class CyclicBehaviour:
+    """Runs run() repeatedly until killed"""
+
+    def __init__(self):
+        self.agent = None
+        self.template = None
+        self._killed = False
+        self._is_done = None
+        self._exit_code = 0
+        self.presence = None
+        self.web = None
+        self.is_running = False
+        self.queue = None
+
+    def set_agent(self, agent):
+        self.agent = agent
+        self._is_done = asyncio.Event()
+        self._is_done.set()
+        self.queue = asyncio.Queue()
+
+    def set_template(self, template):
+        self.template = template
+
+    def match(self, message):
+        if self.template:
+            return self.template.match(message)
+        return True
+
+    def set(self, name, value):
+        self.agent.set(name, value)
+
+    def get(self, name):
+        return self.agent.get(name)
+
+    def start(self):
+        self.agent.submit(self._start())
+        self.is_running = True
+
+    async def _start(self):
+        await self.agent._alive.wait()
+        try:
+            await self.on_start()
+        except Exception as e:
+            self._failed(e)
+        await self._step()
+        self._is_done.clear()
+
+    def kill(self, exit_code=None):
+        self._killed = True
+        if exit_code is not None:
+            self._exit_code = exit_code
+
+    def is_killed(self):
+        return self._killed
+
+    @property
+    def exit_code(self):
+        if self._done() or self.is_killed():
+            return self._exit_code
+        raise BehaviourNotFinishedException
+
+    @exit_code.setter
+    def exit_code(self, value):
+        self._exit_code = value
+
+    def _done(self):
+        return False
+
+    def is_done(self):
+        return not self._is_done.is_set()
+
+    async def join(self, timeout=None):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        while not self.is_done():
+            await asyncio.sleep(0.001)
+            if timeout is not None and loop.time() - start > timeout:
+                raise TimeoutError
+
+    async def on_start(self):
+        pass
+
+    async def on_end(self):
+        pass
+
+    async def run(self):
+        raise NotImplementedError
+
+    async def _run(self):
+        await self.run()
+
+    def _failed(self, error):
+        logger.error(f"Exception in behaviour {self}: {error!r}\n{traceback.format_exc()}")
+        self.agent.transport.behaviour_failed(self, error)
+        self.kill(exit_code=error)
+
+    async def _step(self):
+        cancelled = False
+        while not self._done() and not self.is_killed():
+            try:
+                await self._run()
+                await asyncio.sleep(0)  # relinquish cpu
+            except asyncio.CancelledError:
+                cancelled = True
+                break
+            except Exception as e:
+                self._failed(e)
+        try:
+            if not cancelled:
+                await self.on_end()
+        except Exception as e:
+            self._failed(e)
+        self.is_running = False
+        if self.agent.has_behaviour(self):
+            self.agent.remove_behaviour(self)
+
+    async def enqueue(self, message):
+        self.queue.put_nowait(message)
+
+    def mailbox_size(self):
+        return self.queue.qsize()
+
+    async def send(self, msg):
+        if not msg.sender:
+            msg.sender = str(self.agent.jid)
+        self.agent.transport.send(msg)
+        msg.sent = True
+
+    async def receive(self, timeout=None):
+        if timeout:
+            try:
+                return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    def __str__(self):
+        bases = "/".join(base.__name__ for base in self.__class__.__bases__)
+        return f"{bases}/{self.__class__.__name__}"
+
+
+class OneShotBehaviour(CyclicBehaviour):
+    """Runs run() once"""
+
+    def __init__(self):
+        super().__init__()
+        self._already_executed = False
+
+    def _done(self):
+        if not self._already_executed:
+            self._already_executed = True
+            return False
+        return True
+
+
+class PeriodicBehaviour(CyclicBehaviour):
+    """Runs run() every `period` seconds of loop time"""
+
+    def __init__(self, period, start_at=None):
+        super().__init__()
+        self._period = None
+        self.period = period
+        self._start_at = start_at
+        self._next_activation = None
+
+    @property
+    def period(self):
+        return self._period
+
+    @period.setter
+    def period(self, value):
+        if value < 0:
+            raise ValueError("Period must be greater or equal than zero.")
+        self._period = timedelta(seconds=value)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        if self._next_activation is None:
+            delay = 0
+            if self._start_at is not None:
+                delay = (self._start_at - datetime.fromtimestamp(time.time())).total_seconds()
+            self._next_activation = loop.time() + max(delay, 0)
+
+        if loop.time() >= self._next_activation:
+            await self.run()
+            period = self._period.total_seconds()
+            if period <= 0:
+                self._next_activation = loop.time()
+            else:
+                while self._next_activation <= loop.time():
+                    self._next_activation += period
+        else:
+            await asyncio.sleep(self._next_activation - loop.time())
+
+
+class TimeoutBehaviour(OneShotBehaviour):
+    """Runs run() once at `start_at`"""
+
+    def __init__(self, start_at):
+        super().__init__()
+        self._timeout = start_at
+        self._timeout_triggered = False
+
+    async def _run(self):
+        seconds = (self._timeout - datetime.fromtimestamp(time.time())).total_seconds()
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+        await self.run()
+        self._timeout_triggered = True
+
+    def _done(self):
+        return self._timeout_triggered
+
+
+class State(OneShotBehaviour):
+    """One state of an FSMBehaviour"""
+
+    def __init__(self):
+        super().__init__()
+        self.next_state = None
+
+    def set_next_state(self, state_name):
+        self.next_state = state_name
+
+
+class FSMBehaviour(CyclicBehaviour):
+    """Runs one State per cycle and follows its set_next_state()"""
+
+    def __init__(self):
+        super().__init__()
+        self._states = {}
+        self._transitions = collections.defaultdict(list)
+        self.current_state = None
+        self.setup()
+
+    def setup(self):
+        pass
+
+    def add_state(self, name, state, initial=False):
+        if not isinstance(state, State):
+            raise AttributeError("state must be subclass of spade.behaviour.State")
+        self._states[name] = state
+        if initial:
+            self.current_state = name
+
+    def get_state(self, name):
+        return self._states[name]
+
+    def get_states(self):
+        return self._states
+
+    def add_transition(self, source, dest):
+        self._transitions[source].append(dest)
+
+    def is_valid_transition(self, source, dest):
+        if dest not in self._states or source not in self._states:
+            raise NotValidState
+        if dest not in self._transitions[source]:
+            raise NotValidTransition
+        return True
+
+    async def _run(self):
+        behaviour = self._states[self.current_state]
+        behaviour.set_agent(self.agent)
+        behaviour.receive = self.receive
+        behaviour.next_state = None
+        await behaviour.on_start()
+        await behaviour.run()
+        await behaviour.on_end()
+        dest = behaviour.next_state
+        behaviour._is_done.clear()
+        if dest and self.is_valid_transition(self.current_state, dest):
+            self.current_state = dest
+        elif not dest:
+            self.kill()
+
+    async def run(self):
+        raise RuntimeError
+
+
+# ═══════════════════════════════════════════════════════════════════
+# AGENT
+# ═══════════════════════════════════════════════════════════════════
+
+class Agent:
+    """SPADE-compatible agent attached to the local transport"""
+
+    def __init__(self, jid, password, verify_security=False):
+        self.jid = JID.fromstr(jid)
+        self.password = password
+        self.verify_security = verify_security
+        self.behaviours = []
+        self._values = {}
+        self.presence = None
+        self.web = None
+        self.loop = None
+        self.transport = None
+        self._alive = asyncio.Event()
+
+    async def start(self, auto_register=True):
+        self.loop = asyncio.get_running_loop()
+        self.transport = get_transport()
+        self.transport.register(self)
+        await self.setup()
+        self._alive.set()
+        for behaviour in self.behaviours:
+            if not behaviour.is_running:
+                behaviour.set_agent(self)
+                if isinstance(behaviour, FSMBehaviour):
+                    for state in behaviour.get_states().values():
+                        state.set_agent(self)
+                behaviour.start()
+
+    async def setup(self):
+        pass
+
+    @property
+    def name(self):
+        return self.jid.localpart
+
+    def submit(self, coro):
+        return asyncio.create_task(coro)
+
+    def add_behaviour(self, behaviour, template=None):
+        behaviour.set_agent(self)
+        if isinstance(behaviour, FSMBehaviour):
+            for state in behaviour.get_states().values():
+                state.set_agent(self)
+        behaviour.set_template(template)
+        self.behaviours.append(behaviour)
+        if self.is_alive():
+            behaviour.start()
+
+    def remove_behaviour(self, behaviour):
+        if not self.has_behaviour(behaviour):
+            raise ValueError("This behaviour is not registered")
+        index = self.behaviours.index(behaviour)
+        self.behaviours[index].kill()
+        self.behaviours.pop(index)
+
+    def has_behaviour(self, behaviour):
+        return behaviour in self.behaviours
+
+    async def stop(self):
+        for behaviour in self.behaviours:
+            behaviour.kill()
+        if self.transport is not None:
+            self.transport.unregister(self)
+        self._alive.clear()
+
+    def is_alive(self):
+        return self._alive.is_set()
+
+    def set(self, name, value):
+        self._values[name] = value
+
+    def get(self, name):
+        return self._values.get(name)
+
+    def dispatch(self, msg):
+        """Queue an incoming message for every behaviour whose template matches"""
+        tasks = []
+        for behaviour in [b for b in self.behaviours if b.match(msg)]:
+            tasks.append(self.submit(behaviour.enqueue(msg)))
+        if not tasks:
+            logger.warning(f"No behaviour matched for message: {msg}")
+        return tasks
@@ -0,0 +1,136 @@
+"""
+Rescue teams and their availability for dispatch.
+
+Each team provides one capability (a Resource), has a position (a depot,
+or the zone of its last incident) and is busy until some time on the
+agent's clock. Teams are kept in one min-heap per (capability, position),
+ordered by busy-until, so the earliest free team at every position is on
+top of its heap.
+
+To choose a team the fleet peeks at the top of each heap for the needed
+capability and takes the team that can arrive first:
+
+    max(busy_until, now) + driving time from its position
+
+There is at most one heap per capability and road-network node, so a
+lookup is a handful of peeks plus one pop and one push: O(log n) in the
+number of teams. After an incident the team stays in that zone and is
+available from there.
+"""
+
+import heapq
+import itertools
+import math
+import os
+import time
+from dataclasses import dataclass
+
+from disaster_models import Resource
+from road_network import minutes_to_seconds
+
+FLEET_SIZE = int(os.environ.get("AGENT_FLEET_SIZE", "12"))
+
+
+class Team:
+    """Mutable state of one rescue team"""
+
+    __slots__ = ("team_id", "capability", "position", "busy_until")
+
+    def __init__(self, team_id, capability, position, busy_until=0.0):
+        self.team_id = team_id
+        self.capability = capability
+        self.position = position
+        self.busy_until = busy_until
+
+
+@dataclass(frozen=True, slots=True)
+class Assignment:
+    """A team reserved for one incident; times are on the fleet's clock"""
+
+    team_id: str
+    capability: Resource
+    origin: str
+    path: tuple
+    travel_minutes: float
+    on_scene_minutes: float
+    depart_at: float
+    arrive_at: float
+    done_at: float
+
+
+class RescueFleet:
+    """Rescue teams indexed by capability, position and busy-until time"""
+
+    def __init__(self, roads, clock=time.monotonic):
+        self.roads = roads
+        self.clock = clock
+        self.teams = {}
+        # capability -> {position: [(busy_until, seq, team), ...]}
+        self._heaps = {}
+        self._seq = itertools.count()
+        self.assigned = 0
+        self.unassigned = 0
+
+    @classmethod
+    def default(cls, roads, size=FLEET_SIZE, **kwargs):
+        """`size` teams, capabilities taken in turn, spread over the depots"""
+        fleet = cls(roads, **kwargs)
+        capabilities = list(Resource)
+        for i in range(size):
+            depot = roads.depots[(i // len(capabilities)) % len(roads.depots)]
+            fleet.add_team(f"team-{i + 1}", capabilities[i % len(capabilities)], depot)
+        return fleet
+
+    def add_team(self, team_id, capability, position, busy_until=0.0):
+        team = self.teams[team_id] = Team(team_id, capability, position, busy_until)
+        self._push(team)
+        return team
+
+    def _push(self, team):
+        heap = self._heaps.setdefault(team.capability, {}).setdefault(team.position, [])
+        heapq.heappush(heap, (team.busy_until, next(self._seq), team))
+
+    def assign(self, event, now=None):
+        """Reserve the capable team that can reach the event first; None if none can"""
+        now = self.clock() if now is None else now
+        capability = event.resources_needed
+        best = None
+        for position, heap in self._heaps.get(capability, {}).items():
+            if not heap:
+                continue
+            minutes = self.roads.travel_minutes(position, event.location)
+            if minutes == math.inf:
+                continue
+            arrive_at = max(heap[0][0], now) + minutes_to_seconds(minutes)
+            if best is None or arrive_at < best[0]:
+                best = (arrive_at, position, minutes)
+        if best is None:
+            self.unassigned += 1
+            return None
+
+        arrive_at, position, minutes = best
+        _, _, team = heapq.heappop(self._heaps[capability][position])
+        on_scene = self.roads.on_scene_minutes(event)
+        assignment = Assignment(
+            team_id=team.team_id,
+            capability=capability,
+            origin=position,
+            path=self.roads.paths.path(position, event.location),
+            travel_minutes=minutes,
+            on_scene_minutes=on_scene,
+            depart_at=max(team.busy_until, now),
+            arrive_at=arrive_at,
+            done_at=arrive_at + minutes_to_seconds(on_scene)
+        )
+        team.position = event.location
+        team.busy_until = assignment.done_at
+        self._push(team)
+        self.assigned += 1
+        return assignment
+
+    def available(self, now=None):
+        """Teams free right now, by capability"""
+        now = self.clock() if now is None else now
+        return {capability: sum(1 for heap in positions.values() for busy_until, _, _ in heap
+                                if busy_until <= now)
+                for capability, positions in self._heaps.items()}
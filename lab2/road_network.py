@@ -0,0 +1,217 @@
+"""
+Road network and travel-time model for rescue dispatch.
+
+Depots and zones are joined by roads with a base driving time in minutes.
+Each road runs through one zone, and that zone's conditions scale its cost:
+restricted access and poor visibility slow traffic, high wind slows it
+further, and a blocked zone closes its roads altogether.
+
+ShortestPaths keeps all-pairs shortest paths (one Dijkstra tree per
+source). When a road's cost changes only the trees that can be affected
+are rebuilt:
+  - a road gets slower or closes: the sources whose tree uses that road
+  - a road gets faster or reopens: the sources for which it now shortens
+    the way to one of its ends
+Every other cached path is still shortest and is kept as is.
+
+Durations are in simulated minutes; AGENT_SECONDS_PER_MINUTE (default 0.05)
+converts them to the seconds the agents actually wait.
+"""
+
+import heapq
+import math
+import os
+from dataclasses import dataclass
+
+from disaster_models import Severity, Visibility, Accessibility
+
+SECONDS_PER_MINUTE = float(os.environ.get("AGENT_SECONDS_PER_MINUTE", "0.05"))
+
+DEPOTS = ("Depot North", "Depot South")
+
+# (end, end, base minutes, zone the road runs through)
+ROADS = (
+    ("Depot North", "Zone A", 8, "Zone A"),
+    ("Depot North", "Zone B", 12, "Zone B"),
+    ("Zone A", "Zone B", 6, "Zone A"),
+    ("Zone A", "Zone C", 10, "Zone C"),
+    ("Zone B", "Zone C", 7, "Zone B"),
+    ("Zone B", "Zone D", 9, "Zone D"),
+    ("Zone C", "Zone D", 5, "Zone C"),
+    ("Zone C", "Zone E", 11, "Zone E"),
+    ("Zone D", "Zone E", 6, "Zone D"),
+    ("Depot South", "Zone D", 7, "Zone D"),
+    ("Depot South", "Zone E", 9, "Zone E"),
+)
+
+ACCESS_FACTOR = {Accessibility.NORMAL: 1.0, Accessibility.RESTRICTED: 1.8, Accessibility.BLOCKED: math.inf}
+VISIBILITY_FACTOR = {Visibility.CLEAR: 1.0, Visibility.MODERATE: 1.2, Visibility.POOR: 1.5}
+HIGH_WIND_KMH = 60
+HIGH_WIND_FACTOR = 1.25
+
+# Time on scene before the team heads back
+ON_SCENE_MINUTES = {Severity.LOW: 10, Severity.MEDIUM: 20, Severity.HIGH: 35, Severity.CRITICAL: 60}
+MINUTES_PER_CASUALTY = 0.5
+
+
+def conditions_factor(conditions):
+    """Weather slowdown for travel and work in one zone (1.0 = normal)"""
+    factor = VISIBILITY_FACTOR[conditions.visibility]
+    if conditions.wind_speed >= HIGH_WIND_KMH:
+        factor *= HIGH_WIND_FACTOR
+    return factor
+
+
+def road_cost(base_minutes, conditions):
+    """Minutes to drive a road under the conditions of its zone (inf when blocked)"""
+    return base_minutes * ACCESS_FACTOR[conditions.accessibility] * conditions_factor(conditions)
+
+
+def minutes_to_seconds(minutes):
+    return minutes * SECONDS_PER_MINUTE
+
+
+@dataclass(frozen=True, slots=True)
+class Route:
+    """Fastest way from a depot to a zone"""
+
+    depot: str
+    path: tuple
+    minutes: float
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ALL-PAIRS SHORTEST PATHS
+# ═══════════════════════════════════════════════════════════════════
+
+class ShortestPaths:
+    """All-pairs shortest paths over an undirected graph, updated per edge"""
+
+    def __init__(self, nodes, edges=()):
+        self.nodes = list(nodes)
+        self._adjacent = {node: {} for node in self.nodes}
+        for a, b, cost in edges:
+            if cost != math.inf:
+                self._adjacent[a][b] = self._adjacent[b][a] = cost
+        self.dist = {}
+        self.pred = {}
+        self.rebuilt = 0
+        for source in self.nodes:
+            self._dijkstra(source)
+
+    def _dijkstra(self, source):
+        dist = {source: 0.0}
+        pred = {}
+        heap = [(0.0, source)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            for neighbour, cost in self._adjacent[node].items():
+                candidate = d + cost
+                if candidate < dist.get(neighbour, math.inf):
+                    dist[neighbour] = candidate
+                    pred[neighbour] = node
+                    heapq.heappush(heap, (candidate, neighbour))
+        self.dist[source] = dist
+        self.pred[source] = pred
+        self.rebuilt += 1
+
+    def cost(self, a, b):
+        return self._adjacent[a].get(b, math.inf)
+
+    def set_cost(self, a, b, cost):
+        """Change one edge (inf closes it); returns the sources whose paths were rebuilt"""
+        old = self.cost(a, b)
+        if cost == old:
+            return []
+        if cost > old:
+            # Only trees that route over this edge can get worse
+            affected = [s for s in self.nodes
+                        if self.pred[s].get(b) == a or self.pred[s].get(a) == b]
+        else:
+            # Only sources that now reach one end faster through the other can improve
+            affected = [s for s in self.nodes
+                        if self.dist[s].get(a, math.inf) + cost < self.dist[s].get(b, math.inf)
+                        or self.dist[s].get(b, math.inf) + cost < self.dist[s].get(a, math.inf)]
+
+        if cost == math.inf:
+            del self._adjacent[a][b], self._adjacent[b][a]
+        else:
+            self._adjacent[a][b] = self._adjacent[b][a] = cost
+        for source in affected:
+            self._dijkstra(source)
+        return affected
+
+    def distance(self, source, target):
+        return self.dist[source].get(target, math.inf)
+
+    def path(self, source, target):
+        """Nodes from source to target, or None when target is unreachable"""
+        if target not in self.dist[source]:
+            return None
+        path = [target]
+        pred = self.pred[source]
+        while path[-1] != source:
+            path.append(pred[path[-1]])
+        return tuple(reversed(path))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ROAD NETWORK
+# ═══════════════════════════════════════════════════════════════════
+
+class RoadNetwork:
+    """Travel and response times between depots and zones under current conditions"""
+
+    def __init__(self, conditions, roads=ROADS, depots=DEPOTS):
+        self.conditions = conditions
+        self.roads = roads
+        self.depots = depots
+        nodes = list(depots) + sorted({end for road in roads for end in road[:2]} - set(depots))
+        self.paths = ShortestPaths(nodes, self._costs())
+        self._ticks = conditions.ticks
+        self.updates = 0
+
+    def _costs(self):
+        return [(a, b, road_cost(base, self.conditions.get(zone))) for a, b, base, zone in self.roads]
+
+    def refresh(self):
+        """Apply condition changes since the last call, one road at a time"""
+        self.conditions.get()   # brings the lazily updated model up to date
+        if self.conditions.ticks == self._ticks:
+            return
+        self._ticks = self.conditions.ticks
+        for a, b, cost in self._costs():
+            if self.paths.set_cost(a, b, cost):
+                self.updates += 1
+
+    def route(self, zone):
+        """Fastest open route from any depot to `zone`, or None if every road in is closed"""
+        self.refresh()
+        depot = min(self.depots, key=lambda d: self.paths.distance(d, zone))
+        minutes = self.paths.distance(depot, zone)
+        if minutes == math.inf:
+            return None
+        return Route(depot, self.paths.path(depot, zone), minutes)
+
+    def travel_minutes(self, origin, zone):
+        """Driving time from any node to `zone` (inf if no road is open)"""
+        self.refresh()
+        return self.paths.distance(origin, zone)
+
+    def on_scene_minutes(self, event):
+        """Time a team spends at the incident, slower in bad weather"""
+        return ((ON_SCENE_MINUTES[event.severity] + MINUTES_PER_CASUALTY * event.casualties)
+                * conditions_factor(self.conditions.get(event.location)))
+
+
+_shared = {}
+
+
+def shared_road_network(conditions):
+    """One RoadNetwork per conditions service, shared by every agent in the process"""
+    network = _shared.get(id(conditions))
+    if network is None:
+        network = _shared[id(conditions)] = RoadNetwork(conditions)
+    return network
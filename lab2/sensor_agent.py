@@ -1,8 +1,10 @@
 import asyncio
-from spade.agent import Agent
-from spade.behaviour import PeriodicBehaviour
+from agent_runtime import Agent, PeriodicBehaviour
 from datetime import datetime
-from disaster_environment import DisasterEnvironment
+from agent_metrics import PERCEPTION_CYCLES, DISASTERS_DETECTED, HANDLER_LATENCY, start_metrics_server
+from behaviour_profiler import maybe_profile
+from adaptive_sampling import AdaptiveSampler
+from event_time import now_ns, format_timestamp
 
 class SensorAgent(Agent):
     """Agent that monitors and detects disaster events"""
@@ -14,55 +16,64 @@ class SensorAgent(Agent):
             print(f"\n{'='*60}")
             print(f"SensorAgent starting perception at {datetime.now()}")
             print(f"{'='*60}\n")
-            self.environment = DisasterEnvironment()
+            self.environment = self.agent.environment
+            self.sampler = AdaptiveSampler(self.period.total_seconds())
             self.event_count = 0
             
         async def run(self):
             """Perceive environment and detect events"""
             self.event_count += 1
+            agent_name = str(self.agent.jid)
+            PERCEPTION_CYCLES.labels(agent_name).inc()
             
             print(f"\n--- Perception Cycle {self.event_count} ---")
             
             # Get environmental conditions
             conditions = self.environment.get_environmental_conditions()
             print(f"\n[ENVIRONMENTAL CONDITIONS]")
-            print(f"Timestamp: {conditions['timestamp']}")
-            print(f"Temperature: {conditions['temperature']}°C")
-            print(f"Wind Speed: {conditions['wind_speed']} km/h")
-            print(f"Visibility: {conditions['visibility']}")
-            print(f"Accessibility: {conditions['accessibility']}")
+            print(f"Timestamp: {format_timestamp(conditions.timestamp_ns)}")
+            print(f"Temperature: {conditions.temperature}°C")
+            print(f"Wind Speed: {conditions.wind_speed} km/h")
+            print(f"Visibility: {conditions.visibility}")
+            print(f"Accessibility: {conditions.accessibility}")
             
-            # Detect disaster events (30% probability)
+            # Detect disaster events (30% probability per 5s base period)
             import random
-            if random.random() < 0.3:
+            event = None
+            if random.random() < self.sampler.detection_chance(0.3):
                 event = self.environment.generate_disaster_event()
-                self.log_disaster_event(event)
+                event = event.detected(now_ns())
+                DISASTERS_DETECTED.labels(agent_name, event.type, event.severity).inc()
+                with HANDLER_LATENCY.labels(agent_name, "log_disaster_event").time():
+                    self.log_disaster_event(event)
             else:
                 print("\n[STATUS] No disaster detected - All clear")
             
+            self.sampler.adjust(self, [conditions], event)
             print(f"\n{'-'*60}\n")
             
         def log_disaster_event(self, event):
             """Log detected disaster event"""
             print(f"\n🚨 [DISASTER DETECTED] 🚨")
-            print(f"Timestamp: {event['timestamp']}")
-            print(f"Type: {event['type']}")
-            print(f"Location: {event['location']}")
-            print(f"Severity: {event['severity']}")
-            print(f"Estimated Casualties: {event['casualties']}")
-            print(f"Resources Needed: {event['resources_needed']}")
+            timestamp = format_timestamp(event.timestamp_ns)
+            print(f"Timestamp: {timestamp}")
+            print(f"Type: {event.type}")
+            print(f"Location: {event.location}")
+            print(f"Severity: {event.severity}")
+            print(f"Estimated Casualties: {event.casualties}")
+            print(f"Resources Needed: {event.resources_needed}")
             
             # Write to log file
             with open('disaster_events.log', 'a') as f:
                 f.write(f"\n{'='*60}\n")
                 f.write(f"DISASTER EVENT LOG\n")
                 f.write(f"{'='*60}\n")
-                f.write(f"Timestamp: {event['timestamp']}\n")
-                f.write(f"Type: {event['type']}\n")
-                f.write(f"Location: {event['location']}\n")
-                f.write(f"Severity: {event['severity']}\n")
-                f.write(f"Casualties: {event['casualties']}\n")
-                f.write(f"Resources Needed: {event['resources_needed']}\n")
+                f.write(f"Timestamp: {timestamp}\n")
+                f.write(f"Type: {event.type}\n")
+                f.write(f"Location: {event.location}\n")
+                f.write(f"Severity: {event.severity}\n")
+                f.write(f"Casualties: {event.casualties}\n")
+                f.write(f"Resources Needed: {event.resources_needed}\n")
                 f.write(f"{'='*60}\n\n")
                 
         async def on_end(self):
@@ -72,7 +83,7 @@ class SensorAgent(Agent):
     
     async def setup(self):
         print(f"\nSensorAgent {self.jid} initializing...")
-        # Run perception every 5 seconds
+        # Run perception every 5 seconds, adapted to risk by the sampler
         perception = self.PerceptionBehaviour(period=5)
         self.add_behaviour(perception)
 
@@ -82,7 +93,9 @@ async def main():
     agent_password = "password123"
     
     sensor = SensorAgent(agent_jid, agent_password)
+    await start_metrics_server()
     await sensor.start()
+    maybe_profile(sensor)
     
     print("\nSensorAgent is monitoring the environment...")
     print("Press Ctrl+C to stop\n")
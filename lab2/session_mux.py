@@ -0,0 +1,251 @@
+"""
+Many logical agents over one client session.
+
+With the xmpp transport every agent logs in with its own XMPP session: one
+socket, TLS handshake and stream per agent. In multiplexing mode
+(AGENT_TRANSPORT=mux) the agents of a process share a single session and
+are told apart by the resource of their JID:
+
+    labhost@localhost/kwasisensoragent1    labhost@localhost/kwasirescueagent1
+                  \\                              /
+                   one session "labhost@localhost"  ---- server ---- other sessions
+
+  - MuxTransport plugs into local_runtime's agents like LocalTransport.
+    A message to another resource of the same session is handed over in
+    process; anything else goes over the session, and incoming messages
+    are routed to the agent named by their resource.
+  - SessionClient is the session: one TCP connection and one login.
+  - StandInServer routes messages between sessions by bare JID, as an XMPP
+    server does, so the mode can be run and measured without one. Frames
+    are a 4-byte length followed by the message as JSON.
+
+Run a stand-in server with:
+    python session_mux.py serve --port 5999
+and in the agents' process:
+    AGENT_TRANSPORT=mux AGENT_MUX_SERVER=127.0.0.1:5999 ...
+    transport = await open_session()
+    RescueAgent(transport.address("kwasirescueagent1"), "rescue123")
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import struct
+
+from local_runtime import JID, Message, set_transport
+
+MUX_SERVER = os.environ.get("AGENT_MUX_SERVER", "127.0.0.1:5999")
+MUX_JID = os.environ.get("AGENT_MUX_JID", "labhost@localhost")
+
+_LENGTH = struct.Struct(">I")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# FRAMES
+# ═══════════════════════════════════════════════════════════════════
+
+def write_frame(writer, frame):
+    data = json.dumps(frame, separators=(",", ":")).encode()
+    writer.write(_LENGTH.pack(len(data)) + data)
+
+
+async def read_frame(reader):
+    """Next frame from `reader`, or None once the connection is closed"""
+    try:
+        header = await reader.readexactly(_LENGTH.size)
+        return json.loads(await reader.readexactly(_LENGTH.unpack(header)[0]))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+
+def message_to_frame(msg):
+    return {"to": str(msg.to), "from": str(msg.sender) if msg.sender else None,
+            "body": msg.body, "thread": msg.thread, "metadata": msg.metadata}
+
+
+def frame_to_message(frame):
+    return Message(to=frame["to"], sender=frame.get("from"), body=frame.get("body"),
+                   thread=frame.get("thread"), metadata=frame.get("metadata") or {})
+
+
+def bare(jid):
+    return str(JID.fromstr(jid).bare())
+
+
+def parse_server(text=MUX_SERVER):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# STAND-IN SERVER
+# ═══════════════════════════════════════════════════════════════════
+
+class StandInServer:
+    """Routes frames between logged-in sessions by bare JID"""
+
+    def __init__(self, handshake_ms=0):
+        # Extra delay before a login is accepted, to stand in for TLS and SASL
+        self.handshake = handshake_ms / 1000
+        self.sessions = {}
+        self.routed = 0
+        self.dropped = 0
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self._serve, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        login = await read_frame(reader)
+        if not login or "login" not in login:
+            writer.close()
+            return
+        if self.handshake:
+            await asyncio.sleep(self.handshake)
+        session = bare(login["login"])
+        self.sessions[session] = writer
+        write_frame(writer, {"bound": login["login"]})
+        try:
+            while (frame := await read_frame(reader)) is not None:
+                target = self.sessions.get(bare(frame["to"]))
+                if target is None:
+                    self.dropped += 1
+                    continue
+                write_frame(target, frame)
+                self.routed += 1
+        finally:
+            if self.sessions.get(session) is writer:
+                del self.sessions[session]
+            writer.close()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CLIENT SESSION AND TRANSPORT
+# ═══════════════════════════════════════════════════════════════════
+
+class SessionClient:
+    """One logged-in connection to the server"""
+
+    def __init__(self, jid, password, host=None, port=None):
+        self.jid = jid
+        self.password = password
+        self.host, self.port = (host, port) if port is not None else parse_server()
+        self.on_frame = None
+        self._writer = None
+        self._reader_task = None
+
+    async def connect(self):
+        reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        write_frame(self._writer, {"login": self.jid, "password": self.password})
+        reply = await read_frame(reader)
+        if not reply or "bound" not in reply:
+            raise ConnectionError(f"Login as {self.jid} was refused")
+        self._reader_task = asyncio.create_task(self._read(reader))
+        return self
+
+    async def _read(self, reader):
+        while (frame := await read_frame(reader)) is not None:
+            if self.on_frame is not None:
+                self.on_frame(frame)
+
+    def send(self, frame):
+        write_frame(self._writer, frame)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+
+
+class MuxTransport:
+    """local_runtime transport for agents that are resources of one session"""
+
+    def __init__(self, client):
+        self.client = client
+        client.on_frame = self._receive
+        self.session = bare(client.jid)
+        self._agents = {}
+        self.delivered = 0
+        self.undeliverable = 0
+        self.errors = []
+
+    def address(self, name):
+        """JID of the logical agent `name` on this session"""
+        return f"{self.session}/{name}"
+
+    def register(self, agent):
+        if str(agent.jid.bare()) != self.session or not agent.jid.resource:
+            raise ValueError(f"{agent.jid} is not a resource of session {self.session}")
+        self._agents[agent.jid.resource] = agent
+
+    def unregister(self, agent):
+        if self._agents.get(agent.jid.resource) is agent:
+            del self._agents[agent.jid.resource]
+
+    @property
+    def agents(self):
+        return list(self._agents.values())
+
+    def send(self, msg):
+        if msg.to is None:
+            self.undeliverable += 1
+            return
+        if str(msg.to.bare()) == self.session:
+            asyncio.get_running_loop().call_soon(self._deliver, msg.copy())
+        else:
+            self.client.send(message_to_frame(msg))
+
+    def _receive(self, frame):
+        self._deliver(frame_to_message(frame))
+
+    def _deliver(self, msg):
+        agent = self._agents.get(msg.to.resource)
+        if agent is None:
+            self.undeliverable += 1
+            return
+        self.delivered += 1
+        agent.dispatch(msg)
+
+    def behaviour_failed(self, behaviour, error):
+        self.errors.append(f"{behaviour.agent.jid} {behaviour}: {error!r}")
+
+
+async def open_session(jid=MUX_JID, password="session", host=None, port=None):
+    """Log in once and make the session the transport for agents started from now on"""
+    client = await SessionClient(jid, password, host, port).connect()
+    return set_transport(MuxTransport(client))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════
+
+async def serve(args):
+    server = await StandInServer(args.handshake_ms).start(args.host, args.port)
+    print(f"PORT {server.port}", flush=True)
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="run a stand-in server")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=parse_server()[1])
+    serve_parser.add_argument("--handshake-ms", type=float, default=0,
+                              help="delay added to every login (stands in for TLS/SASL)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
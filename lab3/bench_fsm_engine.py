@@ -0,0 +1,80 @@
+"""
+Benchmark for the table-driven FSM engine.
+
+Builds 1,000 and 10,000 rescue units (rescue_units.py) on a simulated
+clock, steps them through ten simulated minutes and reports the memory per
+unit and the handler calls per second of wall time. The engine's own
+overhead is measured with a table whose handlers do nothing.
+
+Usage:
+    python bench_fsm_engine.py [unit_count ...]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from fsm_engine import FSMTable, FSMEngine
+from rescue_units import RescueUnits, UNIT_TICK_SECONDS
+from rescue_states import RESCUE_STATES, RESCUE_TRANSITIONS, STATE_MONITORING
+
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from conditions_service import ConditionsService
+from disaster_environment import DisasterEnvironment, LOCATIONS
+
+SIMULATED_SECONDS = 600
+
+# Walk the rescue cycle without doing any work
+_NEXT = {source: dest for source, dest in RESCUE_TRANSITIONS if source != dest}
+
+
+def idle_handlers():
+    return {state: (lambda unit, now, dest=_NEXT[state]: (dest, 1.0)) for state in RESCUE_STATES}
+
+
+def run(engine, clock):
+    start = time.perf_counter()
+    calls = 0
+    while clock[0] < SIMULATED_SECONDS:
+        calls += engine.step()
+        clock[0] += max(engine.next_delay(), UNIT_TICK_SECONDS)
+    return calls, time.perf_counter() - start
+
+
+def bench(count):
+    random.seed(403)
+    clock = [0.0]
+    environment = DisasterEnvironment(ConditionsService(LOCATIONS, clock=lambda: clock[0], seed=403))
+
+    tracemalloc.start()
+    units = RescueUnits(count, environment, name="bench", seed=403, clock=lambda: clock[0])
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    calls, wall = run(units.engine, clock)
+
+    idle_clock = [0.0]
+    table = FSMTable(RESCUE_STATES, RESCUE_TRANSITIONS, STATE_MONITORING, idle_handlers())
+    idle_calls, idle_wall = run(FSMEngine(table, count, name="bench-idle", clock=lambda: idle_clock[0]),
+                                idle_clock)
+    return memory / count, calls / wall, idle_calls / idle_wall, units
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000]
+
+    print(f"\n{'='*60}")
+    print(f"FSM ENGINE ({SIMULATED_SECONDS // 60} simulated minutes)")
+    print(f"{'='*60}")
+    print(f"{'units':>8} {'bytes/unit':>11} {'rescue steps':>16} {'idle steps':>16}")
+    for count in counts:
+        per_unit, rate, idle_rate, units = bench(count)
+        print(f"{count:>8,} {per_unit:>11,.0f} {rate:>14,.0f}/s {idle_rate:>14,.0f}/s")
+        print(f"{'':>8} dispatched={units.dispatched:,} logged={units.logged:,} "
+              f"now: {units.engine.counts()}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
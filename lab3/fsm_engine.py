@@ -0,0 +1,141 @@
+"""
+Lab 3: Table-Driven FSM Engine
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+Runs many independent instances of one state machine without a behaviour,
+a State object or a connection per instance. The machine is compiled once
+into an FSMTable:
+
+  - states are numbered, and the allowed transitions become an n x n byte
+    matrix, so checking a transition is one index lookup
+  - compiling rejects unknown or duplicate states and transitions, states
+    without a handler, dead ends (no way out) and states the initial state
+    cannot reach
+
+An FSMEngine holds the per-instance state in flat arrays (current state,
+wake-up time, transitions taken) and a heap of wake-up times. step() runs
+the handler of every due instance; a handler takes (instance, now) and
+returns (next state, seconds until that state runs), like a SPADE State's
+set_next_state() followed by a sleep.
+
+    table = FSMTable(RESCUE_STATES, RESCUE_TRANSITIONS, STATE_MONITORING, handlers)
+    engine = FSMEngine(table, 5000)
+    engine.step()
+"""
+
+import heapq
+import time
+from array import array
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_metrics import FSM_TRANSITIONS
+
+# Wake-ups this close to `now` run now; asyncio may wake a sleeper a clock tick early
+WAKE_SLACK = 1e-6
+
+
+class FSMTable:
+    """A validated state machine shared by every instance of an engine"""
+
+    def __init__(self, states, transitions, initial, handlers):
+        self.states = tuple(states)
+        self.index = {name: i for i, name in enumerate(self.states)}
+        if len(self.index) != len(self.states):
+            raise ValueError(f"Duplicate states in {self.states}")
+        if initial not in self.index:
+            raise ValueError(f"Initial state {initial!r} is not a state")
+        self.initial = self.index[initial]
+
+        n = len(self.states)
+        self.allowed = bytearray(n * n)
+        successors = [[] for _ in range(n)]
+        for source, dest in transitions:
+            for name in (source, dest):
+                if name not in self.index:
+                    raise ValueError(f"Transition {source} -> {dest}: unknown state {name!r}")
+            src, dst = self.index[source], self.index[dest]
+            if self.allowed[src * n + dst]:
+                raise ValueError(f"Duplicate transition {source} -> {dest}")
+            self.allowed[src * n + dst] = 1
+            successors[src].append(dst)
+        self.successors = tuple(tuple(s) for s in successors)
+
+        unknown = set(handlers) - set(self.index)
+        if unknown:
+            raise ValueError(f"Handlers for unknown states {sorted(unknown)}")
+        missing = [name for name in self.states if name not in handlers]
+        if missing:
+            raise ValueError(f"No handler for states {missing}")
+        self.handlers = tuple(handlers[name] for name in self.states)
+
+        dead_ends = [self.states[i] for i in range(n) if not successors[i]]
+        if dead_ends:
+            raise ValueError(f"States with no way out: {dead_ends}")
+        reached, frontier = {self.initial}, [self.initial]
+        while frontier:
+            for dst in successors[frontier.pop()]:
+                if dst not in reached:
+                    reached.add(dst)
+                    frontier.append(dst)
+        unreachable = [self.states[i] for i in range(n) if i not in reached]
+        if unreachable:
+            raise ValueError(f"States unreachable from {initial}: {unreachable}")
+
+
+class FSMEngine:
+    """`count` instances of one FSMTable, stepped together"""
+
+    def __init__(self, table, count, name="fsm", clock=time.monotonic):
+        self.table = table
+        self.name = name
+        self.clock = clock
+        now = clock()
+        self.state = array('B', [table.initial]) * count
+        self.wake_at = array('d', [now]) * count
+        self.transitions = array('L', [0]) * count
+        self._heap = [(now, i) for i in range(count)]
+        # One counter child per state, so entering a state is a single inc()
+        self._entries = [FSM_TRANSITIONS.labels(name, state) for state in table.states]
+
+    def __len__(self):
+        return len(self.state)
+
+    def step(self, now=None):
+        """Run the handler of every due instance; returns how many ran"""
+        now = self.clock() if now is None else now
+        table, heap = self.table, self._heap
+        state, wake_at, transitions = self.state, self.wake_at, self.transitions
+        handlers, index, allowed, entries = table.handlers, table.index, table.allowed, self._entries
+        n = len(table.states)
+        limit = now + WAKE_SLACK
+        ran = 0
+        while heap and heap[0][0] <= limit:
+            _, i = heapq.heappop(heap)
+            src = state[i]
+            entries[src].inc()
+            dest, delay = handlers[src](i, now)
+            dst = index[dest]
+            if not allowed[src * n + dst]:
+                raise ValueError(f"{self.name}[{i}]: {table.states[src]} -> {dest} is not a transition")
+            state[i] = dst
+            transitions[i] += 1
+            wake_at[i] = now + delay
+            heapq.heappush(heap, (now + delay, i))
+            ran += 1
+        return ran
+
+    def next_delay(self, now=None):
+        """Seconds until the next instance is due"""
+        if not self._heap:
+            return None
+        now = self.clock() if now is None else now
+        return max(0.0, self._heap[0][0] - now)
+
+    def counts(self):
+        """Instances currently in each state"""
+        totals = [0] * len(self.table.states)
+        for s in self.state:
+            totals[s] += 1
+        return dict(zip(self.table.states, totals))
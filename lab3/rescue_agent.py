@@ -16,21 +16,31 @@ FSM States:
 
 import asyncio
 import random
+from collections import deque
 from datetime import datetime
-from spade.agent import Agent
-from spade.behaviour import FSMBehaviour, State, PeriodicBehaviour
 
-# Import the disaster environment from Lab 2
+# Shared Lab 2 modules (the agent classes come from agent_runtime)
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
-from disaster_environment import DisasterEnvironment
-
-# ─── FSM State Constants ───
-STATE_MONITORING = "MONITORING"
-STATE_ALERT_RECEIVED = "ALERT_RECEIVED"
-STATE_ASSESSING = "ASSESSING"
-STATE_DISPATCHING = "DISPATCHING"
-STATE_RESPONDING = "RESPONDING"
+from agent_runtime import Agent, FSMBehaviour, State, CyclicBehaviour
+from agent_metrics import (FSM_TRANSITIONS, RESCUE_EVENTS, RESCUE_RESPONSES, record_event_latency,
+                           start_metrics_server)
+from behaviour_profiler import maybe_profile
+from event_analytics import StreamingEventAnalytics
+from incident_store import IncidentStore
+from event_time import now_ns, format_timestamp
+from dispatch_rules import shared_rules
+from road_network import shared_road_network, minutes_to_seconds, SECONDS_PER_MINUTE
+from rescue_fleet import RescueFleet
+from rescue_states import (STATE_MONITORING, STATE_ALERT_RECEIVED, STATE_ASSESSING,
+                           STATE_DISPATCHING, STATE_RESPONDING, RESCUE_STATES,
+                           RESCUE_TRANSITIONS, REROUTE_WAIT_MINUTES)
+from rescue_units import RescueUnits, RESCUE_UNITS, UNIT_TICK_SECONDS
+
+# Incidents survive restarts in this local database
+INCIDENT_DB = "rescue_incidents.db"
+# Recent events kept in memory; the incident store has the full history
+EVENT_LOG_SIZE = int(os.environ.get("AGENT_EVENT_LOG_SIZE", "1000"))
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -44,23 +54,26 @@ class MonitoringState(State):
         print(f"\n{'='*60}")
         print(f"[{datetime.now().strftime('%H:%M:%S')}] STATE: MONITORING")
         print(f"{'='*60}")
+        FSM_TRANSITIONS.labels(str(self.agent.jid), STATE_MONITORING).inc()
 
         environment = self.agent.environment
         conditions = environment.get_environmental_conditions()
 
-        print(f"  Temperature: {conditions['temperature']}°C")
-        print(f"  Wind Speed : {conditions['wind_speed']} km/h")
-        print(f"  Visibility : {conditions['visibility']}")
-        print(f"  Access     : {conditions['accessibility']}")
+        print(f"  Temperature: {conditions.temperature}°C")
+        print(f"  Wind Speed : {conditions.wind_speed} km/h")
+        print(f"  Visibility : {conditions.visibility}")
+        print(f"  Access     : {conditions.accessibility}")
 
         # Simulate event detection (40% chance)
         if random.random() < 0.4:
             event = environment.generate_disaster_event()
+            event = event.detected(now_ns())
             self.agent.current_event = event
+            self.agent.current_incident = None
             print(f"\n  ** DISASTER EVENT DETECTED **")
-            print(f"     Type     : {event['type']}")
-            print(f"     Location : {event['location']}")
-            print(f"     Severity : {event['severity']}")
+            print(f"     Type     : {event.type}")
+            print(f"     Location : {event.location}")
+            print(f"     Severity : {event.severity}")
             self.set_next_state(STATE_ALERT_RECEIVED)
         else:
             print(f"\n  [STATUS] All clear — no disaster detected.")
@@ -77,12 +90,22 @@ class AlertReceivedState(State):
         print(f"\n{'='*60}")
         print(f"[{datetime.now().strftime('%H:%M:%S')}] STATE: ALERT_RECEIVED")
         print(f"{'='*60}")
-        print(f"  Alert: {event['type']} at {event['location']}")
-        print(f"  Severity: {event['severity']} | Casualties: {event['casualties']}")
-        print(f"  Resources needed: {event['resources_needed']}")
-
-        # Log the event
-        self.agent.event_log.append(event)
+        FSM_TRANSITIONS.labels(str(self.agent.jid), STATE_ALERT_RECEIVED).inc()
+        print(f"  Alert: {event.type} at {event.location}")
+        print(f"  Severity: {event.severity} | Casualties: {event.casualties}")
+        print(f"  Resources needed: {event.resources_needed}")
+
+        if self.agent.current_incident is None:
+            latency = record_event_latency(self.agent, event)
+            if latency is not None:
+                print(f"  Alert latency: {latency:.1f} ms")
+            # Log the event
+            self.agent.event_log.append(event)
+            self.agent.analytics.record(event)
+            self.agent.current_incident = self.agent.store.open_incident(event, STATE_ALERT_RECEIVED)
+            RESCUE_EVENTS.labels(str(self.agent.jid)).inc()
+        else:
+            print(f"  (Resuming recovered incident #{self.agent.current_incident})")
 
         await asyncio.sleep(1)
         self.set_next_state(STATE_ASSESSING)
@@ -96,16 +119,21 @@ class AssessingState(State):
         print(f"\n{'='*60}")
         print(f"[{datetime.now().strftime('%H:%M:%S')}] STATE: ASSESSING")
         print(f"{'='*60}")
-        print(f"  Evaluating severity of {event['type']} at {event['location']}...")
+        FSM_TRANSITIONS.labels(str(self.agent.jid), STATE_ASSESSING).inc()
+        print(f"  Evaluating severity of {event.type} at {event.location}...")
+        self.agent.record_state(STATE_ASSESSING)
 
-        severity = event['severity']
+        conditions = self.agent.environment.get_environmental_conditions(event.location)
+        decision = self.agent.rules.decide(event, conditions)
 
-        if severity in ('Medium', 'High', 'Critical'):
-            print(f"  >> Severity '{severity}' requires dispatch.")
+        if decision.dispatch:
+            print(f"  >> Severity '{event.severity}' requires dispatch (rule: {decision.rule}).")
             await asyncio.sleep(1)
             self.set_next_state(STATE_DISPATCHING)
         else:
-            print(f"  >> Severity '{severity}' is low — logging and resuming monitoring.")
+            print(f"  >> Severity '{event.severity}' does not require dispatch (rule: {decision.rule}) "
+                  f"— logging and resuming monitoring.")
+            self.agent.close_incident("LOGGED")
             await asyncio.sleep(1)
             self.set_next_state(STATE_MONITORING)
 
@@ -118,14 +146,31 @@ class DispatchingState(State):
         print(f"\n{'='*60}")
         print(f"[{datetime.now().strftime('%H:%M:%S')}] STATE: DISPATCHING")
         print(f"{'='*60}")
-        print(f"  Dispatching rescue team to {event['location']}...")
-        print(f"  Disaster type : {event['type']}")
-        print(f"  Severity      : {event['severity']}")
-        print(f"  Resource type : {event['resources_needed']}")
-
-        # Simulate dispatch delay
-        await asyncio.sleep(2)
-        print(f"  >> Rescue team deployed successfully.")
+        FSM_TRANSITIONS.labels(str(self.agent.jid), STATE_DISPATCHING).inc()
+        print(f"  Dispatching rescue team to {event.location}...")
+        self.agent.record_state(STATE_DISPATCHING)
+        print(f"  Disaster type : {event.type}")
+        print(f"  Severity      : {event.severity}")
+        print(f"  Resource type : {event.resources_needed}")
+
+        # The fleet picks the capable team that can arrive first over open roads
+        fleet = self.agent.fleet
+        assignment = fleet.assign(event)
+        if assignment is None:
+            print(f"  !! No {event.resources_needed} team can reach {event.location} — "
+                  f"re-routing in {REROUTE_WAIT_MINUTES} min.")
+            await asyncio.sleep(minutes_to_seconds(REROUTE_WAIT_MINUTES))
+            self.set_next_state(STATE_DISPATCHING)
+            return
+        self.agent.current_assignment = assignment
+        now = fleet.clock()
+        print(f"  Team          : {assignment.team_id} from {assignment.origin}")
+        if assignment.depart_at > now:
+            print(f"  Waiting       : {(assignment.depart_at - now) / SECONDS_PER_MINUTE:.0f} min "
+                  f"for the team to finish its current job")
+        print(f"  Route         : {' -> '.join(assignment.path)} ({assignment.travel_minutes:.0f} min)")
+        await asyncio.sleep(max(0.0, assignment.arrive_at - now))
+        print(f"  >> {assignment.team_id} on scene at {event.location}.")
         self.set_next_state(STATE_RESPONDING)
 
 
@@ -137,14 +182,28 @@ class RespondingState(State):
         print(f"\n{'='*60}")
         print(f"[{datetime.now().strftime('%H:%M:%S')}] STATE: RESPONDING")
         print(f"{'='*60}")
-        print(f"  Rescue operation in progress at {event['location']}...")
-        print(f"  Addressing {event['type']} — Severity: {event['severity']}")
-        print(f"  Attending to {event['casualties']} estimated casualties.")
-
-        # Simulate response duration
-        await asyncio.sleep(3)
+        FSM_TRANSITIONS.labels(str(self.agent.jid), STATE_RESPONDING).inc()
+        print(f"  Rescue operation in progress at {event.location}...")
+        self.agent.record_state(STATE_RESPONDING)
+        print(f"  Addressing {event.type} — Severity: {event.severity}")
+        print(f"  Attending to {event.casualties} estimated casualties.")
+
+        # The team is busy on scene until the time the fleet reserved it for
+        assignment = self.agent.current_assignment
+        if assignment is not None:
+            print(f"  Estimated duration: {assignment.on_scene_minutes:.0f} min ({assignment.team_id})")
+            await asyncio.sleep(max(0.0, assignment.done_at - self.agent.fleet.clock()))
+        else:
+            # Recovered after a restart: the reservation was not persisted
+            minutes = self.agent.roads.on_scene_minutes(event)
+            print(f"  Estimated duration: {minutes:.0f} min")
+            await asyncio.sleep(minutes_to_seconds(minutes))
+        self.agent.current_assignment = None
         print(f"  >> Response complete. Returning to monitoring.")
         self.agent.responses_completed += 1
+        self.agent.store.set_counter("responses_completed", self.agent.responses_completed)
+        self.agent.close_incident("RESOLVED")
+        RESCUE_RESPONSES.labels(str(self.agent.jid)).inc()
         self.set_next_state(STATE_MONITORING)
 
 
@@ -164,34 +223,93 @@ class RescueAgent(Agent):
     async def setup(self):
         print(f"\nRescueAgent {self.jid} initializing...")
 
-        # Shared state
-        self.environment = DisasterEnvironment()
+        # Shared state, restored from the incident store after a restart
+        self.rules = shared_rules()
+        self.roads = shared_road_network(self.environment.conditions)
+        self.fleet = RescueFleet.default(self.roads)
+        self.current_assignment = None
+        self.store = IncidentStore(INCIDENT_DB, str(self.jid))
         self.current_event = None
-        self.event_log = []
-        self.responses_completed = 0
+        self.current_incident = None
+        self.event_log = deque(self.store.event_log(EVENT_LOG_SIZE), maxlen=EVENT_LOG_SIZE)
+        self.analytics = StreamingEventAnalytics()
+        self.responses_completed = self.store.counters().get("responses_completed", 0)
+        initial_state = self.recover_open_incident()
 
         # ── Build FSM ──
         fsm = FSMBehaviour()
 
         # Add states
-        fsm.add_state(name=STATE_MONITORING,      state=MonitoringState(),      initial=True)
-        fsm.add_state(name=STATE_ALERT_RECEIVED,   state=AlertReceivedState())
-        fsm.add_state(name=STATE_ASSESSING,         state=AssessingState())
-        fsm.add_state(name=STATE_DISPATCHING,       state=DispatchingState())
-        fsm.add_state(name=STATE_RESPONDING,        state=RespondingState())
-
-        # Add transitions
-        fsm.add_transition(source=STATE_MONITORING,      dest=STATE_MONITORING)
-        fsm.add_transition(source=STATE_MONITORING,      dest=STATE_ALERT_RECEIVED)
-        fsm.add_transition(source=STATE_ALERT_RECEIVED,  dest=STATE_ASSESSING)
-        fsm.add_transition(source=STATE_ASSESSING,       dest=STATE_DISPATCHING)
-        fsm.add_transition(source=STATE_ASSESSING,       dest=STATE_MONITORING)
-        fsm.add_transition(source=STATE_DISPATCHING,     dest=STATE_RESPONDING)
-        fsm.add_transition(source=STATE_RESPONDING,      dest=STATE_MONITORING)
+        fsm.add_state(name=STATE_MONITORING,      state=MonitoringState(),      initial=initial_state == STATE_MONITORING)
+        fsm.add_state(name=STATE_ALERT_RECEIVED,   state=AlertReceivedState(),   initial=initial_state == STATE_ALERT_RECEIVED)
+        fsm.add_state(name=STATE_ASSESSING,         state=AssessingState(),       initial=initial_state == STATE_ASSESSING)
+        fsm.add_state(name=STATE_DISPATCHING,       state=DispatchingState(),     initial=initial_state == STATE_DISPATCHING)
+        fsm.add_state(name=STATE_RESPONDING,        state=RespondingState(),      initial=initial_state == STATE_RESPONDING)
+
+        # Add transitions (the table in rescue_states.py)
+        for source, dest in RESCUE_TRANSITIONS:
+            fsm.add_transition(source=source, dest=dest)
 
         self.add_behaviour(fsm)
         print(f"RescueAgent FSM behaviour added.\n")
 
+    def recover_open_incident(self):
+        """Resume the newest open incident at its last recorded state"""
+        open_incidents = self.store.open_incidents()
+        if not open_incidents:
+            return STATE_MONITORING
+
+        # The FSM handles one incident at a time; anything older was abandoned
+        for incident_id, _, _ in open_incidents[:-1]:
+            self.store.close_incident(incident_id, "ABANDONED")
+        incident_id, event, state = open_incidents[-1]
+        if state not in RESCUE_STATES:
+            # Written by another version of this agent; the FSM could not start in it
+            print(f"⚠️  Open incident #{incident_id} is in unknown state {state!r}; "
+                  f"abandoning it and starting in {STATE_MONITORING}")
+            self.store.close_incident(incident_id, "ABANDONED")
+            return STATE_MONITORING
+        self.current_incident = incident_id
+        self.current_event = event
+        print(f"Recovered open incident #{incident_id}: {event.type} at "
+              f"{event.location} — resuming in {state}")
+        return state
+
+    def record_state(self, state):
+        """Persist the FSM state of the incident being handled"""
+        if self.current_incident is not None:
+            self.store.update_state(self.current_incident, state)
+
+    def close_incident(self, outcome):
+        if self.current_incident is not None:
+            self.store.close_incident(self.current_incident, outcome)
+            self.current_incident = None
+
+
+class RescueUnitsAgent(Agent):
+    """
+    Many rescue units in one agent: the same FSM as RescueAgent, run for
+    every unit by a table-driven FSMEngine (rescue_units.py) in a single
+    behaviour.
+    """
+
+    def __init__(self, jid, password, *args, units=RESCUE_UNITS, **kwargs):
+        super().__init__(jid, password, *args, **kwargs)
+        self.unit_count = units
+
+    class UnitsBehaviour(CyclicBehaviour):
+        """Step every due unit, then sleep until the next one is due (at least a tick)"""
+
+        async def run(self):
+            engine = self.agent.units.engine
+            engine.step()
+            await asyncio.sleep(max(engine.next_delay(), UNIT_TICK_SECONDS))
+
+    async def setup(self):
+        self.units = RescueUnits(self.unit_count, self.environment, name=str(self.jid))
+        self.add_behaviour(self.UnitsBehaviour())
+        print(f"RescueUnitsAgent {self.jid} running {self.unit_count} rescue units.")
+
 
 # ═══════════════════════════════════════════════════════════════════
 # Main entry point
@@ -203,7 +321,9 @@ async def main():
     agent_password = "password123"
 
     agent = RescueAgent(agent_jid, agent_password)
+    await start_metrics_server()
     await agent.start()
+    maybe_profile(agent)
 
     print("RescueAgent is running. Monitoring for disasters...")
     print("Press Ctrl+C to stop.\n")
@@ -222,15 +342,17 @@ async def main():
     print(f"Responses completed   : {agent.responses_completed}")
     for i, evt in enumerate(agent.event_log, 1):
         print(f"\n  Event {i}:")
-        print(f"    Timestamp : {evt['timestamp']}")
-        print(f"    Type      : {evt['type']}")
-        print(f"    Location  : {evt['location']}")
-        print(f"    Severity  : {evt['severity']}")
-        print(f"    Casualties: {evt['casualties']}")
-        print(f"    Resources : {evt['resources_needed']}")
+        print(f"    Timestamp : {format_timestamp(evt.timestamp_ns)}")
+        print(f"    Type      : {evt.type}")
+        print(f"    Location  : {evt.location}")
+        print(f"    Severity  : {evt.severity}")
+        print(f"    Casualties: {evt.casualties}")
+        print(f"    Resources : {evt.resources_needed}")
     print(f"{'='*60}\n")
+    agent.analytics.print_summary()
 
     await agent.stop()
+    agent.store.close()
     print("RescueAgent stopped.")
 
 
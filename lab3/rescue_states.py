@@ -0,0 +1,34 @@
+"""
+Lab 3: Rescue FSM States and Transitions
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+The state names and transition table shared by the SPADE RescueAgent
+(rescue_agent.py) and the table-driven rescue units (rescue_units.py).
+See fsm_diagram.md for the diagram.
+"""
+
+# ─── FSM State Constants ───
+STATE_MONITORING = "MONITORING"
+STATE_ALERT_RECEIVED = "ALERT_RECEIVED"
+STATE_ASSESSING = "ASSESSING"
+STATE_DISPATCHING = "DISPATCHING"
+STATE_RESPONDING = "RESPONDING"
+
+RESCUE_STATES = (STATE_MONITORING, STATE_ALERT_RECEIVED, STATE_ASSESSING,
+                 STATE_DISPATCHING, STATE_RESPONDING)
+
+# (source, dest) pairs, as in fsm_diagram.md
+RESCUE_TRANSITIONS = (
+    (STATE_MONITORING,     STATE_MONITORING),
+    (STATE_MONITORING,     STATE_ALERT_RECEIVED),
+    (STATE_ALERT_RECEIVED, STATE_ASSESSING),
+    (STATE_ASSESSING,      STATE_DISPATCHING),
+    (STATE_ASSESSING,      STATE_MONITORING),
+    (STATE_DISPATCHING,    STATE_DISPATCHING),
+    (STATE_DISPATCHING,    STATE_RESPONDING),
+    (STATE_RESPONDING,     STATE_MONITORING),
+)
+
+# Simulated minutes to wait before re-routing when every road to a zone is closed
+REROUTE_WAIT_MINUTES = 30
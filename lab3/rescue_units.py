@@ -0,0 +1,104 @@
+"""
+Lab 3: Table-Driven Rescue Units
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+Thousands of rescue units, each running the RescueAgent's FSM
+(MONITORING -> ALERT_RECEIVED -> ASSESSING -> DISPATCHING -> RESPONDING),
+on one FSMEngine instead of one SPADE agent per unit. The handlers do what
+the State classes in rescue_agent.py do, without the console output and
+the incident store: each unit detects events with the same chance,
+assesses them with the dispatch rules and sends teams from a fleet shared
+by all units.
+
+Per-unit data beyond the engine's arrays is two lists: the event and the
+team assignment each unit is handling.
+"""
+
+import random
+import time
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_metrics import RESCUE_EVENTS, RESCUE_RESPONSES
+from dispatch_rules import shared_rules
+from event_time import now_ns
+from rescue_fleet import RescueFleet
+from road_network import shared_road_network, minutes_to_seconds
+from fsm_engine import FSMTable, FSMEngine
+from rescue_states import (STATE_MONITORING, STATE_ALERT_RECEIVED, STATE_ASSESSING,
+                           STATE_DISPATCHING, STATE_RESPONDING, RESCUE_STATES,
+                           RESCUE_TRANSITIONS, REROUTE_WAIT_MINUTES)
+
+RESCUE_UNITS = int(os.environ.get("AGENT_RESCUE_UNITS", "1000"))
+# Units due within one tick are stepped together, so the event loop wakes
+# at most once per tick however many units there are
+UNIT_TICK_SECONDS = float(os.environ.get("AGENT_UNIT_TICK", "0.25"))
+
+# Same timings as the SPADE states
+DETECTION_CHANCE = 0.4
+ALL_CLEAR_SECONDS = 3
+STEP_SECONDS = 1
+
+
+class RescueUnits:
+    """`count` rescue units stepped by one FSMEngine"""
+
+    def __init__(self, count, environment, name="rescue-units", fleet=None, rules=None,
+                 seed=None, clock=time.monotonic):
+        self.environment = environment
+        self.rules = rules or shared_rules()
+        self.roads = shared_road_network(environment.conditions)
+        # One team per unit unless a fleet is given
+        self.fleet = fleet or RescueFleet.default(self.roads, size=count, clock=clock)
+        self.rng = random.Random(random.getrandbits(64) if seed is None else seed)
+        self.events = [None] * count
+        self.assignments = [None] * count
+        self.logged = 0
+        self.dispatched = 0
+        self._received = RESCUE_EVENTS.labels(name)
+        self._responses = RESCUE_RESPONSES.labels(name)
+
+        table = FSMTable(RESCUE_STATES, RESCUE_TRANSITIONS, STATE_MONITORING, {
+            STATE_MONITORING: self.monitoring,
+            STATE_ALERT_RECEIVED: self.alert_received,
+            STATE_ASSESSING: self.assessing,
+            STATE_DISPATCHING: self.dispatching,
+            STATE_RESPONDING: self.responding,
+        })
+        self.engine = FSMEngine(table, count, name=name, clock=clock)
+
+    def monitoring(self, unit, now):
+        if self.rng.random() < DETECTION_CHANCE:
+            self.events[unit] = self.environment.generate_disaster_event().detected(now_ns())
+            return STATE_ALERT_RECEIVED, 0.0
+        return STATE_MONITORING, ALL_CLEAR_SECONDS
+
+    def alert_received(self, unit, now):
+        self._received.inc()
+        return STATE_ASSESSING, STEP_SECONDS
+
+    def assessing(self, unit, now):
+        event = self.events[unit]
+        conditions = self.environment.get_environmental_conditions(event.location)
+        if self.rules.decide(event, conditions).dispatch:
+            return STATE_DISPATCHING, STEP_SECONDS
+        self.events[unit] = None
+        self.logged += 1
+        return STATE_MONITORING, STEP_SECONDS
+
+    def dispatching(self, unit, now):
+        assignment = self.fleet.assign(self.events[unit], now)
+        if assignment is None:
+            return STATE_DISPATCHING, minutes_to_seconds(REROUTE_WAIT_MINUTES)
+        self.assignments[unit] = assignment
+        self.dispatched += 1
+        return STATE_RESPONDING, max(0.0, assignment.arrive_at - now)
+
+    def responding(self, unit, now):
+        # On scene: the unit is back to monitoring when its team's reservation ends
+        assignment = self.assignments[unit]
+        self.events[unit] = None
+        self.assignments[unit] = None
+        self._responses.inc()
+        return STATE_MONITORING, max(0.0, assignment.done_at - now)
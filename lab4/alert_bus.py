@@ -0,0 +1,405 @@
+"""
+Lab 4: Publish/Subscribe Alert Bus
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+Sensors publish disaster alerts to one broker instead of addressing each
+consumer. The broker routes every alert by topic (type, zone, severity)
+to any number of subscribers, so adding a logistics or medical consumer
+only means sending a SUBSCRIBE message.
+
+  - AlertBus: in-process router with one bounded queue per subscriber
+  - AlertBrokerAgent: SPADE agent that accepts INFORM (publish),
+    SUBSCRIBE and CANCEL messages and forwards alerts to subscriber JIDs
+  - SubscribeBehaviour: behaviour a consumer adds to subscribe; it
+    retransmits the SUBSCRIBE until the broker acknowledges it
+
+Each subscriber chooses what happens when its queue is full:
+  drop  - discard the oldest queued alert (the publisher never waits)
+  block - refuse the alert: the broker queues it for no subscriber and
+          answers the publisher with a back-pressure REFUSE, so only the
+          publishers of alerts routed to the full subscriber slow down
+          (and retransmit, with acknowledged delivery) while the router
+          keeps serving everyone else
+
+Forwarded alerts go through the broker's Outbox, so a subscriber gets
+each alert at least once and acknowledges it like any INFORM. A
+subscriber's forwarder waits while its window of unacknowledged alerts is
+full, so a slow or unreachable subscriber fills its own queue and its
+policy applies.
+"""
+
+import asyncio
+import json
+from itertools import product
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_runtime import Agent, CyclicBehaviour, Message
+from agent_metrics import REGISTRY, MESSAGES_SENT, MESSAGES_RECEIVED
+from disaster_models import DisasterEvent, DisasterType, Severity, ValidationError
+from message_codec import MessageCodec
+from reliable_delivery import Outbox, Inbox
+from bounded_mailbox import alert_metadata, send_backpressure
+
+DROP = "drop"
+BLOCK = "block"
+POLICIES = (DROP, BLOCK)
+
+BUS_PUBLISHED = REGISTRY.counter(
+    "alert_bus_published_total", "Alerts published to the bus", ("bus",))
+BUS_DELIVERED = REGISTRY.counter(
+    "alert_bus_delivered_total", "Alerts queued for a subscriber", ("bus", "subscriber"))
+BUS_DROPPED = REGISTRY.counter(
+    "alert_bus_dropped_total", "Alerts discarded because a subscriber queue was full",
+    ("bus", "subscriber"))
+BUS_REFUSED = REGISTRY.counter(
+    "alert_bus_refused_total", "Alerts refused because a blocking subscriber queue was full",
+    ("bus", "subscriber"))
+BUS_QUEUE_DEPTH = REGISTRY.gauge(
+    "alert_bus_queue_depth", "Alerts waiting in a subscriber queue", ("bus", "subscriber"))
+
+
+def topic_of(event):
+    """Topic string carried in the metadata of forwarded alerts"""
+    return f"disaster/{event.type}/{event.location}/{event.severity}"
+
+
+def _value_set(values, parse=None):
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    if not isinstance(values, (list, tuple, set, frozenset)) or not values:
+        raise ValidationError("Topic filters must be a value or a non-empty list")
+    return frozenset(parse(v) if parse else v for v in values)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# IN-PROCESS BUS
+# ═══════════════════════════════════════════════════════════════════
+
+class Subscription:
+    """One subscriber's topic filter and bounded queue of (event, body) pairs"""
+
+    def __init__(self, bus, name, types=None, zones=None, severities=None,
+                 maxsize=100, policy=DROP):
+        if policy not in POLICIES:
+            raise ValidationError(f"policy must be one of {POLICIES}")
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValidationError("maxsize must be a positive integer")
+        self.name = name
+        self.types = _value_set(types, DisasterType.parse)
+        self.zones = _value_set(zones)
+        self.severities = _value_set(severities, Severity.parse)
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize)
+        self.closed = False
+        self._delivered = BUS_DELIVERED.labels(bus.name, name)
+        self._dropped = BUS_DROPPED.labels(bus.name, name)
+        self._refused = BUS_REFUSED.labels(bus.name, name)
+        BUS_QUEUE_DEPTH.labels(bus.name, name).set_function(self.queue.qsize)
+
+    @property
+    def delivered(self):
+        return self._delivered.value
+
+    @property
+    def dropped(self):
+        return self._dropped.value
+
+    @property
+    def refused(self):
+        return self._refused.value
+
+    def full(self):
+        """True if an alert for this subscriber would be refused now"""
+        return self.policy == BLOCK and self.queue.full()
+
+    def keys(self):
+        """Index keys this subscription is filed under (None = any value)"""
+        return product(self.types or (None,), self.zones or (None,), self.severities or (None,))
+
+    async def get(self):
+        """Wait for the next (event, body) pair; None once the subscription is closed"""
+        return await self.queue.get()
+
+    def put(self, item):
+        """Queue one item; False if it was refused"""
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if not self.overflow(item):
+                return False
+        self._delivered.inc()
+        return True
+
+    def overflow(self, item):
+        """Apply the full-queue policy to one item; False if it was refused"""
+        if self.policy == BLOCK:
+            self._refused.inc()
+            return False
+        self.queue.get_nowait()
+        self.queue.put_nowait(item)
+        self._dropped.inc()
+        return True
+
+    def close(self):
+        """Discard queued alerts and wake the forwarder waiting in get()"""
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class AlertBus:
+    """Routes published events to every subscription whose filter matches"""
+
+    def __init__(self, name="alerts"):
+        self.name = name
+        self._subscriptions = {}
+        self._index = {}
+        self._routes = {}
+        self._published = BUS_PUBLISHED.labels(name)
+
+    @property
+    def subscriptions(self):
+        return list(self._subscriptions.values())
+
+    @property
+    def published(self):
+        return self._published.value
+
+    def subscribe(self, name, types=None, zones=None, severities=None, maxsize=100, policy=DROP):
+        """Add (or replace) the subscription called `name`"""
+        subscription = Subscription(self, name, types, zones, severities, maxsize, policy)
+        self.unsubscribe(name)
+        self._subscriptions[name] = subscription
+        for key in subscription.keys():
+            self._index.setdefault(key, []).append(subscription)
+        self._routes.clear()
+        return subscription
+
+    def unsubscribe(self, name):
+        subscription = self._subscriptions.pop(name, None)
+        if subscription is None:
+            return None
+        for key in subscription.keys():
+            subscribers = self._index[key]
+            subscribers.remove(subscription)
+            if not subscribers:
+                del self._index[key]
+        self._routes.clear()
+        subscription.close()
+        return subscription
+
+    def route(self, event):
+        """Subscriptions matching an event, cached per (type, zone, severity)"""
+        topic = (event.type, event.location, event.severity)
+        route = self._routes.get(topic)
+        if route is None:
+            matched = {}
+            for key in product((topic[0], None), (topic[1], None), (topic[2], None)):
+                for subscription in self._index.get(key, ()):
+                    matched[subscription.name] = subscription
+            route = self._routes[topic] = tuple(matched.values())
+        return route
+
+    def refused_by(self, event):
+        """A full blocking subscriber that refuses this event (counted), or None"""
+        for subscription in self.route(event):
+            if subscription.full():
+                subscription._refused.inc()
+                return subscription
+        return None
+
+    def publish(self, event, body=None):
+        """
+        Queue the event (and its JSON body, if known) for each matching
+        subscriber and return how many queued it. Never waits: a full
+        blocking subscriber refuses the event (check refused_by() first to
+        refuse it for everyone).
+        """
+        self._published.inc()
+        item = (event, body)
+        queued = 0
+        for subscription in self.route(event):
+            # Inline fast path: only a full queue needs the overflow policy
+            try:
+                subscription.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                if not subscription.overflow(item):
+                    continue
+            subscription._delivered.inc()
+            queued += 1
+        return queued
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SUBSCRIPTION MESSAGES
+# ═══════════════════════════════════════════════════════════════════
+
+def subscribe_body(types=None, zones=None, severities=None, maxsize=100, policy=DROP):
+    """JSON body of a SUBSCRIBE message"""
+    return json.dumps({"types": types, "zones": zones, "severities": severities,
+                       "maxsize": maxsize, "policy": policy})
+
+
+def parse_subscribe(text):
+    """Keyword arguments for AlertBus.subscribe() from a SUBSCRIBE body"""
+    try:
+        data = json.loads(text) if text else {}
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Body is not valid JSON: {e}") from None
+    if not isinstance(data, dict):
+        raise ValidationError("Body must be a JSON object")
+    return {
+        "types": data.get("types"),
+        "zones": data.get("zones"),
+        "severities": data.get("severities"),
+        "maxsize": data.get("maxsize", 100),
+        "policy": data.get("policy", DROP),
+    }
+
+
+class SubscribeBehaviour(CyclicBehaviour):
+    """Send a SUBSCRIBE for the given topic filter to a broker, until it is acknowledged"""
+
+    def __init__(self, broker_jid, **topic_filter):
+        super().__init__()
+        self.broker_jid = broker_jid
+        self.topic_filter = topic_filter
+        self.acknowledged = False
+
+    async def on_start(self):
+        # An outbox of its own: the agent's other behaviours need not know about it
+        self.outbox = Outbox(str(self.agent.jid))
+        msg = Message(to=self.broker_jid, sender=str(self.agent.jid),
+                      body=subscribe_body(**self.topic_filter),
+                      metadata={"performative": "subscribe", "ontology": "disaster-response"})
+        await self.outbox.send(self, msg)
+        MESSAGES_SENT.labels(str(self.agent.jid), "subscribe").inc()
+
+    async def run(self):
+        msg = await self.receive(timeout=self.outbox.next_timeout(10))
+        codec = getattr(self.agent, "codec", None)
+        if msg and (codec is None or codec.unpack(msg)) and self.outbox.on_ack(msg):
+            self.acknowledged = True
+        await self.outbox.pump(self)
+        if self.outbox.pending() == (0, 0):
+            self.kill()
+
+    async def on_end(self):
+        if self.acknowledged:
+            print(f"[BUS] {self.agent.jid} subscribed to {self.broker_jid} "
+                  f"with {self.topic_filter or 'all alerts'}")
+        else:
+            print(f"[BUS] ⚠️  {self.broker_jid} never acknowledged the SUBSCRIBE from {self.agent.jid}")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# BROKER AGENT
+# ═══════════════════════════════════════════════════════════════════
+
+class AlertBrokerAgent(Agent):
+    """Accepts published alerts and forwards them to XMPP subscribers"""
+
+    class RouterBehaviour(CyclicBehaviour):
+        """Handle INFORM (publish), SUBSCRIBE and CANCEL messages"""
+
+        async def run(self):
+            # Subscribers' acknowledgements for the outbox arrive here too
+            inbox, outbox = self.agent.inbox, self.agent.outbox
+            msg = await self.receive(timeout=inbox.next_timeout(outbox.next_timeout(10)))
+            if msg and self.agent.codec.unpack(msg) and not outbox.on_ack(msg):
+                await self.handle(msg)
+            await outbox.pump(self)
+            await inbox.send_acks(self)
+
+        async def handle(self, msg):
+            performative = msg.get_metadata("performative")
+            if performative == "inform":
+                await self.publish(msg)
+                return
+            if not self.agent.inbox.accept(msg):
+                return
+            MESSAGES_RECEIVED.labels(str(self.agent.jid), performative or "unknown").inc()
+            sender = str(msg.sender)
+
+            if performative == "subscribe":
+                try:
+                    self.agent.add_subscriber(sender, **parse_subscribe(msg.body))
+                except ValidationError as e:
+                    print(f"[BROKER] ⚠️  Rejected subscription from {sender}: {e}")
+            elif performative == "cancel":
+                self.agent.remove_subscriber(sender)
+
+        async def publish(self, msg):
+            try:
+                event = DisasterEvent.from_json(msg.body)
+            except ValidationError as e:
+                if self.agent.inbox.accept(msg):
+                    print(f"[BROKER] ⚠️  Rejected alert from {msg.sender}: {e}")
+                return
+            full = self.agent.bus.refused_by(event)
+            if full is not None:
+                # Not accepted, so not acknowledged either: the publisher
+                # slows down and retransmits the alert later
+                await send_backpressure(self, msg, "refuse", f"subscriber {full.name} is full")
+                return
+            if not self.agent.inbox.accept(msg):
+                return
+            MESSAGES_RECEIVED.labels(str(self.agent.jid), "inform").inc()
+            self.agent.bus.publish(event, msg.body)
+
+    class ForwardBehaviour(CyclicBehaviour):
+        """Drain one subscriber's queue into INFORM messages"""
+
+        def __init__(self, subscription):
+            super().__init__()
+            self.subscription = subscription
+
+        async def run(self):
+            await self.agent.outbox.wait_for_window(self.subscription.name)
+            item = await self.subscription.get()
+            if item is None:
+                return  # unsubscribed; the behaviour was killed
+            event, body = item
+            msg = Message(
+                to=self.subscription.name,
+                sender=str(self.agent.jid),
+                body=body or event.to_json(),
+                metadata={
+                    "performative": "inform",
+                    "ontology": "disaster-response",
+                    "language": "JSON",
+                    "topic": topic_of(event),
+                    **alert_metadata(event),
+                }
+            )
+            await self.agent.outbox.send(self, msg)
+            MESSAGES_SENT.labels(str(self.agent.jid), "inform").inc()
+
+    def add_subscriber(self, jid, **topic_filter):
+        self.remove_subscriber(jid)
+        subscription = self.bus.subscribe(jid, **topic_filter)
+        forwarder = self.ForwardBehaviour(subscription)
+        self._forwarders[jid] = forwarder
+        self.add_behaviour(forwarder)
+        print(f"[BROKER] {jid} subscribed ({subscription.policy}, queue {subscription.queue.maxsize})")
+        return subscription
+
+    def remove_subscriber(self, jid):
+        forwarder = self._forwarders.pop(jid, None)
+        if forwarder is not None:
+            forwarder.kill()
+            print(f"[BROKER] {jid} unsubscribed")
+        self.bus.unsubscribe(jid)
+
+    async def setup(self):
+        self.bus = AlertBus(str(self.jid))
+        self.codec = MessageCodec(str(self.jid))
+        self.inbox = Inbox(str(self.jid))
+        self.outbox = Outbox(str(self.jid))
+        self._forwarders = {}
+        self.add_behaviour(self.RouterBehaviour())
@@ -0,0 +1,81 @@
+"""
+Fan-out benchmark for the in-process AlertBus.
+
+Publishes alerts to N subscribers, each drained by its own task, and
+reports publish and delivery rates. One deliberately slow subscriber with
+the drop policy shows that a stalled consumer does not hold up the rest.
+
+Usage:
+    python bench_alert_bus.py [event_count]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from alert_bus import AlertBus, DROP
+
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from disaster_environment import DisasterEnvironment
+
+
+async def drain(subscription, counts, delay=0.0):
+    while True:
+        await subscription.get()
+        counts[subscription.name] = counts.get(subscription.name, 0) + 1
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def run_fan_out(subscriber_count, events, filtered):
+    bus = AlertBus(f"bench-{subscriber_count}-{filtered}")
+    rng = random.Random(subscriber_count)
+    environment = DisasterEnvironment()
+    counts = {}
+    tasks = []
+    for i in range(subscriber_count):
+        if filtered:
+            subscription = bus.subscribe(f"sub-{i}", zones=rng.choice(environment.locations),
+                                         maxsize=1024, policy=DROP)
+        else:
+            subscription = bus.subscribe(f"sub-{i}", maxsize=1024, policy=DROP)
+        tasks.append(asyncio.create_task(drain(subscription, counts)))
+    slow = bus.subscribe("slow", maxsize=16, policy=DROP)
+    tasks.append(asyncio.create_task(drain(slow, counts, delay=0.01)))
+
+    start = time.perf_counter()
+    delivered = 0
+    for i, event in enumerate(events):
+        delivered += bus.publish(event)
+        if i % 256 == 0:
+            await asyncio.sleep(0)   # let the consumers run
+    elapsed = time.perf_counter() - start
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return len(events) / elapsed, delivered / elapsed, slow.dropped
+
+
+async def main():
+    event_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    random.seed(403)
+    environment = DisasterEnvironment()
+    events = [environment.generate_disaster_event() for _ in range(event_count)]
+
+    print(f"\n{'='*72}")
+    print(f"ALERT BUS FAN-OUT BENCHMARK ({event_count:,} events)")
+    print(f"{'='*72}")
+    print(f"{'subscribers':>12}{'filter':>10}{'publishes/s':>16}{'deliveries/s':>16}{'slow drops':>14}")
+    for subscriber_count in (1, 10, 100, 1000):
+        for filtered in (False, True):
+            publishes, deliveries, dropped = await run_fan_out(subscriber_count, events, filtered)
+            print(f"{subscriber_count:>12}{'zone' if filtered else 'all':>10}"
+                  f"{publishes:>16,.0f}{deliveries:>16,.0f}{dropped:>14,}")
+    print(f"{'='*72}\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Wire size and CPU cost of message body encoding.
+
+Encodes representative payloads (a single alert, a batch of alerts, a
+condition history, a per-zone map) with no compression and with zlib at
+several levels, and reports bytes on the wire, messages needed at the
+MAX_BODY chunk limit, and encode/decode time per message.
+
+Usage:
+    python bench_codec.py [repeats]
+"""
+
+import json
+import random
+import sys
+import time
+
+from message_codec import encode_body, decode_body, MAX_BODY
+
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from conditions_service import ConditionsService
+from disaster_environment import DisasterEnvironment
+
+
+def payloads():
+    random.seed(403)
+    environment = DisasterEnvironment()
+    clock = [0.0]
+    conditions = ConditionsService(environment.locations, clock=lambda: clock[0], seed=403)
+    history = []
+    for _ in range(2000):
+        clock[0] += 5
+        history.extend(conditions.get(zone).to_wire() for zone in environment.locations)
+    events = [environment.generate_disaster_event().to_wire() for _ in range(500)]
+    zone_map = {zone: {"events": [e for e in events if e["location"] == zone][:50],
+                       "conditions": conditions.get(zone).to_wire()}
+                for zone in environment.locations}
+    return [
+        ("single alert", json.dumps(events[0])),
+        ("batch of 100 alerts", json.dumps(events[:100])),
+        ("per-zone map", json.dumps(zone_map)),
+        ("condition history", json.dumps(history)),
+    ]
+
+
+def measure(text, compress, level, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        chunks, metadata = encode_body(text, compress=compress, threshold=0, level=level)
+    encode_us = (time.perf_counter() - start) / repeats * 1e6
+    wire = "".join(chunks)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        decoded = decode_body(wire, metadata["encoding"])
+    decode_us = (time.perf_counter() - start) / repeats * 1e6
+    assert decoded == text
+    return len(wire), len(chunks), encode_us, decode_us
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"\n{'='*84}")
+    print(f"MESSAGE CODEC BENCHMARK (chunk limit {MAX_BODY:,} bytes)")
+    print(f"{'='*84}")
+    print(f"{'payload':<22}{'encoding':<10}{'body B':>10}{'wire B':>10}{'ratio':>8}"
+          f"{'msgs':>6}{'enc us':>10}{'dec us':>10}")
+    for name, text in payloads():
+        body_bytes = len(text.encode("utf-8"))
+        for label, compress, level in (("identity", False, 0), ("zlib-1", True, 1),
+                                       ("zlib-6", True, 6), ("zlib-9", True, 9)):
+            wire, messages, encode_us, decode_us = measure(text, compress, level, repeats)
+            print(f"{name:<22}{label:<10}{body_bytes:>10,}{wire:>10,}{wire / body_bytes:>8.2f}"
+                  f"{messages:>6}{encode_us:>10,.1f}{decode_us:>10,.1f}")
+    print(f"{'='*84}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Throughput benchmark for the shared-memory event ring.
+
+Compares the per-event cost of the message path (to_json, Message,
+from_json) with writing and reading ring records, then streams events from
+one producer to 1, 2 and 4 consumer processes through a block-policy ring
+and reports events per second delivered to every consumer.
+
+Usage:
+    python bench_event_ring.py [event_count]
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+from event_ring import RingProducer, RingConsumer, BLOCK
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+import agent_runtime
+from disaster_environment import DisasterEnvironment
+from disaster_models import DisasterEvent
+
+BATCH = 256
+
+
+def make_events(count):
+    environment = DisasterEnvironment()
+    pool = [environment.generate_disaster_event().detected(i) for i in range(1024)]
+    return [pool[i % len(pool)] for i in range(count)]
+
+
+def bench_message_path(events):
+    agent_runtime.configure("local")
+    Message = agent_runtime.Message
+    start = time.perf_counter()
+    for event in events:
+        msg = Message(to="rescue@local", sender="sensor@local", body=event.to_json(),
+                      metadata={"performative": "inform", "ontology": "disaster-response"})
+        DisasterEvent.from_json(msg.body)
+    return len(events) / (time.perf_counter() - start)
+
+
+def bench_ring_local(events):
+    producer = RingProducer(capacity=4096, policy=BLOCK)
+    consumer = RingConsumer(producer.name, 0)
+    start = time.perf_counter()
+    received = 0
+    for i in range(0, len(events), BATCH):
+        producer.publish_many(events[i:i + BATCH])
+        received += len(consumer.poll(BATCH))
+    elapsed = time.perf_counter() - start
+    consumer.close()
+    producer.close()
+    assert received == len(events)
+    return len(events) / elapsed
+
+
+def consume(name, slot, expected, ready, results):
+    consumer = RingConsumer(name, slot)
+    ready.put(slot)
+    received = 0
+    while received < expected:
+        events = consumer.poll(BATCH)
+        if not events:
+            os.sched_yield()  # let the producer run on a busy or single-CPU host
+        received += len(events)
+    results.put((slot, received, consumer.lost, time.perf_counter()))
+    consumer.close()
+
+
+def bench_ring_processes(events, consumers):
+    producer = RingProducer(capacity=8192, max_consumers=consumers, policy=BLOCK)
+    ready, results = multiprocessing.Queue(), multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=consume,
+                                         args=(producer.name, slot, len(events), ready, results))
+                 for slot in range(consumers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+
+    start = time.perf_counter()
+    sent = 0
+    while sent < len(events):
+        written = producer.publish_many(events[sent:sent + BATCH])
+        if not written:
+            os.sched_yield()
+        sent += written
+    outcomes = [results.get() for _ in processes]
+    elapsed = max(finished for _, _, _, finished in outcomes) - start
+    for process in processes:
+        process.join()
+    producer.close()
+    lost = sum(lost for _, _, lost, _ in outcomes)
+    return len(events) / elapsed, lost
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    events = make_events(count)
+
+    print(f"\n{'='*60}")
+    print(f"EVENT RING THROUGHPUT ({count:,} events)")
+    print(f"{'='*60}")
+    message_rate = bench_message_path(events[:min(count, 50_000)])
+    print(f"JSON + Message + parse (one process) : {message_rate:>12,.0f} events/s")
+    print(f"Ring write + read      (one process) : {bench_ring_local(events):>12,.0f} events/s")
+    for consumers in (1, 2, 4):
+        rate, lost = bench_ring_processes(events, consumers)
+        print(f"Ring -> {consumers} consumer process(es)       : {rate:>12,.0f} events/s "
+              f"to each (lost {lost})")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
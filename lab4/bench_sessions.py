@@ -0,0 +1,162 @@
+"""
+Session benchmark: one session per agent vs one shared session.
+
+Starts the stand-in server from lab2/session_mux.py in its own process,
+then, in a fresh interpreter per row, logs in N agents either with a
+session each (as with the xmpp transport) or as resources of one shared
+session (AGENT_TRANSPORT=mux). It reports:
+
+  - setup: logging in and starting every agent
+  - memory: Python allocations held by the sessions and agents
+    (tracemalloc), per agent, and the process's peak RSS
+  - sockets: file descriptors the agents' process holds open
+  - round trip: every agent sends one INFORM through the server to a sink
+    agent on its own session, until the sink has them all
+
+Usage:
+    python bench_sessions.py [agent_count ...] [--handshake-ms MS]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+LAB2 = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lab2')
+sys.path.insert(0, LAB2)
+
+
+def measure(count, mode, port):
+    """Runs in the child process; returns one result dict"""
+    from local_runtime import Agent, CyclicBehaviour, OneShotBehaviour, Message, set_transport
+    from session_mux import SessionClient, MuxTransport
+
+    class SinkAgent(Agent):
+        class Count(CyclicBehaviour):
+            async def run(self):
+                if await self.receive(timeout=5):
+                    self.agent.received += 1
+                    if self.agent.received == count:
+                        self.agent.done.set()
+
+        async def setup(self):
+            self.received = 0
+            self.done = asyncio.Event()
+            self.add_behaviour(self.Count())
+
+    class PingAgent(Agent):
+        class Ping(OneShotBehaviour):
+            async def run(self):
+                await self.send(Message(to=self.agent.sink, body="ping",
+                                        metadata={"performative": "inform"}))
+
+        def ping(self, sink):
+            self.sink = sink
+            self.add_behaviour(self.Ping())
+
+    async def session(jid):
+        return MuxTransport(await SessionClient(jid, "bench", "127.0.0.1", port).connect())
+
+    async def run():
+        prefix = f"{mode}{count}"
+        sink_transport = set_transport(await session(f"{prefix}sink@bench"))
+        sink = SinkAgent(sink_transport.address("sink"), "bench")
+        await sink.start()
+        fds_before = len(os.listdir("/proc/self/fd"))
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        agents = []
+        if mode == "shared":
+            transport = set_transport(await session(f"{prefix}@bench"))
+            for i in range(count):
+                agents.append(PingAgent(transport.address(f"agent{i}"), "bench"))
+                await agents[-1].start()
+        else:
+            for i in range(count):
+                transport = set_transport(await session(f"{prefix}agent{i}@bench"))
+                agents.append(PingAgent(transport.address("main"), "bench"))
+                await agents[-1].start()
+        setup_ms = (time.perf_counter() - start) * 1000
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        fds = len(os.listdir("/proc/self/fd")) - fds_before
+
+        start = time.perf_counter()
+        for agent in agents:
+            agent.ping(str(sink.jid))
+        await asyncio.wait_for(sink.done.wait(), timeout=60)
+        round_trip_ms = (time.perf_counter() - start) * 1000
+
+        sessions = {id(agent.transport): agent.transport for agent in agents}
+        for agent in agents + [sink]:
+            await agent.stop()
+        for transport in list(sessions.values()) + [sink_transport]:
+            await transport.client.close()
+        return setup_ms, memory, fds, round_trip_ms
+
+    setup_ms, memory, fds, round_trip_ms = asyncio.run(run())
+    return {
+        "agents": count,
+        "mode": mode,
+        "setup_ms": setup_ms,
+        "kb_per_agent": memory / count / 1024,
+        "sockets": fds,
+        "round_trip_ms": round_trip_ms,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def start_server(handshake_ms):
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(LAB2, "session_mux.py"), "serve", "--port", "0",
+         "--handshake-ms", str(handshake_ms)],
+        stdout=subprocess.PIPE, text=True)
+    port = int(server.stdout.readline().split()[1])
+    return server, port
+
+
+def run_child(count, mode, port):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", str(count), mode, str(port)],
+        capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        print(json.dumps(measure(int(sys.argv[2]), sys.argv[3], int(sys.argv[4]))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("counts", nargs="*", type=int, default=[10, 100, 1000])
+    parser.add_argument("--handshake-ms", type=float, default=0,
+                        help="delay the server adds to every login (stands in for TLS/SASL)")
+    args = parser.parse_args()
+
+    server, port = start_server(args.handshake_ms)
+    try:
+        print(f"\n{'='*78}")
+        print(f"AGENT SESSIONS (stand-in server, login handshake +{args.handshake_ms:g}ms)")
+        print(f"{'='*78}")
+        print(f"{'agents':>7} {'sessions':<10} {'setup':>11} {'memory/agent':>13} {'sockets':>8} "
+              f"{'round trip':>12} {'peak RSS':>10}")
+        for count in args.counts:
+            for mode in ("per-agent", "shared"):
+                r = run_child(count, mode, port)
+                print(f"{r['agents']:>7} {r['mode']:<10} {r['setup_ms']:>9.1f}ms "
+                      f"{r['kb_per_agent']:>11.1f}KB {r['sockets']:>8} {r['round_trip_ms']:>10.1f}ms "
+                      f"{r['peak_rss_mb']:>8.1f}MB")
+        print(f"{'='*78}\n")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
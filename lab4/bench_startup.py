@@ -0,0 +1,121 @@
+"""
+Startup benchmark for 1, 100 and 1000 agents.
+
+Each measurement runs in a fresh interpreter on the local transport and
+virtual clock, and times importing the agent modules, building N sensor
+agents plus one rescue agent, and starting them until every sensor has
+run its first detection cycle. Sensors either share the injected
+environment (the default) or each get their own DisasterEnvironment, as
+they did when every behaviour built one in on_start().
+
+Usage:
+    python bench_startup.py [agent_count ...]
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+
+
+def measure(count, mode):
+    """Runs in the child process; returns one result dict"""
+    import agent_runtime
+    import local_runtime
+
+    clock = local_runtime.VirtualClock()
+    clock.install()
+    agent_runtime.configure("local")
+
+    start = time.perf_counter()
+    from multi_agent_communication import SensorAgent, RescueAgent
+    from disaster_environment import DisasterEnvironment
+    import_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    rescue = RescueAgent("rescue@bench", "rescue")
+    sensors = []
+    for i in range(count):
+        environment = DisasterEnvironment() if mode == "per-agent" else None
+        sensors.append(SensorAgent(f"sensor{i}@bench", "sensor", environment=environment))
+    build_ms = (time.perf_counter() - start) * 1000
+
+    async def start_all():
+        await rescue.start()
+        for sensor in sensors:
+            await sensor.start()
+            sensor.rescue_jid = "rescue@bench"
+        # Periodic behaviours fire immediately, so one short pause runs every first cycle
+        while any(not hasattr(b, "detection_count") or b.detection_count == 0
+                  for sensor in sensors for b in sensor.behaviours):
+            await asyncio.sleep(0.001)
+        elapsed = (time.perf_counter() - start) * 1000
+        for agent in sensors + [rescue]:
+            await agent.stop()
+        return elapsed
+
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        start = time.perf_counter()
+        start_ms = local_runtime.run(start_all(), clock)
+        rescue.store.close()
+
+    return {
+        "agents": count,
+        "mode": mode,
+        "import_ms": import_ms,
+        "build_ms": build_ms,
+        "start_ms": start_ms,
+        "environments": len({id(sensor.environment) for sensor in sensors}),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "xmpp_loaded": any(name.split(".")[0] in ("spade", "aioxmpp") for name in sys.modules),
+    }
+
+
+def run_child(count, mode):
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", str(count), mode],
+            cwd=workdir, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def xmpp_import_ms():
+    """Time to import the XMPP stack in a fresh interpreter, or None if it is not installed"""
+    code = "import time; s = time.perf_counter(); import spade.agent; print((time.perf_counter() - s) * 1000)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return float(result.stdout) if result.returncode == 0 else None
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        print(json.dumps(measure(int(sys.argv[2]), sys.argv[3])))
+        return
+
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 100, 1000]
+    print(f"\n{'='*78}")
+    print("AGENT STARTUP (local transport, fresh interpreter per row)")
+    print(f"{'='*78}")
+    print(f"{'agents':>7} {'environment':<11} {'import':>10} {'build':>10} {'start':>10} "
+          f"{'envs':>6} {'peak RSS':>10} {'XMPP':>5}")
+    for count in counts:
+        for mode in ("shared", "per-agent"):
+            r = run_child(count, mode)
+            print(f"{r['agents']:>7} {r['mode']:<11} {r['import_ms']:>8.1f}ms {r['build_ms']:>8.1f}ms "
+                  f"{r['start_ms']:>8.1f}ms {r['environments']:>6} {r['peak_rss_mb']:>8.1f}MB "
+                  f"{'yes' if r['xmpp_loaded'] else 'no':>5}")
+
+    xmpp_ms = xmpp_import_ms()
+    print(f"\nImporting spade/aioxmpp (AGENT_TRANSPORT=xmpp only): "
+          f"{'not installed' if xmpp_ms is None else f'{xmpp_ms:.1f}ms'}")
+    print(f"{'='*78}\n")
+
+
+if __name__ == "__main__":
+    main()
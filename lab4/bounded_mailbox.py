@@ -0,0 +1,283 @@
+"""
+Lab 4: Bounded Mailboxes and Back-Pressure
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+SPADE gives every behaviour an unbounded asyncio.Queue, so a slow
+handle_inform lets the rescue agent's mailbox grow while sensors keep
+sending. BoundedMailboxMixin caps a behaviour's mailbox and applies an
+overflow policy when it is full:
+
+  drop-lowest  evict the lowest-severity alert (possibly the new one) and
+               send FAILURE to the evicted alert's sender
+  coalesce     replace a queued alert with the same sender and alert key
+               (type/zone) by the newer one, at any time (an older copy, such
+               as a retransmission, is discarded instead); when full with no
+               duplicate, evict the oldest alert and send FAILURE
+  reject       do not queue the new alert and send REFUSE to its sender
+
+REFUSE/FAILURE replies use the "back-pressure" protocol and carry a
+retry-after-ms hint. Sensors pass them to handle_backpressure(), which
+throttles their AdaptiveSampler.
+
+With acknowledged delivery (reliable_delivery.py), alerts that were
+coalesced away or evicted are recorded in the agent's Inbox as delivered,
+so they are acknowledged rather than retransmitted. A rejected alert is
+not, and comes back once the sender retries.
+
+Alerts are ranked by their "severity" metadata, and coalesced by their
+"alert-key" metadata; sensors set both with alert_metadata(). Messages
+without a severity (requests, subscriptions) are never evicted, and
+acknowledgements and back-pressure replies are always queued.
+"""
+
+import asyncio
+import json
+import os
+from collections import deque
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_runtime import Message
+from agent_metrics import MAILBOX_DROPPED, MAILBOX_COALESCED, MAILBOX_REJECTED
+from disaster_models import Severity, ValidationError
+from message_codec import send_message
+from reliable_delivery import RELIABLE_PROTOCOL
+
+DROP_LOWEST = "drop-lowest"
+COALESCE = "coalesce"
+REJECT = "reject"
+POLICIES = (DROP_LOWEST, COALESCE, REJECT)
+
+MAILBOX_CAPACITY = int(os.environ.get("AGENT_MAILBOX_CAPACITY", "100"))
+MAILBOX_POLICY = os.environ.get("AGENT_MAILBOX_POLICY", DROP_LOWEST)
+RETRY_AFTER_MS = int(os.environ.get("AGENT_MAILBOX_RETRY_AFTER_MS", "5000"))
+
+BACKPRESSURE_PROTOCOL = "back-pressure"
+
+# Acknowledgements and back-pressure replies are small and unblock their
+# sender, so they are queued even when the mailbox is full
+CONTROL_PROTOCOLS = (RELIABLE_PROTOCOL, BACKPRESSURE_PROTOCOL)
+
+# Messages without a severity outrank every alert, so they are never evicted
+_UNRANKED = len(Severity)
+
+
+def alert_metadata(event):
+    """Metadata that lets a receiver's mailbox rank and coalesce an alert"""
+    return {"severity": str(event.severity), "alert-key": f"{event.type}/{event.location}"}
+
+
+def message_rank(msg):
+    severity = msg.get_metadata("severity")
+    if severity is None:
+        return _UNRANKED
+    try:
+        return Severity.parse(severity).rank
+    except ValidationError:
+        return _UNRANKED
+
+
+def sent_before(msg, other):
+    """True if `msg` was sent before `other` in the same acknowledged conversation"""
+    conversation = msg.get_metadata("rd-conversation")
+    if conversation is None or conversation != other.get_metadata("rd-conversation"):
+        return False
+    try:
+        return int(msg.get_metadata("rd-seq")) < int(other.get_metadata("rd-seq"))
+    except (TypeError, ValueError):
+        return False
+
+
+def coalesce_key(msg):
+    key = msg.get_metadata("alert-key")
+    if key is None or msg.get_metadata("chunk-id"):
+        return None  # parts of a chunked body are never merged
+    return str(msg.sender).split("/")[0], key
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MAILBOX
+# ═══════════════════════════════════════════════════════════════════
+
+class BoundedMailbox(asyncio.Queue):
+    """
+    asyncio.Queue whose admission is decided by offer().
+
+    put()/put_nowait() still work and never block; offer() enforces the
+    capacity. Each entry is a one-item list so a coalesced message can be
+    swapped in place without moving it in the queue.
+    """
+
+    def __init__(self, capacity=MAILBOX_CAPACITY, policy=MAILBOX_POLICY):
+        if policy not in POLICIES:
+            raise ValueError(f"Mailbox policy must be one of {POLICIES}")
+        self.capacity = capacity
+        self.policy = policy
+        super().__init__()
+
+    def _init(self, maxsize):
+        self._queue = deque()
+        self._slots = {}
+
+    def _put(self, msg):
+        slot = [msg]
+        self._queue.append(slot)
+        if self.policy == COALESCE:
+            key = coalesce_key(msg)
+            if key is not None:
+                self._slots[key] = slot
+
+    def _get(self):
+        slot = self._queue.popleft()
+        self._forget(slot)
+        return slot[0]
+
+    def _forget(self, slot):
+        if self._slots:
+            key = coalesce_key(slot[0])
+            if self._slots.get(key) is slot:
+                del self._slots[key]
+
+    def offer(self, msg):
+        """
+        Try to queue `msg`. Returns (outcome, displaced) where outcome is
+        "queued", "coalesced", "dropped" or "rejected" and displaced is the
+        message that was replaced, evicted or refused (None when nothing
+        was lost).
+        """
+        if msg.get_metadata("protocol") in CONTROL_PROTOCOLS:
+            self.put_nowait(msg)
+            return "queued", None
+        if self.policy == COALESCE:
+            slot = self._slots.get(coalesce_key(msg))
+            if slot is not None:
+                if sent_before(msg, slot[0]):
+                    return "coalesced", msg  # a stale copy of an alert already superseded
+                displaced, slot[0] = slot[0], msg
+                return "coalesced", displaced
+        if self.qsize() < self.capacity:
+            self.put_nowait(msg)
+            return "queued", None
+        if self.policy == REJECT:
+            return "rejected", msg
+
+        # The queue is bounded, so linear scans for a victim are cheap
+        ranked = [slot for slot in self._queue if message_rank(slot[0]) != _UNRANKED]
+        if not ranked:
+            return "rejected", msg
+        if self.policy == DROP_LOWEST:
+            victim = min(ranked, key=lambda slot: message_rank(slot[0]))
+            if message_rank(msg) <= message_rank(victim[0]):
+                return "dropped", msg
+        else:
+            victim = ranked[0]
+        # deque.remove() compares with ==, and equal messages may be queued twice
+        for index, slot in enumerate(self._queue):
+            if slot is victim:
+                del self._queue[index]
+                break
+        self._forget(victim)
+        self.put_nowait(msg)
+        return "dropped", victim[0]
+
+
+# ═══════════════════════════════════════════════════════════════════
+# BEHAVIOUR MIXIN
+# ═══════════════════════════════════════════════════════════════════
+
+class BoundedMailboxMixin:
+    """
+    Mix into a SPADE behaviour (before CyclicBehaviour) to bound its mailbox:
+
+        class MessageReceiverBehaviour(BoundedMailboxMixin, CyclicBehaviour):
+            mailbox_name = "receiver"
+    """
+
+    mailbox_capacity = MAILBOX_CAPACITY
+    overflow_policy = MAILBOX_POLICY
+    mailbox_name = "mailbox"
+
+    def set_agent(self, agent):
+        super().set_agent(agent)
+        self.queue = BoundedMailbox(self.mailbox_capacity, self.overflow_policy)
+        labels = (str(agent.jid), self.mailbox_name)
+        self._dropped = MAILBOX_DROPPED.labels(*labels)
+        self._coalesced = MAILBOX_COALESCED.labels(*labels)
+        self._rejected = MAILBOX_REJECTED.labels(*labels)
+
+    async def enqueue(self, message):
+        outcome, displaced = self.queue.offer(message)
+        if outcome == "coalesced":
+            self._coalesced.inc()
+            self._settle(displaced)
+        elif outcome == "dropped":
+            self._dropped.inc()
+            self._settle(displaced)
+            await self._backpressure(displaced, "failure", "evicted from a full mailbox")
+        elif outcome == "rejected":
+            self._rejected.inc()
+            await self._backpressure(displaced, "refuse", "mailbox full")
+
+    def _settle(self, msg):
+        # Acknowledge an alert that will never be handled, or its sender
+        # would retransmit it (over a newer one, when coalescing)
+        inbox = getattr(self.agent, "inbox", None)
+        if inbox is not None:
+            inbox.accept(msg)
+
+    async def _backpressure(self, msg, performative, reason):
+        await send_backpressure(self, msg, performative, reason)
+
+
+async def send_backpressure(behaviour, msg, performative, reason):
+    """Answer `msg` with a back-pressure REFUSE or FAILURE from `behaviour`"""
+    if msg.get_metadata("protocol") == BACKPRESSURE_PROTOCOL:
+        return  # never answer a back-pressure reply with another one
+    reply = Message(
+        to=str(msg.sender),
+        sender=str(behaviour.agent.jid),
+        body=json.dumps({"reason": reason, "alert-key": msg.get_metadata("alert-key"),
+                         "retry_after_ms": RETRY_AFTER_MS}),
+        metadata={
+            "performative": performative,
+            "ontology": "disaster-response",
+            "protocol": BACKPRESSURE_PROTOCOL,
+            "retry-after-ms": str(RETRY_AFTER_MS),
+        }
+    )
+    await send_message(behaviour, reply)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SENSOR SIDE
+# ═══════════════════════════════════════════════════════════════════
+
+async def handle_backpressure(behaviour, sampler):
+    """
+    Drain a sensor behaviour's mailbox without waiting and, if any
+    REFUSE/FAILURE back-pressure replies arrived since the last cycle,
+    throttle its sampler once. Returns the number of replies seen.
+    """
+    signals = 0
+    retry_after = 0
+    codec = getattr(behaviour.agent, "codec", None)
+    while True:
+        msg = await behaviour.receive(timeout=0)
+        if msg is None:
+            break
+        if codec is not None and not codec.unpack(msg):
+            continue
+        if msg.get_metadata("protocol") != BACKPRESSURE_PROTOCOL:
+            continue
+        signals += 1
+        try:
+            retry_after = max(retry_after, int(msg.get_metadata("retry-after-ms") or 0) / 1000)
+        except ValueError:
+            pass
+
+    if signals:
+        period = sampler.throttle(retry_after)
+        print(f"[BACK-PRESSURE] {signals} REFUSE/FAILURE replies: "
+              f"slowing to one cycle per {period:g}s")
+    return signals
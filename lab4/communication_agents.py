@@ -6,7 +6,8 @@ Disaster Response & Relief Coordination System
 This module implements inter-agent communication using FIPA-ACL performatives.
 - SensorAgent detects disasters and sends INFORM messages
 - RescueAgent receives messages, parses them, and triggers actions
-- CoordinatorAgent can send REQUEST messages for status updates
+- CoordinatorAgent (coordinator_agent.py) aggregates sensor reports per region
+  and answers status REQUESTs from its cache
 
 FIPA-ACL Performatives Used:
   - INFORM: Notify other agents of disaster events
@@ -14,16 +15,32 @@ FIPA-ACL Performatives Used:
 """
 
 import asyncio
-import json
-from datetime import datetime
-from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
-from spade.message import Message
 
 # Import the disaster environment from Lab 2
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
-from disaster_environment import DisasterEnvironment
+from agent_runtime import Agent, CyclicBehaviour, PeriodicBehaviour, Message
+from agent_metrics import (PERCEPTION_CYCLES, DISASTERS_DETECTED, RESCUE_EVENTS, RESCUE_RESPONSES,
+                           MESSAGES_SENT, MESSAGES_RECEIVED, HANDLER_LATENCY, track_mailbox,
+                           record_event_latency, start_metrics_server)
+from behaviour_profiler import maybe_profile
+from adaptive_sampling import AdaptiveSampler
+from event_analytics import StreamingEventAnalytics
+from event_time import now_ns, format_timestamp
+from disaster_models import DisasterEvent, StatusRequest, StatusReport, ValidationError
+from dispatch_rules import shared_rules
+from road_network import shared_road_network, SECONDS_PER_MINUTE
+from rescue_fleet import RescueFleet
+from event_fusion import EventFusion, report_count
+from incident_store import IncidentStore
+from message_codec import MessageCodec
+from reliable_delivery import Outbox, Inbox, DeliveryBehaviour
+from bounded_mailbox import BoundedMailboxMixin, alert_metadata, handle_backpressure
+from coordinator_agent import STATUS_REPORT
+
+
+# Rescue incidents survive restarts in this local database
+INCIDENT_DB = "rescue_incidents.db"
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -32,7 +49,7 @@ from disaster_environment import DisasterEnvironment
 
 def log_message(direction, sender, receiver, performative, content):
     """Log message details to file and console"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = format_timestamp(now_ns())
     
     log_entry = f"""
 {'='*60}
@@ -67,61 +84,73 @@ class SensorAgent(Agent):
             print(f"\n{'*'*60}")
             print(f"SensorAgent {self.agent.jid} starting...")
             print(f"{'*'*60}\n")
-            self.environment = DisasterEnvironment()
+            self.environment = self.agent.environment
+            self.sampler = AdaptiveSampler(self.period.total_seconds())
             self.detection_count = 0
             
         async def run(self):
             """Detect disasters and send INFORM messages"""
+            await handle_backpressure(self, self.sampler)
             self.detection_count += 1
+            PERCEPTION_CYCLES.labels(str(self.agent.jid)).inc()
             
             print(f"\n--- Detection Cycle {self.detection_count} ---")
             
             # Get environmental conditions
             conditions = self.environment.get_environmental_conditions()
-            print(f"Monitoring: Temp={conditions['temperature']}°C, "
-                  f"Wind={conditions['wind_speed']}km/h, "
-                  f"Visibility={conditions['visibility']}")
+            print(f"Monitoring: Temp={conditions.temperature}°C, "
+                  f"Wind={conditions.wind_speed}km/h, "
+                  f"Visibility={conditions.visibility}")
             
-            # 40% chance of detecting a disaster
+            # 40% chance of detecting a disaster per base period
             import random
-            if random.random() < 0.4:
+            event = None
+            if random.random() < self.sampler.detection_chance(0.4):
                 event = self.environment.generate_disaster_event()
-                print(f"\n🚨 DISASTER DETECTED: {event['type']} at {event['location']}")
+                event = event.detected(now_ns())
+                print(f"\n🚨 DISASTER DETECTED: {event.type} at {event.location}")
+                DISASTERS_DETECTED.labels(str(self.agent.jid), event.type, event.severity).inc()
                 
                 # Send INFORM message to RescueAgent
                 await self.send_disaster_inform(event)
             else:
                 print("✓ All clear - no disaster detected")
+            self.sampler.adjust(self, [conditions], event)
                 
         async def send_disaster_inform(self, event):
             """Send INFORM message about detected disaster"""
             msg = Message(
                 to=self.agent.rescue_agent_jid,
                 sender=str(self.agent.jid),
-                body=json.dumps(event),
+                body=event.to_json(),
                 metadata={
                     "performative": "inform",
                     "ontology": "disaster-response",
-                    "language": "JSON"
+                    "language": "JSON",
+                    **alert_metadata(event),
                 }
             )
             msg.set_metadata("performative", "inform")
             
-            await self.send(msg)
+            await self.agent.outbox.send(self, msg)
+            MESSAGES_SENT.labels(str(self.agent.jid), "inform").inc()
             
             log_message(
                 direction="OUTGOING MESSAGE",
                 sender=str(self.agent.jid),
                 receiver=self.agent.rescue_agent_jid,
                 performative="INFORM",
-                content=f"Disaster: {event['type']} | Location: {event['location']} | "
-                        f"Severity: {event['severity']} | Casualties: {event['casualties']}"
+                content=f"Disaster: {event.type} | Location: {event.location} | "
+                        f"Severity: {event.severity} | Casualties: {event.casualties}"
             )
             
     async def setup(self):
         self.rescue_agent_jid = "kwasirescueagent1@xmpp.jp"
+        self.codec = MessageCodec(str(self.jid))
+        self.outbox = Outbox(str(self.jid))  # INFORMs are acknowledged and retransmitted
         behaviour = self.DetectionBehaviour(period=8)  # Check every 8 seconds
         self.add_behaviour(behaviour)
+        self.add_behaviour(DeliveryBehaviour(), DeliveryBehaviour.template())
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -134,22 +163,38 @@ class RescueAgent(Agent):
     Can send REQUEST messages to ask for status updates.
     """
     
-    class MessageReceiverBehaviour(CyclicBehaviour):
+    class MessageReceiverBehaviour(BoundedMailboxMixin, CyclicBehaviour):
         """Continuously listen for incoming messages"""
+        mailbox_name = "receiver"
         
         async def on_start(self):
             print(f"\n{'*'*60}")
             print(f"RescueAgent {self.agent.jid} starting...")
             print(f"Listening for disaster alerts...")
             print(f"{'*'*60}\n")
-            self.agent.responses = 0
+            track_mailbox(self, "receiver")
+            
+            # Finish incidents that were open when the agent last stopped
+            for incident_id, event, state in self.agent.store.open_incidents():
+                print(f"[RescueAgent] Resuming incident #{incident_id} (last state: {state})")
+                await self.process_event(event, incident_id)
+            # Reports received before the restart that no incident accounts for yet
+            for report_id, event, source, reports in self.agent.store.pending_reports():
+                self.agent.fusion.add(event, source, reports, receipt=report_id)
             
         async def run(self):
             """Receive and process messages"""
-            msg = await self.receive(timeout=10)
+            timeout = self.agent.inbox.next_timeout(self.agent.fusion.next_timeout(10))
+            msg = await self.receive(timeout=timeout)
+            for incident in self.agent.fusion.release_due():
+                await self.handle_incident(incident)
+            if msg and not (self.agent.codec.unpack(msg) and self.agent.inbox.accept(msg)):
+                msg = None  # incomplete chunked body, undecodable or already delivered
             
             if msg:
                 performative = msg.get_metadata("performative")
+                agent_name = str(self.agent.jid)
+                MESSAGES_RECEIVED.labels(agent_name, performative or "unknown").inc()
                 
                 log_message(
                     direction="INCOMING MESSAGE",
@@ -160,49 +205,95 @@ class RescueAgent(Agent):
                 )
                 
                 # Parse and handle the message
-                if performative == "inform":
-                    await self.handle_inform(msg)
-                elif performative == "request":
-                    await self.handle_request(msg)
-                else:
-                    print(f"⚠️  Unknown performative: {performative}")
+                with HANDLER_LATENCY.labels(agent_name, performative or "unknown").time():
+                    if performative == "inform" and msg.get_metadata("message_type") == STATUS_REPORT:
+                        self.handle_status_report(msg)
+                    elif performative == "inform":
+                        await self.handle_inform(msg)
+                    elif performative == "request":
+                        await self.handle_request(msg)
+                    else:
+                        print(f"⚠️  Unknown performative: {performative}")
+
+            self.agent.store.settle_reports(self.agent.fusion.settled())
+            # Acknowledge only once every report handled so far is committed
+            await self.agent.inbox.send_acks(self, durable=self.agent.store.flushed)
                     
         async def handle_inform(self, msg):
             """Handle INFORM messages about disasters"""
             try:
-                event = json.loads(msg.body)
+                event = DisasterEvent.from_json(msg.body)
+            except ValidationError as e:
+                print(f"⚠️  Rejected disaster alert: {e}")
+                return
                 
-                print(f"\n{'─'*60}")
-                print(f"[RescueAgent] Processing disaster alert...")
-                print(f"  Type     : {event['type']}")
-                print(f"  Location : {event['location']}")
-                print(f"  Severity : {event['severity']}")
-                print(f"  Casualties: {event['casualties']}")
-                print(f"  Resources: {event['resources_needed']}")
+            # Recorded until an incident accounts for it, so an acknowledged report survives a restart
+            receipt = self.agent.store.add_report(event, str(msg.sender), report_count(msg))
+            incident = self.agent.fusion.add(event, str(msg.sender), report_count(msg), receipt=receipt)
+            if incident is not None:
+                await self.handle_incident(incident, msg.sender)
+
+        async def handle_incident(self, incident, sender=None):
+            """Open and process an incident released by event fusion"""
+            event = incident.event
+            RESCUE_EVENTS.labels(str(self.agent.jid)).inc()
+            latency_ms = record_event_latency(self.agent, event)
+            self.agent.analytics.record(event)
+            incident_id = self.agent.store.open_incident(event, "RECEIVED")
+            self.agent.store.settle_reports(incident.receipts)
+            print(f"\n[RescueAgent] Fused {incident.reports} reports from {len(incident.sources)} sources "
+                  f"(confidence {incident.confidence:.2f}, released on {incident.reason})")
+            await self.process_event(event, incident_id, sender or incident.sources[0], latency_ms)
+            
+        async def process_event(self, event, incident_id, sender=None, latency_ms=None):
+            """Assess a disaster event and trigger rescue actions"""
+            print(f"\n{'─'*60}")
+            print(f"[RescueAgent] Processing disaster alert...")
+            print(f"  Type     : {event.type}")
+            print(f"  Location : {event.location}")
+            print(f"  Severity : {event.severity}")
+            print(f"  Casualties: {event.casualties}")
+            print(f"  Resources: {event.resources_needed}")
+            if latency_ms is not None:
+                print(f"  Latency  : {latency_ms:.1f} ms from detection")
+            
+            # Trigger action according to the dispatch rules
+            conditions = self.agent.environment.get_environmental_conditions(event.location)
+            decision = self.agent.rules.decide(event, conditions)
+            print(f"  Rule     : {decision.rule} -> {decision.action}")
+            if decision.dispatch:
+                self.agent.store.update_state(incident_id, "DISPATCHING")
+                assignment = self.agent.fleet.assign(event)
+                if assignment is None:
+                    print(f"  ⚠️  No {event.resources_needed} team can reach {event.location} - not dispatched")
+                    self.agent.store.close_incident(incident_id, "UNASSIGNED")
+                    print(f"{'─'*60}\n")
+                    return
+                print(f"\n  🚁 ACTION: Deploying rescue team to {event.location}")
+                print(f"  📦 Allocating resources: {event.resources_needed}")
+                print(f"  🚒 Team: {assignment.team_id} from {assignment.origin}, "
+                      f"ETA {(assignment.arrive_at - self.agent.fleet.clock()) / SECONDS_PER_MINUTE:.0f} min "
+                      f"via {' -> '.join(assignment.path)}")
+                self.agent.responses += 1
+                self.agent.store.set_counter("responses", self.agent.responses)
+                RESCUE_RESPONSES.labels(str(self.agent.jid)).inc()
                 
-                # Trigger action based on severity
-                if event['severity'] in ('Medium', 'High', 'Critical'):
-                    print(f"\n  🚁 ACTION: Deploying rescue team to {event['location']}")
-                    print(f"  📦 Allocating resources: {event['resources_needed']}")
-                    self.agent.responses += 1
-                    
-                    # Optionally send REQUEST to sensor for more info
-                    if event['severity'] == 'Critical':
-                        await self.request_additional_info(msg.sender, event['location'])
-                else:
-                    print(f"  ℹ️  Low severity - logging only")
-                    
-                print(f"{'─'*60}\n")
+                # Optionally send REQUEST to sensor for more info
+                if decision.request_info and sender is not None:
+                    await self.request_additional_info(sender, event.location)
+                self.agent.store.close_incident(incident_id, "DISPATCHED")
+            else:
+                print(f"  ℹ️  No dispatch required - logging only")
+                self.agent.store.close_incident(incident_id, "LOGGED")
                 
-            except json.JSONDecodeError:
-                print(f"⚠️  Failed to parse message body as JSON")
+            print(f"{'─'*60}\n")
                 
         async def request_additional_info(self, sensor_jid, location):
             """Send REQUEST message for additional information"""
             request_msg = Message(
                 to=str(sensor_jid),
                 sender=str(self.agent.jid),
-                body=f"Request detailed status for {location}",
+                body=StatusRequest(location=location, timestamp_ns=now_ns()).to_json(),
                 metadata={
                     "performative": "request",
                     "ontology": "disaster-response"
@@ -210,7 +301,8 @@ class RescueAgent(Agent):
             )
             request_msg.set_metadata("performative", "request")
             
-            await self.send(request_msg)
+            await self.agent.codec.send(self, request_msg)
+            MESSAGES_SENT.labels(str(self.agent.jid), "request").inc()
             
             log_message(
                 direction="OUTGOING MESSAGE",
@@ -220,11 +312,38 @@ class RescueAgent(Agent):
                 content=f"Requesting detailed status for {location}"
             )
             
+        def handle_status_report(self, msg):
+            """Print a coordinator's answer to a status REQUEST"""
+            try:
+                report = StatusReport.from_json(msg.body)
+            except ValidationError as e:
+                print(f"\n[RescueAgent] ⚠️  Rejected status report: {e}")
+                return
+            print(f"\n[RescueAgent] Status of {report.location} from {msg.sender}: "
+                  f"{report.reports} reports, {len(report.incidents)} active incidents")
+            if report.conditions is not None:
+                print(f"  Access: {report.conditions.accessibility} | "
+                      f"Visibility: {report.conditions.visibility}")
+            
         async def handle_request(self, msg):
             """Handle REQUEST messages (for future extension)"""
-            print(f"\n[RescueAgent] Received REQUEST: {msg.body}")
+            try:
+                request = StatusRequest.from_json(msg.body)
+            except ValidationError as e:
+                print(f"\n[RescueAgent] ⚠️  Rejected REQUEST: {e}")
+                return
+            print(f"\n[RescueAgent] Received REQUEST: {request.request_type} for {request.location}")
             
     async def setup(self):
+        self.codec = MessageCodec(str(self.jid))
+        self.rules = shared_rules()
+        self.roads = shared_road_network(self.environment.conditions)
+        self.fleet = RescueFleet.default(self.roads)
+        self.analytics = StreamingEventAnalytics()
+        self.fusion = EventFusion(str(self.jid))
+        self.inbox = Inbox(str(self.jid))
+        self.store = IncidentStore(INCIDENT_DB, str(self.jid))
+        self.responses = self.store.counters().get("responses", 0)
         behaviour = self.MessageReceiverBehaviour()
         self.add_behaviour(behaviour)
 
@@ -258,9 +377,12 @@ async def main():
     sensor_agent = SensorAgent(sensor_jid, sensor_password)
     rescue_agent = RescueAgent(rescue_jid, rescue_password)
     
+    await start_metrics_server()
     await rescue_agent.start(auto_register=True)
     await asyncio.sleep(2)  # Let rescue agent initialize first
     await sensor_agent.start(auto_register=True)
+    maybe_profile(rescue_agent)
+    maybe_profile(sensor_agent)
     
     print("\n✓ Both agents are running and communicating...")
     print("  SensorAgent will detect disasters and send INFORM messages")
@@ -280,9 +402,11 @@ async def main():
     print(f"Rescue responses triggered: {rescue_agent.responses}")
     print(f"Message log saved to: message_log.txt")
     print(f"{'='*60}\n")
+    rescue_agent.analytics.print_summary()
     
     await sensor_agent.stop()
     await rescue_agent.stop()
+    rescue_agent.store.close()
     print("✓ All agents stopped.")
 
 
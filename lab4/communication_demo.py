@@ -15,16 +15,22 @@ FIPA-ACL Performatives Used:
 """
 
 import asyncio
-import json
-from datetime import datetime
-from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
-from spade.message import Message
 
 # Import the disaster environment from Lab 2
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
-from disaster_environment import DisasterEnvironment
+from agent_runtime import Agent, CyclicBehaviour, PeriodicBehaviour, Message
+from agent_metrics import (PERCEPTION_CYCLES, DISASTERS_DETECTED, RESCUE_EVENTS, RESCUE_RESPONSES,
+                           MESSAGES_SENT, MESSAGES_RECEIVED, HANDLER_LATENCY, track_mailbox,
+                           record_event_latency, start_metrics_server)
+from behaviour_profiler import maybe_profile
+from adaptive_sampling import AdaptiveSampler
+from event_analytics import StreamingEventAnalytics
+from event_time import now_ns, format_timestamp
+from disaster_models import DisasterEvent, StatusRequest, ValidationError
+from dispatch_rules import shared_rules
+from message_codec import MessageCodec
+from bounded_mailbox import BoundedMailboxMixin, alert_metadata, handle_backpressure
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -33,7 +39,7 @@ from disaster_environment import DisasterEnvironment
 
 def log_message(direction, sender, receiver, performative, content):
     """Log message details to file and console"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    timestamp = format_timestamp(now_ns(), millis=True)
     
     log_entry = f"""
 {'='*60}
@@ -69,63 +75,73 @@ class CommunicationDemoAgent(Agent):
             print(f"\n{'*'*60}")
             print(f"[SENSOR BEHAVIOR] Starting detection system...")
             print(f"{'*'*60}\n")
-            self.environment = DisasterEnvironment()
+            self.environment = self.agent.environment
+            self.sampler = AdaptiveSampler(self.period.total_seconds())
             self.detection_count = 0
             
         async def run(self):
             """Detect disasters and send INFORM messages"""
+            await handle_backpressure(self, self.sampler)
             self.detection_count += 1
+            PERCEPTION_CYCLES.labels(str(self.agent.jid)).inc()
             
             print(f"\n--- [SENSOR] Detection Cycle {self.detection_count} ---")
             
             # Get environmental conditions
             conditions = self.environment.get_environmental_conditions()
-            print(f"[SENSOR] Monitoring: Temp={conditions['temperature']}°C, "
-                  f"Wind={conditions['wind_speed']}km/h, "
-                  f"Visibility={conditions['visibility']}")
+            print(f"[SENSOR] Monitoring: Temp={conditions.temperature}°C, "
+                  f"Wind={conditions.wind_speed}km/h, "
+                  f"Visibility={conditions.visibility}")
             
-            # 50% chance of detecting a disaster
+            # 50% chance of detecting a disaster per base period
             import random
-            if random.random() < 0.5:
+            event = None
+            if random.random() < self.sampler.detection_chance(0.5):
                 event = self.environment.generate_disaster_event()
-                print(f"\n[SENSOR] 🚨 DISASTER DETECTED: {event['type']} at {event['location']}")
+                event = event.detected(now_ns())
+                print(f"\n[SENSOR] 🚨 DISASTER DETECTED: {event.type} at {event.location}")
+                DISASTERS_DETECTED.labels(str(self.agent.jid), event.type, event.severity).inc()
                 
                 # Send INFORM message
                 await self.send_disaster_inform(event)
             else:
                 print("[SENSOR] ✓ All clear - no disaster detected")
+            self.sampler.adjust(self, [conditions], event)
                 
         async def send_disaster_inform(self, event):
             """Send INFORM message about detected disaster"""
             msg = Message(
                 to=str(self.agent.jid),  # Send to self (rescue behavior will receive)
                 sender=str(self.agent.jid),
-                body=json.dumps(event),
+                body=event.to_json(),
                 metadata={
                     "performative": "inform",
                     "ontology": "disaster-response",
                     "language": "JSON",
-                    "role": "sensor-to-rescue"
+                    "role": "sensor-to-rescue",
+                    **alert_metadata(event),
                 }
             )
             msg.set_metadata("performative", "inform")
             msg.set_metadata("role", "sensor-to-rescue")
             
-            await self.send(msg)
+            await self.agent.codec.send(self, msg)
+            MESSAGES_SENT.labels(str(self.agent.jid), "inform").inc()
             
             log_message(
                 direction="OUTGOING INFORM MESSAGE (Sensor → Rescue)",
                 sender="SensorBehavior",
                 receiver="RescueBehavior",
                 performative="INFORM",
-                content=f"Disaster: {event['type']} | Location: {event['location']} | "
-                        f"Severity: {event['severity']} | Casualties: {event['casualties']} | "
-                        f"Resources: {event['resources_needed']}"
+                content=f"Disaster: {event.type} | Location: {event.location} | "
+                        f"Severity: {event.severity} | Casualties: {event.casualties} | "
+                        f"Resources: {event.resources_needed}"
             )
     
     
-    class RescueBehaviour(CyclicBehaviour):
+    class RescueBehaviour(BoundedMailboxMixin, CyclicBehaviour):
         """Simulates RescueAgent - receives INFORM messages and triggers actions"""
+        mailbox_name = "rescue"
         
         async def on_start(self):
             print(f"\n{'*'*60}")
@@ -133,14 +149,19 @@ class CommunicationDemoAgent(Agent):
             print(f"Listening for disaster alerts...")
             print(f"{'*'*60}\n")
             self.agent.rescue_responses = 0
+            track_mailbox(self, "rescue")
             
         async def run(self):
             """Receive and process messages"""
             msg = await self.receive(timeout=10)
+            if msg and not self.agent.codec.unpack(msg):
+                return  # incomplete chunked body or undecodable
             
             if msg:
                 performative = msg.get_metadata("performative")
                 role = msg.get_metadata("role")
+                agent_name = str(self.agent.jid)
+                MESSAGES_RECEIVED.labels(agent_name, performative or "unknown").inc()
                 
                 # Only process sensor-to-rescue messages
                 if role == "sensor-to-rescue":
@@ -154,7 +175,8 @@ class CommunicationDemoAgent(Agent):
                     
                     # Parse and handle the message
                     if performative == "inform":
-                        await self.handle_inform(msg)
+                        with HANDLER_LATENCY.labels(agent_name, performative).time():
+                            await self.handle_inform(msg)
                         
                 elif role == "rescue-to-sensor" and performative == "request":
                     # Handle REQUEST responses from rescue back to sensor
@@ -163,45 +185,50 @@ class CommunicationDemoAgent(Agent):
         async def handle_inform(self, msg):
             """Handle INFORM messages about disasters"""
             try:
-                event = json.loads(msg.body)
+                event = DisasterEvent.from_json(msg.body)
+                RESCUE_EVENTS.labels(str(self.agent.jid)).inc()
+                latency_ms = record_event_latency(self.agent, event)
+                self.agent.analytics.record(event)
                 
                 print(f"\n{'─'*60}")
                 print(f"[RESCUE] Processing disaster alert...")
-                print(f"  Type     : {event['type']}")
-                print(f"  Location : {event['location']}")
-                print(f"  Severity : {event['severity']}")
-                print(f"  Casualties: {event['casualties']}")
-                print(f"  Resources: {event['resources_needed']}")
+                print(f"  Type     : {event.type}")
+                print(f"  Location : {event.location}")
+                print(f"  Severity : {event.severity}")
+                print(f"  Casualties: {event.casualties}")
+                print(f"  Resources: {event.resources_needed}")
+                if latency_ms is not None:
+                    print(f"  Latency  : {latency_ms:.1f} ms from detection")
                 
-                # Trigger action based on severity
-                if event['severity'] in ('Medium', 'High', 'Critical'):
-                    print(f"\n  🚁 ACTION: Deploying rescue team to {event['location']}")
-                    print(f"  📦 Allocating resources: {event['resources_needed']}")
+                # Trigger action according to the dispatch rules
+                conditions = self.agent.environment.get_environmental_conditions(event.location)
+                decision = self.agent.rules.decide(event, conditions)
+                print(f"  Rule     : {decision.rule} -> {decision.action}")
+                if decision.dispatch:
+                    print(f"\n  🚁 ACTION: Deploying rescue team to {event.location}")
+                    print(f"  📦 Allocating resources: {event.resources_needed}")
                     self.agent.rescue_responses += 1
+                    RESCUE_RESPONSES.labels(str(self.agent.jid)).inc()
                     
-                    # Send REQUEST for additional information on Critical events
-                    if event['severity'] == 'Critical':
-                        await self.request_additional_info(event['location'])
+                    # Send REQUEST for additional information when the rule asks for it
+                    if decision.request_info:
+                        await self.request_additional_info(event.location)
                 else:
-                    print(f"  ℹ️  Low severity - logging only")
+                    print(f"  ℹ️  No dispatch required - logging only")
                     
                 print(f"{'─'*60}\n")
                 
-            except json.JSONDecodeError:
-                print(f"[RESCUE] ⚠️  Failed to parse message body as JSON")
+            except ValidationError as e:
+                print(f"[RESCUE] ⚠️  Rejected disaster alert: {e}")
                 
         async def request_additional_info(self, location):
             """Send REQUEST message for additional information"""
-            request_body = {
-                "request_type": "status_update",
-                "location": location,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            request = StatusRequest(location=location, timestamp_ns=now_ns())
             
             request_msg = Message(
                 to=str(self.agent.jid),
                 sender=str(self.agent.jid),
-                body=json.dumps(request_body),
+                body=request.to_json(),
                 metadata={
                     "performative": "request",
                     "ontology": "disaster-response",
@@ -211,7 +238,8 @@ class CommunicationDemoAgent(Agent):
             request_msg.set_metadata("performative", "request")
             request_msg.set_metadata("role", "rescue-to-sensor")
             
-            await self.send(request_msg)
+            await self.agent.codec.send(self, request_msg)
+            MESSAGES_SENT.labels(str(self.agent.jid), "request").inc()
             
             log_message(
                 direction="OUTGOING REQUEST MESSAGE (Rescue → Sensor)",
@@ -224,6 +252,9 @@ class CommunicationDemoAgent(Agent):
     async def setup(self):
         """Setup both sensor and rescue behaviors"""
         self.rescue_responses = 0
+        self.codec = MessageCodec(str(self.jid))
+        self.rules = shared_rules()
+        self.analytics = StreamingEventAnalytics()
         
         # Add sensor behavior (periodic detection)
         sensor = self.SensorBehaviour(period=7)
@@ -259,7 +290,9 @@ async def main():
     print("Sensor behavior → Rescue behavior communication\n")
     
     agent = CommunicationDemoAgent(agent_jid, agent_password)
+    await start_metrics_server()
     await agent.start()
+    maybe_profile(agent)
     
     print("\n✓ Agent running with Sensor and Rescue behaviors")
     print("  → Sensor detects disasters and sends INFORM messages")
@@ -280,6 +313,7 @@ async def main():
     print(f"Rescue operations triggered: {agent.rescue_responses}")
     print(f"Message log saved to: message_log.txt")
     print(f"{'='*60}\n")
+    agent.analytics.print_summary()
     
     await agent.stop()
     print("✓ Agent stopped.")
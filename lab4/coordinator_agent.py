@@ -0,0 +1,242 @@
+"""
+Lab 4: Regional Coordinator Agents
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+Sensors report to the coordinator of their region instead of to the
+rescue agents. A CoordinatorAgent merges the reports it receives into one
+incident per (type, zone) and forwards a summary upward once per window:
+
+    sensors --INFORM--> regional coordinator --summary INFORM--> rescue agent
+                                             (or a higher-level coordinator)
+
+  - Reports of the same incident in one window are merged: highest
+    severity and casualty count, earliest detection, and the number of
+    reports behind it (the "reports" metadata of the summary).
+  - Critical incidents are forwarded on their first report; the summary
+    at the end of the window is only sent again if it got worse.
+  - An incident with no new reports for `expire_windows` windows is dropped.
+
+Each coordinator also caches the latest picture of its zones, so a status
+REQUEST (StatusRequest body) is answered from the cache with a
+StatusReport INFORM instead of being fanned out to every sensor. Requests
+for zones outside the region are refused.
+
+Summaries and status replies go out through an Outbox and are
+retransmitted until acknowledged; a report is acknowledged once the
+coordinator has merged it.
+
+Coordinators accept summaries from other coordinators as ordinary
+reports, so regions can be stacked into more than two tiers.
+"""
+
+import os
+import time
+from dataclasses import replace
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_runtime import Agent, CyclicBehaviour, PeriodicBehaviour, Message
+from agent_metrics import REGISTRY, MESSAGES_SENT, MESSAGES_RECEIVED, track_mailbox
+from disaster_models import DisasterEvent, StatusRequest, StatusReport, Severity, ValidationError
+from event_time import now_ns
+from event_fusion import report_count
+from message_codec import MessageCodec
+from reliable_delivery import Outbox, Inbox
+from bounded_mailbox import BoundedMailboxMixin, alert_metadata
+
+WINDOW_SECONDS = float(os.environ.get("AGENT_COORDINATOR_WINDOW", "10"))
+
+STATUS_REPORT = "status_report"
+
+COORDINATOR_REPORTS = REGISTRY.counter(
+    "coordinator_reports_total", "Sensor reports merged by a coordinator", ("coordinator",))
+COORDINATOR_FORWARDED = REGISTRY.counter(
+    "coordinator_forwarded_total", "Incident summaries forwarded upward", ("coordinator",))
+COORDINATOR_STATUS = REGISTRY.counter(
+    "coordinator_status_requests_total", "Status REQUESTs by outcome", ("coordinator", "outcome"))
+
+
+def merge_events(current, report):
+    """One event describing both reports of the same incident"""
+    worse = report if report.severity.rank > current.severity.rank else current
+    detected = [ns for ns in (current.detected_ns, report.detected_ns) if ns is not None]
+    return replace(
+        worse,
+        casualties=max(current.casualties, report.casualties),
+        timestamp_ns=min(current.timestamp_ns, report.timestamp_ns),
+        monotonic_ns=current.monotonic_ns,
+        detected_ns=min(detected) if detected else None
+    )
+
+
+class Incident:
+    """One (type, zone) incident as seen by a coordinator"""
+
+    __slots__ = ("event", "reports", "last_report", "sent_rank", "sent_casualties", "dirty")
+
+    def __init__(self, event, reports, now):
+        self.event = event
+        self.reports = reports
+        self.last_report = now
+        self.sent_rank = -1
+        self.sent_casualties = -1
+        self.dirty = True
+
+    def add(self, event, reports, now):
+        self.event = merge_events(self.event, event)
+        self.reports += reports
+        self.last_report = now
+        # Only a worse picture is worth another message upward
+        if (self.event.severity.rank > self.sent_rank
+                or self.event.casualties > self.sent_casualties):
+            self.dirty = True
+
+    def mark_sent(self):
+        self.sent_rank = self.event.severity.rank
+        self.sent_casualties = self.event.casualties
+        self.dirty = False
+
+
+class CoordinatorAgent(Agent):
+    """Merges sensor reports for a region and forwards incident summaries"""
+
+    def __init__(self, jid, password, zones, upstream_jid, *args, window=WINDOW_SECONDS,
+                 expire_windows=3, **kwargs):
+        super().__init__(jid, password, *args, **kwargs)
+        self.zones = frozenset(zones)
+        self.upstream_jid = upstream_jid
+        self.window = window
+        self.expire_windows = expire_windows
+
+    class ReportBehaviour(BoundedMailboxMixin, CyclicBehaviour):
+        """Merge INFORM reports and answer status REQUESTs"""
+        mailbox_name = "coordinator"
+
+        async def on_start(self):
+            track_mailbox(self, "coordinator")
+            print(f"[COORDINATOR] {self.agent.jid} covering {', '.join(sorted(self.agent.zones))} "
+                  f"-> {self.agent.upstream_jid}")
+
+        async def run(self):
+            # Acknowledgements for the outbox arrive here too: there is no template
+            inbox, outbox = self.agent.inbox, self.agent.outbox
+            msg = await self.receive(timeout=inbox.next_timeout(outbox.next_timeout(10)))
+            if msg and self.agent.codec.unpack(msg) and not outbox.on_ack(msg) and inbox.accept(msg):
+                await self.handle(msg)
+            await outbox.pump(self)
+            # Forwarded summaries are in the outbox by now
+            await inbox.send_acks(self)
+
+        async def handle(self, msg):
+            performative = msg.get_metadata("performative")
+            MESSAGES_RECEIVED.labels(str(self.agent.jid), performative or "unknown").inc()
+
+            if performative == "inform":
+                try:
+                    event = DisasterEvent.from_json(msg.body)
+                except ValidationError as e:
+                    print(f"[COORDINATOR] ⚠️  Rejected report from {msg.sender}: {e}")
+                    return
+                await self.agent.add_report(self, event, report_count(msg))
+            elif performative == "request":
+                await self.answer_status(msg)
+
+        async def answer_status(self, msg):
+            agent_name = str(self.agent.jid)
+            try:
+                request = StatusRequest.from_json(msg.body)
+            except ValidationError as e:
+                print(f"[COORDINATOR] ⚠️  Rejected REQUEST from {msg.sender}: {e}")
+                COORDINATOR_STATUS.labels(agent_name, "invalid").inc()
+                return
+            reply = msg.make_reply()
+            reply.sender = agent_name
+            if request.location in self.agent.zones:
+                reply.set_metadata("performative", "inform")
+                reply.set_metadata("message_type", STATUS_REPORT)
+                reply.body = self.agent.status(request.location).to_json()
+                outcome = "answered"
+            else:
+                reply.set_metadata("performative", "refuse")
+                reply.body = f"{request.location} is not covered by {agent_name}"
+                outcome = "refused"
+            await self.agent.outbox.send(self, reply)
+            MESSAGES_SENT.labels(agent_name, reply.get_metadata("performative")).inc()
+            COORDINATOR_STATUS.labels(agent_name, outcome).inc()
+            print(f"[COORDINATOR] Status REQUEST for {request.location} from {msg.sender}: {outcome}")
+
+    class FlushBehaviour(PeriodicBehaviour):
+        """Forward changed incident summaries once per window"""
+
+        async def run(self):
+            await self.agent.flush(self)
+
+    async def add_report(self, behaviour, event, reports=1):
+        now = time.monotonic()
+        key = (event.type, event.location)
+        incident = self.incidents.get(key)
+        if incident is None:
+            incident = self.incidents[key] = Incident(event, reports, now)
+        else:
+            incident.add(event, reports, now)
+        zone = self.zone_reports.setdefault(event.location, [0, None])
+        zone[0] += reports
+        zone[1] = event.timestamp_ns if zone[1] is None else max(zone[1], event.timestamp_ns)
+        COORDINATOR_REPORTS.labels(str(self.jid)).inc(reports)
+
+        if incident.dirty and incident.event.severity == Severity.CRITICAL:
+            await self.forward(behaviour, incident)
+
+    async def forward(self, behaviour, incident):
+        event = incident.event
+        msg = Message(
+            to=self.upstream_jid,
+            sender=str(self.jid),
+            body=event.to_json(),
+            metadata={
+                "performative": "inform",
+                "ontology": "disaster-response",
+                "language": "JSON",
+                "reports": str(incident.reports),
+                "coordinator": str(self.jid),
+                **alert_metadata(event),
+            }
+        )
+        await self.outbox.send(behaviour, msg)
+        incident.mark_sent()
+        MESSAGES_SENT.labels(str(self.jid), "inform").inc()
+        COORDINATOR_FORWARDED.labels(str(self.jid)).inc()
+        print(f"[COORDINATOR] ⬆️  {event.type} at {event.location} - {event.severity}, "
+              f"{event.casualties} casualties ({incident.reports} reports)")
+
+    async def flush(self, behaviour):
+        now = time.monotonic()
+        expiry = self.window * self.expire_windows
+        for key, incident in list(self.incidents.items()):
+            if incident.dirty:
+                await self.forward(behaviour, incident)
+            elif now - incident.last_report >= expiry:
+                del self.incidents[key]
+
+    def status(self, zone):
+        """StatusReport for one of this coordinator's zones, from the cache"""
+        reports, last_report_ns = self.zone_reports.get(zone, (0, None))
+        return StatusReport(
+            location=zone,
+            timestamp_ns=now_ns(),
+            reports=reports,
+            last_report_ns=last_report_ns,
+            incidents=tuple(i.event for (_, location), i in self.incidents.items() if location == zone),
+            conditions=self.environment.get_environmental_conditions(zone)
+        )
+
+    async def setup(self):
+        self.codec = MessageCodec(str(self.jid))
+        self.inbox = Inbox(str(self.jid))
+        self.outbox = Outbox(str(self.jid))  # summaries and status replies are acknowledged
+        self.incidents = {}
+        # zone -> [reports received, newest report timestamp_ns]
+        self.zone_reports = {}
+        self.add_behaviour(self.ReportBehaviour())
+        self.add_behaviour(self.FlushBehaviour(period=self.window))
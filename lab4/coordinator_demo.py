@@ -0,0 +1,102 @@
+"""
+Lab 4: Hierarchical Coordination Demo
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+Six sensors in two regions report to their regional CoordinatorAgent
+instead of to the RescueAgent. The coordinators merge the reports per
+incident and forward summaries; the RescueAgent's status REQUESTs for
+critical alerts are answered by the coordinator that sent the alert.
+"""
+
+import asyncio
+
+from multi_agent_communication import SensorAgent
+from communication_agents import RescueAgent
+from coordinator_agent import CoordinatorAgent, COORDINATOR_REPORTS, COORDINATOR_FORWARDED
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_metrics import MESSAGES_RECEIVED, start_metrics_server
+from agent_runtime import shared_environment
+from behaviour_profiler import maybe_profile
+from disaster_environment import DisasterEnvironment
+
+RESCUE_JID = "kwasirescueagent1@xmpp.jp"
+
+# coordinator JID -> zones of its region
+REGIONS = {
+    "kwasicoordinatornorth@xmpp.jp": ("Zone A", "Zone B", "Zone C"),
+    "kwasicoordinatorsouth@xmpp.jp": ("Zone D", "Zone E"),
+}
+SENSORS_PER_REGION = 3
+
+
+class RegionalSensorAgent(SensorAgent):
+    """SensorAgent that reports to its region's coordinator"""
+
+    def __init__(self, jid, password, coordinator_jid, *args, **kwargs):
+        super().__init__(jid, password, *args, **kwargs)
+        self.coordinator_jid = coordinator_jid
+
+    async def setup(self):
+        await super().setup()
+        self.rescue_jid = self.coordinator_jid
+
+
+def build_agents():
+    """Rescue agent, coordinators and sensors, in start order"""
+    conditions = shared_environment().conditions
+    agents = [RescueAgent(RESCUE_JID, "rescue123")]
+    sensors = []
+    for region, (coordinator_jid, zones) in enumerate(REGIONS.items()):
+        agents.append(CoordinatorAgent(coordinator_jid, "coordinator123", zones, RESCUE_JID))
+        environment = DisasterEnvironment(conditions, locations=zones)
+        for i in range(SENSORS_PER_REGION):
+            sensors.append(RegionalSensorAgent(f"kwasisensor{region}{i}@xmpp.jp", "sensor123",
+                                               coordinator_jid, environment=environment))
+    return agents + sensors
+
+
+async def main():
+    agents = build_agents()
+    rescue_agent = agents[0]
+    coordinators = [a for a in agents if isinstance(a, CoordinatorAgent)]
+
+    print("\n" + "="*60)
+    print("LAB 4: HIERARCHICAL COORDINATION")
+    print("="*60 + "\n")
+
+    await start_metrics_server()
+    for agent in agents:
+        await agent.start(auto_register=True)
+    for agent in agents:
+        maybe_profile(agent)
+
+    print(f"✓ {len(agents) - 1 - len(coordinators)} sensors, {len(coordinators)} coordinators "
+          f"and the rescue agent running...\n")
+    try:
+        await asyncio.sleep(60)
+    except KeyboardInterrupt:
+        print("\n\nStopping...")
+
+    print(f"\n{'='*60}")
+    print(f"COORDINATION SUMMARY")
+    print(f"{'='*60}")
+    for coordinator in coordinators:
+        name = str(coordinator.jid)
+        print(f"  {name:<32} reports={COORDINATOR_REPORTS.labels(name).value:<5} "
+              f"forwarded={COORDINATOR_FORWARDED.labels(name).value}")
+    received = MESSAGES_RECEIVED.labels(RESCUE_JID, "inform").value
+    print(f"INFORMs reaching the rescue agent: {received}")
+    print(f"Rescue responses triggered       : {rescue_agent.responses}")
+    print(f"{'='*60}\n")
+
+    for agent in reversed(agents):
+        await agent.stop()
+    rescue_agent.store.close()
+    print("✓ Agents stopped.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
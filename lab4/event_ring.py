@@ -0,0 +1,268 @@
+"""
+Lab 4: Shared-Memory Event Ring
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+Agents in separate processes on one host can exchange DisasterEvents
+through a ring buffer in multiprocessing.shared_memory instead of JSON
+bodies sent over XMPP. One producer writes fixed-size, struct-packed
+records; any number of consumers (up to max_consumers) each read every
+record at their own pace.
+
+Layout of the shared block (little-endian):
+
+    header     magic, record size, policy, capacity, consumer slots,
+               write sequence, closed flag
+    consumers  one (cursor, active) pair per consumer slot
+    records    `capacity` records of 64 bytes:
+               stamp | type severity resource flags | casualties |
+               timestamp_ns | monotonic_ns | detected_ns | location[24]
+
+A record's stamp is its sequence number + 1, written after the payload
+(and zeroed before it), so a consumer that copies a record while the
+producer is overwriting it sees a changed stamp and discards the copy.
+
+When the ring is full:
+  drop   the producer overwrites the oldest records; a lapped consumer
+         skips ahead and counts what it lost
+  block  try_publish() returns False until the slowest active consumer
+         has read enough (publish() waits)
+"""
+
+import asyncio
+import os
+import struct
+from multiprocessing import shared_memory
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from disaster_models import DisasterEvent, DisasterType, Severity, Resource, ValidationError
+
+DROP = "drop"
+BLOCK = "block"
+POLICIES = (DROP, BLOCK)
+
+MAGIC = b"EVR1"
+LOCATION_BYTES = 24
+
+_HEADER = struct.Struct("<4sHBxII")         # magic, record size, policy, capacity, consumers
+_U64 = struct.Struct("<Q")
+_CONSUMER = struct.Struct("<QQ")            # cursor, active
+_PAYLOAD = struct.Struct(f"<BBBBIqqq{LOCATION_BYTES}s")
+RECORD_SIZE = _U64.size + _PAYLOAD.size     # 64 bytes, one cache line
+
+_WRITE_SEQ = _HEADER.size                   # 16
+_CLOSED = _WRITE_SEQ + 8                    # 24
+_CONSUMERS = _CLOSED + 8                    # 32
+
+_TYPES = list(DisasterType)
+_SEVERITIES = list(Severity)
+_RESOURCES = list(Resource)
+_TYPE_INDEX = {member: i for i, member in enumerate(_TYPES)}
+_SEVERITY_INDEX = {member: i for i, member in enumerate(_SEVERITIES)}
+_RESOURCE_INDEX = {member: i for i, member in enumerate(_RESOURCES)}
+_HAS_DETECTED = 1
+
+
+def encode_event(event):
+    """Payload fields for one event (everything after the stamp)"""
+    location = event.location.encode("utf-8")
+    if len(location) > LOCATION_BYTES:
+        raise ValidationError(f"Location {event.location!r} is longer than {LOCATION_BYTES} bytes")
+    detected = event.detected_ns
+    return (_TYPE_INDEX[event.type], _SEVERITY_INDEX[event.severity],
+            _RESOURCE_INDEX[event.resources_needed], 0 if detected is None else _HAS_DETECTED,
+            event.casualties, event.timestamp_ns, event.monotonic_ns, detected or 0, location)
+
+
+def decode_event(fields):
+    type_, severity, resource, flags, casualties, timestamp_ns, monotonic_ns, detected, location = fields
+    return DisasterEvent(
+        _TYPES[type_], location.rstrip(b"\0").decode("utf-8"), _SEVERITIES[severity],
+        casualties, _RESOURCES[resource], timestamp_ns, monotonic_ns,
+        detected if flags & _HAS_DETECTED else None)
+
+
+def _attach(name):
+    """Open an existing block without letting this process unlink it at exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 every attach registers with the resource tracker,
+        # which unlinks the block when this process exits and complains when
+        # the producer in the same process tree unlinks it first. Skip that.
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class _Ring:
+    """Shared block plus the offsets both ends need"""
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.buf = shm.buf
+        magic, record_size, policy, capacity, consumers = _HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or record_size != RECORD_SIZE:
+            raise ValueError(f"Shared memory {shm.name!r} is not an event ring")
+        self.name = shm.name
+        self.policy = POLICIES[policy]
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.max_consumers = consumers
+        self.records = _CONSUMERS + consumers * _CONSUMER.size
+
+    def write_seq(self):
+        return _U64.unpack_from(self.buf, _WRITE_SEQ)[0]
+
+    @property
+    def closed(self):
+        return _U64.unpack_from(self.buf, _CLOSED)[0] != 0
+
+    def consumer(self, slot):
+        return _CONSUMER.unpack_from(self.buf, _CONSUMERS + slot * _CONSUMER.size)
+
+    def _release(self):
+        self.buf.release()
+        self.shm.close()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PRODUCER
+# ═══════════════════════════════════════════════════════════════════
+
+class RingProducer(_Ring):
+    """The single writer; creates the ring and unlinks it on close()"""
+
+    def __init__(self, name=None, capacity=4096, max_consumers=8, policy=DROP):
+        if capacity < 2 or capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        size = _CONSUMERS + max_consumers * _CONSUMER.size + capacity * RECORD_SIZE
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _HEADER.pack_into(shm.buf, 0, MAGIC, RECORD_SIZE, POLICIES.index(policy),
+                          capacity, max_consumers)
+        super().__init__(shm)
+        self._seq = 0
+        self.published = 0
+        self.rejected = 0
+
+    def _min_cursor(self):
+        cursors = [cursor for cursor, active in map(self.consumer, range(self.max_consumers))
+                   if active]
+        return min(cursors) if cursors else self._seq
+
+    def free(self):
+        """Records that can be written without overtaking a consumer (block policy)"""
+        return self.capacity - (self._seq - self._min_cursor())
+
+    def _write(self, event):
+        offset = self.records + (self._seq & self.mask) * RECORD_SIZE
+        buf = self.buf
+        _U64.pack_into(buf, offset, 0)
+        _PAYLOAD.pack_into(buf, offset + 8, *encode_event(event))
+        self._seq += 1
+        _U64.pack_into(buf, offset, self._seq)
+
+    def try_publish(self, event):
+        """Write one event; False if the ring is full under the block policy"""
+        if self.policy == BLOCK and self._seq - self._min_cursor() >= self.capacity:
+            self.rejected += 1
+            return False
+        self._write(event)
+        _U64.pack_into(self.buf, _WRITE_SEQ, self._seq)
+        self.published += 1
+        return True
+
+    def publish_many(self, events):
+        """Write as many events as fit and publish them with one cursor update"""
+        room = len(events) if self.policy == DROP else min(len(events), self.free())
+        for event in events[:room]:
+            self._write(event)
+        if room:
+            _U64.pack_into(self.buf, _WRITE_SEQ, self._seq)
+            self.published += room
+        return room
+
+    async def publish(self, event, poll_interval=0.001):
+        """Write one event, waiting for room under the block policy"""
+        while not self.try_publish(event):
+            await asyncio.sleep(poll_interval)
+
+    def close(self):
+        """Mark the ring closed so consumers stop, then remove it"""
+        _U64.pack_into(self.buf, _CLOSED, 1)
+        self._release()
+        self.shm.unlink()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CONSUMER
+# ═══════════════════════════════════════════════════════════════════
+
+class RingConsumer(_Ring):
+    """One reader, identified by its slot; sees every record from when it attached"""
+
+    def __init__(self, name, slot):
+        super().__init__(_attach(name))
+        if not 0 <= slot < self.max_consumers:
+            raise ValueError(f"slot must be in 0..{self.max_consumers - 1}")
+        cursor, active = self.consumer(slot)
+        if active:
+            raise ValueError(f"Consumer slot {slot} of ring {name!r} is in use")
+        self.slot = slot
+        self._offset = _CONSUMERS + slot * _CONSUMER.size
+        self.cursor = self.write_seq()
+        _CONSUMER.pack_into(self.buf, self._offset, self.cursor, 1)
+        self.received = 0
+        self.lost = 0
+
+    def pending(self):
+        return self.write_seq() - self.cursor
+
+    def poll(self, max_items=256):
+        """Up to `max_items` new events, oldest first (empty list if none)"""
+        buf = self.buf
+        write_seq = self.write_seq()
+        cursor = self.cursor
+        if write_seq - cursor > self.capacity:
+            # Lapped by the producer: the oldest unread records are gone
+            self.lost += write_seq - cursor - self.capacity
+            cursor = write_seq - self.capacity
+
+        events = []
+        end = min(write_seq, cursor + max_items)
+        records, mask = self.records, self.mask
+        while cursor < end:
+            offset = records + (cursor & mask) * RECORD_SIZE
+            fields = _PAYLOAD.unpack_from(buf, offset + 8)
+            cursor += 1
+            if _U64.unpack_from(buf, offset)[0] != cursor:
+                self.lost += 1  # overwritten while we were copying it
+                continue
+            events.append(decode_event(fields))
+
+        self.cursor = cursor
+        _U64.pack_into(buf, self._offset, cursor)
+        self.received += len(events)
+        return events
+
+    async def get(self, poll_interval=0.001, max_interval=0.05):
+        """Wait for new events, backing off while the ring is idle; [] once closed"""
+        interval = poll_interval
+        while True:
+            events = self.poll()
+            if events or self.closed:
+                return events
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, max_interval)
+
+    def close(self):
+        """Free the slot so the producer stops waiting for this consumer"""
+        _CONSUMER.pack_into(self.buf, self._offset, self.cursor, 0)
+        self._release()
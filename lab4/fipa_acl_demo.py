@@ -6,9 +6,14 @@ Supplementary demonstration of INFORM and REQUEST performatives
 import asyncio
 import json
 from datetime import datetime
-from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour, OneShotBehaviour
-from spade.message import Message
+
+# Import the shared message models from Lab 2
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_runtime import Agent, CyclicBehaviour, OneShotBehaviour, Message
+from disaster_models import (DisasterEvent, DisasterType, Severity, Resource, StatusRequest,
+                             ValidationError)
+from event_time import now_ns
 
 
 class DemoAgent(Agent):
@@ -30,13 +35,14 @@ class DemoAgent(Agent):
             inform_msg = Message(
                 to=str(self.agent.jid),
                 sender=str(self.agent.jid),
-                body=json.dumps({
-                    "type": "Earthquake",
-                    "location": "Zone C",
-                    "severity": "Critical",
-                    "casualties": 50,
-                    "resources_needed": "Medical"
-                }),
+                body=DisasterEvent(
+                    type=DisasterType.EARTHQUAKE,
+                    location="Zone C",
+                    severity=Severity.CRITICAL,
+                    casualties=50,
+                    resources_needed=Resource.MEDICAL,
+                    timestamp_ns=now_ns()
+                ).to_json(),
                 metadata={
                     "performative": "inform",
                     "ontology": "disaster-response",
@@ -56,11 +62,11 @@ class DemoAgent(Agent):
             request_msg = Message(
                 to=str(self.agent.jid),
                 sender=str(self.agent.jid),
-                body=json.dumps({
-                    "request_type": "status_update",
-                    "location": "Zone C",
-                    "details_needed": ["casualties", "resource_availability", "access_routes"]
-                }),
+                body=StatusRequest(
+                    location="Zone C",
+                    timestamp_ns=now_ns(),
+                    details_needed=("casualties", "resource_availability", "access_routes")
+                ).to_json(),
                 metadata={
                     "performative": "request",
                     "ontology": "disaster-response",
@@ -122,21 +128,24 @@ class DemoAgent(Agent):
                 print(f"  Message Type: {message_type}")
                 print(f"  From: {msg.sender}")
                 
-                if performative == "inform":
-                    data = json.loads(msg.body)
-                    print(f"\n  [INFORM] Disaster Alert Received:")
-                    print(f"    Type: {data['type']}")
-                    print(f"    Location: {data['location']}")
-                    print(f"    Severity: {data['severity']}")
-                    print(f"\n  → Action: Processing disaster alert...")
-                    
-                elif performative == "request":
-                    data = json.loads(msg.body)
-                    print(f"\n  [REQUEST] Information Request Received:")
-                    print(f"    Request Type: {data['request_type']}")
-                    print(f"    Location: {data['location']}")
-                    print(f"    Details Needed: {', '.join(data['details_needed'])}")
-                    print(f"\n  → Action: Gathering requested information...")
+                try:
+                    if performative == "inform":
+                        event = DisasterEvent.from_json(msg.body)
+                        print(f"\n  [INFORM] Disaster Alert Received:")
+                        print(f"    Type: {event.type}")
+                        print(f"    Location: {event.location}")
+                        print(f"    Severity: {event.severity}")
+                        print(f"\n  → Action: Processing disaster alert...")
+                        
+                    elif performative == "request":
+                        request = StatusRequest.from_json(msg.body)
+                        print(f"\n  [REQUEST] Information Request Received:")
+                        print(f"    Request Type: {request.request_type}")
+                        print(f"    Location: {request.location}")
+                        print(f"    Details Needed: {', '.join(request.details_needed)}")
+                        print(f"\n  → Action: Gathering requested information...")
+                except ValidationError as e:
+                    print(f"\n  ⚠️  Rejected message body: {e}")
                     
                 print(f"{'='*60}\n")
                 
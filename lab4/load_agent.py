@@ -0,0 +1,94 @@
+"""
+Lab 4: Load-Generating Sensor Agent
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+A sensor that sends INFORM alerts at the times drawn by an arrival process
+from lab2/load_generator.py (Poisson, Hawkes aftershocks, diurnal or step
+surges) instead of flipping a coin every cycle. It is meant for stress
+tests of the rescue side, so it prints a rate line every few seconds
+rather than a line per alert, and sends every event that is due in one
+burst when it wakes up.
+
+    AGENT_LOAD_PROCESS=hawkes AGENT_LOAD_RATE=20000 \\
+        python ../headless_runner.py lab4-load --events 200000
+"""
+
+import asyncio
+import time
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_runtime import Agent, CyclicBehaviour, PeriodicBehaviour, Message
+from agent_metrics import DISASTERS_DETECTED, MESSAGES_SENT
+from load_generator import LoadGenerator, make_process
+from message_codec import MessageCodec
+from bounded_mailbox import alert_metadata
+
+# Events sent per run() before giving other behaviours a turn
+BURST_LIMIT = 1000
+
+
+class LoadSensorAgent(Agent):
+    """Sends INFORM alerts following an arrival process"""
+
+    def __init__(self, jid, password, rescue_jid, *args, process=None, seed=None, **kwargs):
+        super().__init__(jid, password, *args, **kwargs)
+        self.rescue_jid = rescue_jid
+        self.process = process or make_process()
+        self.seed = seed
+
+    class LoadBehaviour(CyclicBehaviour):
+        """Send every event whose arrival time has passed, then sleep until the next"""
+
+        async def on_start(self):
+            generator = LoadGenerator(self.agent.process, self.agent.environment, self.agent.seed)
+            self.schedule = generator.schedule(time.monotonic())
+            self.pending = next(self.schedule, None)
+            print(f"[LOAD] {self.agent.jid} sending {type(self.agent.process).__name__} "
+                  f"load to {self.agent.rescue_jid}")
+
+        async def run(self):
+            if self.pending is None:
+                self.kill()
+                return
+            delay = self.pending[0] - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = time.monotonic()
+            agent = self.agent
+            name = str(agent.jid)
+            sent = 0
+            while self.pending is not None and self.pending[0] <= now and sent < BURST_LIMIT:
+                event = self.pending[1]
+                msg = Message(
+                    to=agent.rescue_jid,
+                    sender=name,
+                    body=event.to_json(),
+                    metadata={"performative": "inform", "ontology": "disaster-response",
+                              **alert_metadata(event)}
+                )
+                await agent.codec.send(self, msg)
+                DISASTERS_DETECTED.labels(name, event.type, event.severity).inc()
+                sent += 1
+                self.pending = next(self.schedule, None)
+            MESSAGES_SENT.labels(name, "inform").inc(sent)
+            agent.sent += sent
+
+    class RateBehaviour(PeriodicBehaviour):
+        """Print the send rate once per period"""
+
+        async def on_start(self):
+            self.last = 0
+
+        async def run(self):
+            sent = self.agent.sent
+            print(f"[LOAD] {(sent - self.last) / self.period.total_seconds():,.0f} events/s "
+                  f"({sent:,} sent)")
+            self.last = sent
+
+    async def setup(self):
+        self.codec = MessageCodec(str(self.jid))
+        self.sent = 0
+        self.add_behaviour(self.LoadBehaviour())
+        self.add_behaviour(self.RateBehaviour(period=5))
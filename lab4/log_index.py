@@ -0,0 +1,328 @@
+"""
+Lab 4: FIPA-ACL Log Index
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+Indexes the banner-formatted message logs (multi_agent_log.txt,
+message_log.txt, fipa_acl_examples.txt) into a SQLite database so that
+queries by time range, sender, receiver and performative use an index
+instead of reading the whole log:
+
+    python log_index.py index
+    python log_index.py query --performative inform \\
+        --sender kwasisensoragent1 --receiver kwasirescueagent1 \\
+        --since "2026-02-18 17:08" --until "2026-02-18 17:10"
+
+The index stores each entry's byte offset and length, not its content;
+--show reads matching entries back from the log. Every run picks up where
+the last one stopped, so only newly appended entries are parsed. A log
+that was truncated or rewritten (the demos start a new log on each run)
+is detected and indexed again from the start.
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+
+LAB_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(LAB_DIR, "fipa_log_index.db")
+DEFAULT_LOGS = [os.path.join(LAB_DIR, name)
+                for name in ("multi_agent_log.txt", "message_log.txt", "fipa_acl_examples.txt")]
+
+SEPARATOR = b"=" * 60
+COMMIT_EVERY = 50_000
+CHECKPOINT_BYTES = 256
+
+_TITLE = re.compile(rb"^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:\.\d{3})?)\] (.*)$")
+_FIELD = re.compile(rb"^(Timestamp|From|To|Performative) *: ?(.*)$")
+_TIME_ARG = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d(:\d\d(\.\d{1,3})?)?$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id         INTEGER PRIMARY KEY,
+    path       TEXT NOT NULL UNIQUE,
+    offset     INTEGER NOT NULL DEFAULT 0,
+    checkpoint TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id           INTEGER PRIMARY KEY,
+    file         INTEGER NOT NULL,
+    offset       INTEGER NOT NULL,
+    length       INTEGER NOT NULL,
+    ts           TEXT,
+    sender       TEXT,
+    receiver     TEXT,
+    performative TEXT,
+    title        TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+CREATE INDEX IF NOT EXISTS entries_sender ON entries (sender, ts);
+CREATE INDEX IF NOT EXISTS entries_receiver ON entries (receiver, ts);
+CREATE INDEX IF NOT EXISTS entries_performative ON entries (performative, ts);
+CREATE INDEX IF NOT EXISTS entries_file ON entries (file, offset);
+"""
+
+
+def normalize_timestamp(text):
+    """'YYYY-mm-dd HH:MM[:SS[.mmm]]' -> 'YYYY-mm-dd HH:MM:SS.mmm', which sorts as text"""
+    date, _, clock = text.partition(" ")
+    parts = clock.split(":")
+    seconds, _, millis = (parts[2] if len(parts) > 2 else "00").partition(".")
+    return f"{date} {parts[0]}:{parts[1]}:{seconds}.{millis.ljust(3, '0')}"
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PARSING
+# ═══════════════════════════════════════════════════════════════════
+
+def parse_entries(f, offset):
+    """
+    Yield (offset, length, fields) for every complete entry from `offset` on.
+
+    An entry is a separator line, one or more title lines, a separator, the
+    field lines (Content/Body may run over several lines) and a closing
+    separator. Banners without a From field, like the file header, are
+    skipped; an entry still being written at the end of the file is left
+    for the next run.
+    """
+    f.seek(offset)
+    state = None          # None, "title" or "fields"
+    start = 0
+    fields = {}
+    position = offset
+    for line in iter(f.readline, b""):
+        line_start, position = position, position + len(line)
+        stripped = line.rstrip(b"\r\n")
+        if stripped == SEPARATOR:
+            if state == "title":
+                state = "fields"
+            elif state == "fields" and "sender" in fields:
+                yield start, position - start, fields
+                state = None
+            else:
+                # A new banner (also ends a header banner that had no fields)
+                state, start, fields = "title", line_start, {}
+        elif state == "title":
+            if "title" not in fields:
+                match = _TITLE.match(stripped)
+                if match:
+                    fields["ts"] = normalize_timestamp(match.group(1).decode())
+                    fields["title"] = match.group(2).decode("utf-8", "replace")
+                else:
+                    fields["title"] = stripped.decode("utf-8", "replace")
+        elif state == "fields":
+            match = _FIELD.match(stripped)
+            if match:
+                key, value = match.group(1), match.group(2).decode("utf-8", "replace").strip()
+                if key == b"Timestamp":
+                    fields["ts"] = normalize_timestamp(value)
+                elif key == b"From":
+                    fields["sender"] = value
+                elif key == b"To":
+                    fields["receiver"] = value
+                else:
+                    fields["performative"] = value.upper()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# INDEX
+# ═══════════════════════════════════════════════════════════════════
+
+class LogIndex:
+    """On-disk index of one or more FIPA-ACL log files"""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _checkpoint(f, offset):
+        """Hash of the bytes just before `offset`, to notice a rewritten log"""
+        f.seek(max(0, offset - CHECKPOINT_BYTES))
+        return hashlib.sha1(f.read(min(offset, CHECKPOINT_BYTES))).hexdigest()
+
+    def _file(self, path):
+        row = self.conn.execute(
+            "SELECT id, offset, checkpoint FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            cursor = self.conn.execute("INSERT INTO files (path) VALUES (?)", (path,))
+            return cursor.lastrowid, 0, ""
+        return row
+
+    def update(self, path):
+        """Index entries appended to `path` since the last update; returns how many"""
+        path = os.path.abspath(path)
+        file_id, offset, checkpoint = self._file(path)
+        added = 0
+        with open(path, "rb") as f:
+            if offset and (os.fstat(f.fileno()).st_size < offset
+                           or self._checkpoint(f, offset) != checkpoint):
+                # Truncated or rewritten since the last run: start over
+                self.conn.execute("DELETE FROM entries WHERE file = ?", (file_id,))
+                offset = 0
+
+            batch = []
+            for entry_offset, length, fields in parse_entries(f, offset):
+                batch.append((file_id, entry_offset, length, fields.get("ts"), fields.get("sender"),
+                              fields.get("receiver"), fields.get("performative"), fields.get("title")))
+                offset = entry_offset + length
+                if len(batch) >= COMMIT_EVERY:
+                    added += self._commit(f, file_id, batch, offset)
+                    batch = []
+            added += self._commit(f, file_id, batch, offset)
+        return added
+
+    def _commit(self, f, file_id, batch, offset):
+        # Entries and the file's new offset commit together, so an interrupted
+        # run resumes at the last committed entry
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO entries (file, offset, length, ts, sender, receiver, performative, title) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            self.conn.execute("UPDATE files SET offset = ?, checkpoint = ? WHERE id = ?",
+                              (offset, self._checkpoint(f, offset), file_id))
+        return len(batch)
+
+    def query(self, since=None, until=None, sender=None, receiver=None, performative=None,
+              path=None, limit=None, count=False):
+        """
+        Entries matching every given filter, oldest first, as dicts.
+
+        `since` is inclusive and `until` exclusive ('YYYY-mm-dd HH:MM[:SS[.mmm]]').
+        A sender or receiver without '@' matches any JID with that local part.
+        With count=True only the number of matches is returned.
+        """
+        where, params = [], []
+        if since is not None:
+            where.append("e.ts >= ?")
+            params.append(normalize_timestamp(since))
+        if until is not None:
+            where.append("e.ts < ?")
+            params.append(normalize_timestamp(until))
+        for column, value in (("sender", sender), ("receiver", receiver)):
+            if value is None:
+                continue
+            if "@" in value:
+                where.append(f"e.{column} = ?")
+                params.append(value)
+            else:
+                # Prefix range on the JID, so the column's index still applies
+                where.append(f"e.{column} >= ? AND e.{column} < ?")
+                params += [value + "@", value + "A"]   # 'A' sorts right after '@'
+        if performative is not None:
+            where.append("e.performative = ?")
+            params.append(performative.upper())
+        if path is not None:
+            where.append("f.path = ?")
+            params.append(os.path.abspath(path))
+
+        sql = ("SELECT {} FROM entries e JOIN files f ON f.id = e.file"
+               + (" WHERE " + " AND ".join(where) if where else ""))
+        if count:
+            return self.conn.execute(sql.format("COUNT(*)"), params).fetchone()[0]
+        sql = sql.format("f.path, e.offset, e.length, e.ts, e.sender, e.receiver, "
+                         "e.performative, e.title") + " ORDER BY e.ts, e.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        columns = ("path", "offset", "length", "ts", "sender", "receiver", "performative", "title")
+        return [dict(zip(columns, row)) for row in self.conn.execute(sql, params)]
+
+    def stats(self):
+        return self.conn.execute(
+            "SELECT f.path, f.offset, COUNT(e.id) FROM files f "
+            "LEFT JOIN entries e ON e.file = f.id GROUP BY f.id ORDER BY f.path").fetchall()
+
+
+def read_entry(entry):
+    """The raw text of an indexed entry, read from its log"""
+    with open(entry["path"], "rb") as f:
+        f.seek(entry["offset"])
+        return f.read(entry["length"]).decode("utf-8", "replace")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════
+
+def time_arg(value):
+    if not _TIME_ARG.match(value):
+        raise argparse.ArgumentTypeError("expected 'YYYY-mm-dd HH:MM[:SS[.mmm]]'")
+    return value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Index and query the Lab 4 FIPA-ACL logs")
+    parser.add_argument("--db", default=DEFAULT_DB, help="index database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index = commands.add_parser("index", help="index new entries of the logs")
+    index.add_argument("logs", nargs="*", default=DEFAULT_LOGS)
+
+    query = commands.add_parser("query", help="update the index, then list matching entries")
+    query.add_argument("logs", nargs="*", default=DEFAULT_LOGS)
+    query.add_argument("--since", type=time_arg, help="inclusive start time")
+    query.add_argument("--until", type=time_arg, help="exclusive end time")
+    query.add_argument("--sender")
+    query.add_argument("--receiver")
+    query.add_argument("--performative")
+    query.add_argument("--limit", type=int)
+    query.add_argument("--count", action="store_true", help="print only the number of matches")
+    query.add_argument("--show", action="store_true", help="print each entry from its log")
+    query.add_argument("--no-update", action="store_true", help="query the index as it is")
+
+    commands.add_parser("stats", help="entries indexed per log")
+    return parser.parse_args(argv)
+
+
+def update_all(index, logs):
+    for log in logs:
+        if os.path.exists(log):
+            added = index.update(log)
+            if added:
+                print(f"Indexed {added} new entries from {os.path.basename(log)}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    index = LogIndex(args.db)
+    try:
+        if args.command == "index":
+            update_all(index, args.logs)
+        elif args.command == "stats":
+            for path, offset, entries in index.stats():
+                print(f"{path}: {entries} entries, {offset:,} bytes indexed")
+        else:
+            if not args.no_update:
+                update_all(index, args.logs)
+            filters = dict(since=args.since, until=args.until, sender=args.sender,
+                           receiver=args.receiver, performative=args.performative)
+            # Only search the logs that were named (all of them by default)
+            paths = [None] if args.logs == DEFAULT_LOGS else args.logs
+            if args.count:
+                print(sum(index.query(path=path, count=True, **filters) for path in paths))
+                return
+            for path in paths:
+                for entry in index.query(path=path, limit=args.limit, **filters):
+                    if args.show:
+                        print(read_entry(entry))
+                    else:
+                        print(f"{entry['ts'] or '-':<23}  {entry['performative'] or '-':<12} "
+                              f"{entry['sender']} -> {entry['receiver']}  "
+                              f"[{os.path.basename(entry['path'])}] {entry['title']}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
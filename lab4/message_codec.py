@@ -0,0 +1,248 @@
+"""
+Lab 4: Message Body Compression and Chunking
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+Bodies at or above COMPRESS_THRESHOLD bytes are zlib-compressed and base64
+encoded; bodies whose encoded form is larger than MAX_BODY bytes are split
+into chunks and reassembled by the receiver. Everything the receiver needs
+travels in message metadata:
+
+    encoding          "identity" or "zlib"
+    accept-encoding   encodings the sender can decode
+    chunk-id / chunk-index / chunk-count   (only on chunked bodies)
+
+A MessageCodec compresses only for peers that have advertised "zlib" in
+a message to it. Bodies to peers it has not heard from yet (a plain SPADE
+agent, or one outside this repository) are sent as identity; chunking
+still applies, since it is the only way to stay under MAX_BODY.
+"""
+
+import base64
+import os
+import time
+import uuid
+import zlib
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_runtime import Message
+from agent_metrics import REGISTRY
+
+COMPRESS_THRESHOLD = int(os.environ.get("AGENT_COMPRESS_THRESHOLD", "1024"))
+MAX_BODY = int(os.environ.get("AGENT_MAX_BODY", "65536"))
+COMPRESS_LEVEL = int(os.environ.get("AGENT_COMPRESS_LEVEL", "1"))
+
+IDENTITY = "identity"
+ZLIB = "zlib"
+
+BODY_BYTES = REGISTRY.counter(
+    "agent_message_body_bytes_total", "Message body bytes before encoding", ("agent", "direction"))
+WIRE_BYTES = REGISTRY.counter(
+    "agent_message_wire_bytes_total", "Message body bytes on the wire", ("agent", "direction"))
+CHUNKS_SENT = REGISTRY.counter(
+    "agent_message_chunks_sent_total", "Extra messages sent to carry chunked bodies", ("agent",))
+
+
+class CodecError(ValueError):
+    """Raised when an incoming body cannot be decoded"""
+
+
+# ═══════════════════════════════════════════════════════════════════
+# BODY ENCODING
+# ═══════════════════════════════════════════════════════════════════
+
+def encode_body(text, compress=True, threshold=COMPRESS_THRESHOLD, max_body=MAX_BODY,
+                level=COMPRESS_LEVEL):
+    """Return (list of body chunks, metadata) for a text body"""
+    wire = text
+    data = text.encode("utf-8")
+    metadata = {"encoding": IDENTITY}
+    if compress and len(data) >= threshold:
+        packed = base64.b64encode(zlib.compress(data, level))
+        if len(packed) < len(data):
+            wire, data = packed.decode("ascii"), packed
+            metadata["encoding"] = ZLIB
+    # max_body bounds the bytes on the wire, not characters
+    if len(data) <= max_body:
+        return [wire], metadata
+    chunks = _split_utf8(data, max_body)
+    metadata["chunk-id"] = uuid.uuid4().hex
+    metadata["chunk-count"] = str(len(chunks))
+    return chunks, metadata
+
+
+def _split_utf8(data, max_bytes):
+    """Split UTF-8 bytes into text chunks of at most max_bytes bytes each,
+    never inside a character"""
+    chunks = []
+    start = 0
+    while start < len(data):
+        end = min(start + max_bytes, len(data))
+        # Back off continuation bytes (10xxxxxx) to a character boundary
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        if end == start:
+            # max_bytes is smaller than this one character: send it whole
+            end += 1
+            while end < len(data) and data[end] & 0xC0 == 0x80:
+                end += 1
+        chunks.append(data[start:end].decode("utf-8"))
+        start = end
+    return chunks
+
+
+def decode_body(wire, encoding=IDENTITY):
+    """Decode a complete (reassembled) body"""
+    if encoding in (None, IDENTITY):
+        return wire
+    if encoding != ZLIB:
+        raise CodecError(f"Unsupported encoding {encoding!r}")
+    try:
+        return zlib.decompress(base64.b64decode(wire, validate=True)).decode("utf-8")
+    except (ValueError, zlib.error) as e:
+        raise CodecError(f"Corrupt {encoding} body: {e}") from None
+
+
+class Reassembler:
+    """Collects chunks per chunk-id and drops sets that never complete"""
+
+    def __init__(self, timeout=30.0, max_pending=256, clock=time.monotonic):
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.clock = clock
+        self._pending = {}
+        self.expired = 0
+
+    def add(self, chunk_id, index, count, chunk):
+        """Store one chunk; return the joined body once all have arrived"""
+        now = self.clock()
+        self._expire(now)
+        entry = self._pending.get(chunk_id)
+        if entry is None:
+            if len(self._pending) >= self.max_pending:
+                # Drop the oldest incomplete body to make room
+                del self._pending[next(iter(self._pending))]
+                self.expired += 1
+            entry = self._pending[chunk_id] = [now + self.timeout, count, {}]
+        if not 0 <= index < entry[1] or count != entry[1]:
+            raise CodecError(f"Chunk {index}/{count} does not fit body {chunk_id}")
+        entry[2][index] = chunk
+        if len(entry[2]) < entry[1]:
+            return None
+        del self._pending[chunk_id]
+        parts = entry[2]
+        return "".join(parts[i] for i in range(entry[1]))
+
+    def _expire(self, now):
+        # Entries are created in arrival order, so expired ones are at the front
+        while self._pending:
+            chunk_id, entry = next(iter(self._pending.items()))
+            if entry[0] > now:
+                break
+            del self._pending[chunk_id]
+            self.expired += 1
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SPADE MESSAGE CODEC
+# ═══════════════════════════════════════════════════════════════════
+
+class MessageCodec:
+    """Encodes outgoing SPADE messages and decodes incoming ones for one agent"""
+
+    def __init__(self, agent_name, threshold=COMPRESS_THRESHOLD, max_body=MAX_BODY,
+                 level=COMPRESS_LEVEL, reassembly_timeout=30.0):
+        self.agent_name = agent_name
+        self.threshold = threshold
+        self.max_body = max_body
+        self.level = level
+        self.reassembler = Reassembler(reassembly_timeout)
+        self._peer_accepts = {}
+        self._body_out = BODY_BYTES.labels(agent_name, "out")
+        self._wire_out = WIRE_BYTES.labels(agent_name, "out")
+        self._body_in = BODY_BYTES.labels(agent_name, "in")
+        self._wire_in = WIRE_BYTES.labels(agent_name, "in")
+        self._chunks = CHUNKS_SENT.labels(agent_name)
+
+    def encode(self, msg):
+        """Messages to send in place of `msg` (one, or several chunks)"""
+        peer = str(msg.to).split("/")[0]
+        body = msg.body or ""
+        chunks, metadata = encode_body(body, self._peer_accepts.get(peer, False),
+                                       self.threshold, self.max_body, self.level)
+        body_bytes = len(body.encode("utf-8"))
+        self._body_out.inc(body_bytes)
+        # Compressed bodies are base64, so their length is their size in bytes
+        self._wire_out.inc(body_bytes if metadata["encoding"] == IDENTITY
+                           else sum(len(c) for c in chunks))
+        metadata["accept-encoding"] = ZLIB
+        if len(chunks) == 1:
+            for key, value in metadata.items():
+                msg.set_metadata(key, value)
+            msg.body = chunks[0]
+            return [msg]
+
+        self._chunks.inc(len(chunks) - 1)
+        messages = []
+        for index, chunk in enumerate(chunks):
+            part = Message(to=str(msg.to), sender=str(msg.sender), body=chunk,
+                           thread=msg.thread, metadata=dict(msg.metadata))
+            for key, value in metadata.items():
+                part.set_metadata(key, value)
+            part.set_metadata("chunk-index", str(index))
+            messages.append(part)
+        return messages
+
+    def decode(self, msg):
+        """Decoded body of `msg`, or None while a chunked body is incomplete"""
+        peer = str(msg.sender).split("/")[0]
+        self._peer_accepts[peer] = ZLIB in (msg.get_metadata("accept-encoding") or "").split(",")
+        wire = msg.body or ""
+        self._wire_in.inc(len(wire.encode("utf-8")))
+
+        chunk_id = msg.get_metadata("chunk-id")
+        if chunk_id:
+            try:
+                index = int(msg.get_metadata("chunk-index"))
+                count = int(msg.get_metadata("chunk-count"))
+            except (TypeError, ValueError):
+                raise CodecError("Chunked message without a valid chunk-index/chunk-count") from None
+            wire = self.reassembler.add(f"{peer}:{chunk_id}", index, count, wire)
+            if wire is None:
+                return None
+
+        body = decode_body(wire, msg.get_metadata("encoding"))
+        self._body_in.inc(len(body.encode("utf-8")))
+        return body
+
+    def unpack(self, msg):
+        """Decode `msg.body` in place; False if the message should be skipped
+        (an incomplete chunked body, or one that cannot be decoded)"""
+        try:
+            body = self.decode(msg)
+        except CodecError as e:
+            print(f"⚠️  Undecodable message from {msg.sender}: {e}")
+            return False
+        if body is None:
+            return False
+        msg.body = body
+        return True
+
+    async def send(self, behaviour, msg):
+        """Encode and send `msg` from a behaviour"""
+        for part in self.encode(msg):
+            await behaviour.send(part)
+
+
+async def send_message(behaviour, msg):
+    """Send through the agent's codec when it has one, otherwise as-is"""
+    codec = getattr(behaviour.agent, "codec", None)
+    if codec is not None:
+        await codec.send(behaviour, msg)
+    else:
+        await behaviour.send(msg)
@@ -4,20 +4,34 @@ Real communication between separate SensorAgent and RescueAgent
 """
 
 import asyncio
-import json
-from datetime import datetime
-from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
-from spade.message import Message
 
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
-from disaster_environment import DisasterEnvironment
+from agent_runtime import Agent, CyclicBehaviour, PeriodicBehaviour, Message
+from agent_metrics import (PERCEPTION_CYCLES, DISASTERS_DETECTED, RESCUE_EVENTS, RESCUE_RESPONSES,
+                           MESSAGES_SENT, MESSAGES_RECEIVED, HANDLER_LATENCY, track_mailbox,
+                           record_event_latency, start_metrics_server)
+from behaviour_profiler import maybe_profile
+from adaptive_sampling import AdaptiveSampler
+from event_analytics import StreamingEventAnalytics
+from event_time import now_ns, format_timestamp
+from disaster_models import DisasterEvent, ValidationError
+from dispatch_rules import shared_rules
+from road_network import shared_road_network, SECONDS_PER_MINUTE
+from rescue_fleet import RescueFleet
+from event_fusion import EventFusion, report_count
+from incident_store import IncidentStore
+from message_codec import MessageCodec
+from reliable_delivery import Outbox, Inbox, DeliveryBehaviour
+from bounded_mailbox import BoundedMailboxMixin, alert_metadata, handle_backpressure
+
+# Rescue incidents survive restarts in this local database
+INCIDENT_DB = "rescue_incidents.db"
 
 
 def log_message(direction, sender, receiver, performative, content):
     """Log message details to file and console"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    timestamp = format_timestamp(now_ns(), millis=True)
     
     log_entry = f"""
 {'='*60}
@@ -45,65 +59,92 @@ class SensorAgent(Agent):
             print(f"\n{'*'*60}")
             print(f"[SENSOR] {self.agent.jid} starting detection...")
             print(f"{'*'*60}\n")
-            self.environment = DisasterEnvironment()
+            self.environment = self.agent.environment
+            self.sampler = AdaptiveSampler(self.period.total_seconds())
             self.detection_count = 0
             
         async def run(self):
+            await handle_backpressure(self, self.sampler)
             self.detection_count += 1
+            PERCEPTION_CYCLES.labels(str(self.agent.jid)).inc()
             print(f"\n[SENSOR] Detection Cycle {self.detection_count}")
             
             conditions = self.environment.get_environmental_conditions()
-            print(f"[SENSOR] Monitoring: Temp={conditions['temperature']}°C, "
-                  f"Wind={conditions['wind_speed']}km/h")
+            print(f"[SENSOR] Monitoring: Temp={conditions.temperature}°C, "
+                  f"Wind={conditions.wind_speed}km/h")
             
             import random
-            if random.random() < 0.6:  # 60% chance
+            event = None
+            if random.random() < self.sampler.detection_chance(0.6):  # 60% per base period
                 event = self.environment.generate_disaster_event()
-                print(f"[SENSOR] 🚨 DISASTER: {event['type']} at {event['location']} - {event['severity']}")
+                event = event.detected(now_ns())
+                print(f"[SENSOR] 🚨 DISASTER: {event.type} at {event.location} - {event.severity}")
+                DISASTERS_DETECTED.labels(str(self.agent.jid), event.type, event.severity).inc()
                 await self.send_disaster_inform(event)
             else:
                 print("[SENSOR] ✓ All clear")
+            self.sampler.adjust(self, [conditions], event)
                 
         async def send_disaster_inform(self, event):
             msg = Message(
                 to=self.agent.rescue_jid,
                 sender=str(self.agent.jid),
-                body=json.dumps(event),
-                metadata={"performative": "inform", "ontology": "disaster-response"}
+                body=event.to_json(),
+                metadata={"performative": "inform", "ontology": "disaster-response",
+                          **alert_metadata(event)}
             )
             msg.set_metadata("performative", "inform")
-            await self.send(msg)
+            await self.agent.outbox.send(self, msg)
+            MESSAGES_SENT.labels(str(self.agent.jid), "inform").inc()
             
             log_message(
                 direction=">>> SENSOR SENDS INFORM >>>",
                 sender=str(self.agent.jid),
                 receiver=self.agent.rescue_jid,
                 performative="INFORM",
-                content=f"{event['type']} | {event['location']} | {event['severity']} | "
-                        f"{event['casualties']} casualties | Needs: {event['resources_needed']}"
+                content=f"{event.type} | {event.location} | {event.severity} | "
+                        f"{event.casualties} casualties | Needs: {event.resources_needed}"
             )
             
     async def setup(self):
         self.rescue_jid = "kwasirescueagent1@xmpp.jp"
+        self.codec = MessageCodec(str(self.jid))
+        self.outbox = Outbox(str(self.jid))
         self.add_behaviour(self.DetectionBehaviour(period=6))
+        self.add_behaviour(DeliveryBehaviour(), DeliveryBehaviour.template())
 
 
 class RescueAgent(Agent):
     """Receives INFORM messages and triggers rescue operations"""
     
-    class MessageReceiverBehaviour(CyclicBehaviour):
+    class MessageReceiverBehaviour(BoundedMailboxMixin, CyclicBehaviour):
+        mailbox_name = "receiver"
         
         async def on_start(self):
             print(f"\n{'*'*60}")
             print(f"[RESCUE] {self.agent.jid} listening for alerts...")
             print(f"{'*'*60}\n")
-            self.agent.responses = 0
+            track_mailbox(self, "receiver")
+            
+            for incident_id, event, state in self.agent.store.open_incidents():
+                print(f"[RESCUE] Resuming incident #{incident_id} (last state: {state})")
+                await self.process_event(event, incident_id)
+            # Reports received before the restart that no incident accounts for yet
+            for report_id, event, source, reports in self.agent.store.pending_reports():
+                self.agent.fusion.add(event, source, reports, receipt=report_id)
             
         async def run(self):
-            msg = await self.receive(timeout=10)
+            timeout = self.agent.inbox.next_timeout(self.agent.fusion.next_timeout(10))
+            msg = await self.receive(timeout=timeout)
+            for incident in self.agent.fusion.release_due():
+                await self.handle_incident(incident)
+            if msg and not (self.agent.codec.unpack(msg) and self.agent.inbox.accept(msg)):
+                msg = None  # incomplete chunked body, undecodable or already delivered
             
             if msg:
                 performative = msg.get_metadata("performative")
+                agent_name = str(self.agent.jid)
+                MESSAGES_RECEIVED.labels(agent_name, performative or "unknown").inc()
                 
                 log_message(
                     direction="<<< RESCUE RECEIVES MESSAGE <<<",
@@ -114,31 +155,81 @@ class RescueAgent(Agent):
                 )
                 
                 if performative == "inform":
-                    await self.handle_inform(msg)
+                    with HANDLER_LATENCY.labels(agent_name, performative).time():
+                        await self.handle_inform(msg)
+
+            self.agent.store.settle_reports(self.agent.fusion.settled())
+            # Acknowledge only once every report handled so far is committed
+            await self.agent.inbox.send_acks(self, durable=self.agent.store.flushed)
                     
         async def handle_inform(self, msg):
             try:
-                event = json.loads(msg.body)
+                event = DisasterEvent.from_json(msg.body)
+            except ValidationError as e:
+                print(f"[RESCUE] ⚠️ Rejected message: {e}")
+                return
                 
-                print(f"\n{'─'*60}")
-                print(f"[RESCUE] Processing alert from {msg.sender}")
-                print(f"  Type: {event['type']} | Location: {event['location']}")
-                print(f"  Severity: {event['severity']} | Casualties: {event['casualties']}")
-                
-                if event['severity'] in ('Medium', 'High', 'Critical'):
-                    print(f"  🚁 DEPLOYING to {event['location']}")
-                    print(f"  📦 Resources: {event['resources_needed']}")
-                    self.agent.responses += 1
-                else:
-                    print(f"  ℹ️  Low severity - logged only")
-                    
-                print(f"{'─'*60}\n")
+            # Recorded until an incident accounts for it, so an acknowledged report survives a restart
+            receipt = self.agent.store.add_report(event, str(msg.sender), report_count(msg))
+            incident = self.agent.fusion.add(event, str(msg.sender), report_count(msg), receipt=receipt)
+            if incident is not None:
+                await self.handle_incident(incident, msg.sender)
+
+        async def handle_incident(self, incident, sender=None):
+            """Open and process an incident released by event fusion"""
+            event = incident.event
+            RESCUE_EVENTS.labels(str(self.agent.jid)).inc()
+            latency_ms = record_event_latency(self.agent, event)
+            self.agent.analytics.record(event)
+            incident_id = self.agent.store.open_incident(event, "RECEIVED")
+            self.agent.store.settle_reports(incident.receipts)
+            print(f"\n[RESCUE] Fused {incident.reports} reports from {len(incident.sources)} sources "
+                  f"(confidence {incident.confidence:.2f}, released on {incident.reason})")
+            await self.process_event(event, incident_id, sender or incident.sources[0], latency_ms)
+            
+        async def process_event(self, event, incident_id, sender=None, latency_ms=None):
+            print(f"\n{'─'*60}")
+            print(f"[RESCUE] Processing alert from {sender or 'incident store'}")
+            print(f"  Type: {event.type} | Location: {event.location}")
+            print(f"  Severity: {event.severity} | Casualties: {event.casualties}")
+            if latency_ms is not None:
+                print(f"  Latency: {latency_ms:.1f} ms from detection")
+            
+            conditions = self.agent.environment.get_environmental_conditions(event.location)
+            decision = self.agent.rules.decide(event, conditions)
+            if decision.dispatch:
+                self.agent.store.update_state(incident_id, "DISPATCHING")
+                assignment = self.agent.fleet.assign(event)
+                if assignment is None:
+                    print(f"  ⚠️  No {event.resources_needed} team can reach {event.location} - not dispatched")
+                    self.agent.store.close_incident(incident_id, "UNASSIGNED")
+                    print(f"{'─'*60}\n")
+                    return
+                print(f"  🚁 DEPLOYING to {event.location} (rule: {decision.rule})")
+                print(f"  📦 Resources: {event.resources_needed}")
+                print(f"  🚒 Team: {assignment.team_id} from {assignment.origin}, "
+                      f"ETA {(assignment.arrive_at - self.agent.fleet.clock()) / SECONDS_PER_MINUTE:.0f} min "
+                      f"via {' -> '.join(assignment.path)}")
+                self.agent.responses += 1
+                self.agent.store.set_counter("responses", self.agent.responses)
+                RESCUE_RESPONSES.labels(str(self.agent.jid)).inc()
+                self.agent.store.close_incident(incident_id, "DISPATCHED")
+            else:
+                print(f"  ℹ️  No dispatch required (rule: {decision.rule}) - logged only")
+                self.agent.store.close_incident(incident_id, "LOGGED")
                 
-            except json.JSONDecodeError:
-                print(f"[RESCUE] ⚠️ Failed to parse message")
+            print(f"{'─'*60}\n")
                 
     async def setup(self):
-        self.responses = 0
+        self.codec = MessageCodec(str(self.jid))
+        self.rules = shared_rules()
+        self.roads = shared_road_network(self.environment.conditions)
+        self.fleet = RescueFleet.default(self.roads)
+        self.analytics = StreamingEventAnalytics()
+        self.fusion = EventFusion(str(self.jid))
+        self.inbox = Inbox(str(self.jid))
+        self.store = IncidentStore(INCIDENT_DB, str(self.jid))
+        self.responses = self.store.counters().get("responses", 0)
         self.add_behaviour(self.MessageReceiverBehaviour())
 
 
@@ -163,9 +254,12 @@ async def main():
     rescue_agent = RescueAgent(rescue_jid, rescue_password)
     sensor_agent = SensorAgent(sensor_jid, sensor_password)
     
+    await start_metrics_server()
     await rescue_agent.start(auto_register=True)
     await asyncio.sleep(2)
     await sensor_agent.start(auto_register=True)
+    maybe_profile(rescue_agent)
+    maybe_profile(sensor_agent)
     
     print("✓ Both agents running. Waiting for messages...\n")
     
@@ -181,9 +275,11 @@ async def main():
     print(f"Rescue operations: {rescue_agent.responses}")
     print(f"Log file: multi_agent_log.txt")
     print(f"{'='*60}\n")
+    rescue_agent.analytics.print_summary()
     
     await sensor_agent.stop()
     await rescue_agent.stop()
+    rescue_agent.store.close()
     print("✓ Agents stopped.")
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+"""
+Lab 4: Publish/Subscribe Alert Distribution
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+The SensorAgent publishes INFORM alerts to an AlertBrokerAgent instead of
+the RescueAgent. The RescueAgent subscribes to every alert; a
+LogisticsAgent subscribes only to High and Critical alerts with a small
+drop-oldest queue. Neither the sensor nor the rescue code changes when a
+consumer is added.
+"""
+
+import asyncio
+
+from multi_agent_communication import SensorAgent, RescueAgent
+from alert_bus import AlertBrokerAgent, SubscribeBehaviour, DROP
+from message_codec import MessageCodec
+from reliable_delivery import Inbox
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_runtime import Agent, CyclicBehaviour
+from agent_metrics import MESSAGES_RECEIVED, start_metrics_server
+from behaviour_profiler import maybe_profile
+from disaster_models import DisasterEvent, ValidationError
+
+BROKER_JID = "kwasialertbroker1@xmpp.jp"
+
+
+class PublishingSensorAgent(SensorAgent):
+    """SensorAgent whose INFORM alerts go to the broker"""
+
+    async def setup(self):
+        await super().setup()
+        self.rescue_jid = BROKER_JID
+
+
+class LogisticsAgent(Agent):
+    """Consumer that only tracks supplies for serious alerts"""
+
+    class SupplyBehaviour(CyclicBehaviour):
+        async def run(self):
+            msg = await self.receive(timeout=self.agent.inbox.next_timeout(10))
+            if msg and self.agent.codec.unpack(msg) and self.agent.inbox.accept(msg):
+                self.stage(msg)
+            await self.agent.inbox.send_acks(self)
+
+        def stage(self, msg):
+            MESSAGES_RECEIVED.labels(str(self.agent.jid), "inform").inc()
+            try:
+                event = DisasterEvent.from_json(msg.body)
+            except ValidationError as e:
+                print(f"[LOGISTICS] ⚠️  Rejected alert: {e}")
+                return
+            self.agent.requests[event.resources_needed] = self.agent.requests.get(event.resources_needed, 0) + 1
+            print(f"[LOGISTICS] 📦 {msg.get_metadata('topic')} -> stage {event.resources_needed}")
+
+    async def setup(self):
+        self.requests = {}
+        self.codec = MessageCodec(str(self.jid))
+        self.inbox = Inbox(str(self.jid))
+        self.add_behaviour(self.SupplyBehaviour())
+
+
+async def main():
+    broker = AlertBrokerAgent(BROKER_JID, "broker123")
+    rescue_agent = RescueAgent("kwasirescueagent1@xmpp.jp", "rescue123")
+    logistics = LogisticsAgent("kwasilogisticsagent1@xmpp.jp", "logistics123")
+    sensor_agent = PublishingSensorAgent("kwasisensoragent1@xmpp.jp", "sensor123")
+
+    print("\n" + "="*60)
+    print("LAB 4: PUBLISH/SUBSCRIBE ALERT DISTRIBUTION")
+    print("="*60 + "\n")
+
+    await start_metrics_server()
+    await broker.start(auto_register=True)
+    await rescue_agent.start(auto_register=True)
+    await logistics.start(auto_register=True)
+    rescue_agent.add_behaviour(SubscribeBehaviour(BROKER_JID))
+    logistics.add_behaviour(SubscribeBehaviour(BROKER_JID, severities=["High", "Critical"],
+                                               maxsize=10, policy=DROP))
+    await asyncio.sleep(2)
+    await sensor_agent.start(auto_register=True)
+    for agent in (broker, rescue_agent, logistics, sensor_agent):
+        maybe_profile(agent)
+
+    print("✓ Broker, subscribers and sensor running...\n")
+    try:
+        await asyncio.sleep(30)
+    except KeyboardInterrupt:
+        print("\n\nStopping...")
+
+    print(f"\n{'='*60}")
+    print(f"ALERT BUS SUMMARY")
+    print(f"{'='*60}")
+    print(f"Alerts published : {broker.bus.published}")
+    for subscription in broker.bus.subscriptions:
+        print(f"  {subscription.name:<32} delivered={subscription.delivered} "
+              f"dropped={subscription.dropped} refused={subscription.refused} ({subscription.policy})")
+    print(f"Rescue operations: {rescue_agent.responses}")
+    print(f"Logistics staged : {logistics.requests}")
+    print(f"{'='*60}\n")
+
+    await sensor_agent.stop()
+    await logistics.stop()
+    await rescue_agent.stop()
+    await broker.stop()
+    rescue_agent.store.close()
+    print("✓ Agents stopped.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,524 @@
+"""
+Lab 4: Acknowledged Delivery
+DCIT 403 – Designing Intelligent Agent
+Disaster Response & Relief Coordination System
+
+INFORMs are fire-and-forget: an alert sent while the rescue agent is
+restarting, or lost on the way, is gone. An Outbox on the sender and an
+Inbox on the receiver give at-least-once delivery on top of the FIPA
+messages, without a reply per message:
+
+  - each conversation (receiver and thread) gets a random id and numbers
+    its messages 0, 1, 2, ... in metadata:
+        rd-conversation   conversation id
+        rd-seq            sequence number of this message
+        rd-base           lowest sequence number the sender still waits on
+  - the receiver drops messages it has already seen and acknowledges many
+    messages with one CONFIRM in the "reliable-delivery" protocol:
+        rd-ack            every message below this number has arrived
+        rd-sack           ranges above it that have arrived too, "5-7,9"
+    It acknowledges after ACK_EVERY messages or ACK_DELAY seconds, and at
+    once when a message opens or fills a gap, or arrives a second time.
+  - the sender keeps at most WINDOW unacknowledged messages per
+    conversation and queues the rest. It retransmits only what no ack
+    covers: when a message's timeout expires (smoothed round trip plus four
+    deviations, doubled on each retry), or at once when a selective ack
+    shows that a message sent well after it has arrived (so it was lost,
+    not merely overtaken). A message still unacknowledged after
+    MAX_RETRIES retransmissions is given up.
+
+A receiver with no state for a conversation (because it just restarted)
+starts at rd-base, so alerts sent while it was down arrive with the
+retransmissions. Messages it handled before restarting may be handled
+again: delivery is at-least-once. Messages without rd-* metadata pass
+through the Inbox untouched.
+
+    # sender
+    self.outbox = Outbox(str(self.jid))
+    self.add_behaviour(DeliveryBehaviour(), DeliveryBehaviour.template())
+    await self.agent.outbox.send(behaviour, msg)
+
+    # receiver
+    self.inbox = Inbox(str(self.jid))
+    msg = await self.receive(timeout=self.agent.inbox.next_timeout(10))
+    accepted = msg and self.agent.codec.unpack(msg) and self.agent.inbox.accept(msg)
+    ...handle the message...
+    await self.agent.inbox.send_acks(self, durable=self.agent.store.flushed)
+
+    # an agent whose receiver has no template gets the acknowledgements
+    # too, so it runs its outbox there instead of in a DeliveryBehaviour
+    msg = await self.receive(timeout=inbox.next_timeout(outbox.next_timeout(10)))
+    if msg and codec.unpack(msg) and not outbox.on_ack(msg) and inbox.accept(msg):
+        ...handle the message...
+    await outbox.pump(self)
+    await inbox.send_acks(self)
+
+Acknowledge only after handling: an acknowledged message is never sent
+again, so whatever it started must already be on disk when the CONFIRM
+goes out. flushed() only covers writes already queued: work held in memory
+(such as a report waiting in event fusion) must be written to the store too.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+import uuid
+from collections import deque
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lab2'))
+from agent_runtime import CyclicBehaviour, Message, Template
+from agent_metrics import REGISTRY
+from message_codec import send_message
+
+WINDOW = int(os.environ.get("AGENT_RELIABLE_WINDOW", "64"))
+BACKLOG = int(os.environ.get("AGENT_RELIABLE_BACKLOG", "1024"))
+INITIAL_TIMEOUT = float(os.environ.get("AGENT_RELIABLE_TIMEOUT", "1.0"))
+MAX_TIMEOUT = 60.0
+MAX_RETRIES = int(os.environ.get("AGENT_RELIABLE_RETRIES", "8"))
+ACK_EVERY = int(os.environ.get("AGENT_RELIABLE_ACK_EVERY", "32"))
+ACK_DELAY = float(os.environ.get("AGENT_RELIABLE_ACK_DELAY", "0.2"))
+MAX_SACK_RANGES = 16
+MAX_CONVERSATIONS = 1024
+
+RELIABLE_PROTOCOL = "reliable-delivery"
+
+# asyncio runs timers up to a clock tick early; deadlines this close count as due
+CLOCK_SLACK = 1e-6
+
+RELIABLE_SENT = REGISTRY.counter(
+    "reliable_messages_sent_total", "Messages sent with acknowledged delivery", ("agent", "attempt"))
+RELIABLE_ACKS = REGISTRY.counter(
+    "reliable_acks_total", "Acknowledgements sent and received", ("agent", "direction"))
+RELIABLE_DUPLICATES = REGISTRY.counter(
+    "reliable_duplicates_total", "Duplicate messages dropped by receivers", ("agent",))
+RELIABLE_GIVEN_UP = REGISTRY.counter(
+    "reliable_given_up_total", "Messages given up without an acknowledgement", ("agent", "reason"))
+
+
+def format_ranges(seqs, limit=MAX_SACK_RANGES):
+    """"5-7,9" for sorted sequence numbers 5, 6, 7, 9 (lowest `limit` ranges)"""
+    ranges = []
+    for seq in seqs:
+        if ranges and ranges[-1][1] == seq - 1:
+            ranges[-1][1] = seq
+        elif len(ranges) == limit:
+            break
+        else:
+            ranges.append([seq, seq])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def parse_ranges(text):
+    """Inverse of format_ranges: a list of (first, last) pairs"""
+    ranges = []
+    for part in (text or "").split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        ranges.append((int(first), int(last or first)))
+    return ranges
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SENDER
+# ═══════════════════════════════════════════════════════════════════
+
+class _Pending:
+    """A sent message waiting for its acknowledgement"""
+
+    __slots__ = ("seq", "msg", "sent_at", "due", "retries")
+
+    def __init__(self, seq, msg, now, due):
+        self.seq = seq
+        self.msg = msg
+        self.sent_at = now
+        self.due = due
+        self.retries = 0
+
+
+class _Conversation:
+    """Sender side of one conversation"""
+
+    __slots__ = ("id", "next_seq", "unacked", "backlog", "srtt", "rttvar", "arrived_sent_at",
+                 "waiters")
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.next_seq = 0
+        # seq -> _Pending, in sequence order
+        self.unacked = {}
+        self.backlog = deque()
+        self.srtt = None
+        self.rttvar = None
+        # Send time of the newest message known to have arrived
+        self.arrived_sent_at = float("-inf")
+        # Futures of wait_for_window() callers
+        self.waiters = []
+
+    def base(self):
+        return next(iter(self.unacked), self.next_seq)
+
+    def timeout(self, initial):
+        if self.srtt is None:
+            return initial
+        return min(MAX_TIMEOUT, max(initial, self.srtt + 4 * self.rttvar))
+
+    def sample(self, rtt):
+        # Jacobson/Karels smoothing, as TCP does
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar += (abs(self.srtt - rtt) - self.rttvar) / 4
+            self.srtt += (rtt - self.srtt) / 8
+
+
+class Outbox:
+    """Numbers, windows and retransmits one agent's outgoing messages"""
+
+    def __init__(self, agent_name, window=WINDOW, backlog=BACKLOG, timeout=INITIAL_TIMEOUT,
+                 max_retries=MAX_RETRIES, max_conversations=MAX_CONVERSATIONS, clock=time.monotonic):
+        self.agent_name = agent_name
+        self.window = window
+        self.backlog = backlog
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_conversations = max_conversations
+        self.clock = clock
+        # (peer, thread) -> _Conversation, least recently used first, and
+        # conversation id -> _Conversation
+        self._conversations = {}
+        self._by_id = {}
+        # (due, tiebreak, conversation id, seq); entries whose message was
+        # acked or rescheduled are skipped when they reach the top. Equal
+        # deadlines fire in the order they were set, never by random id
+        self._timers = []
+        self._order = itertools.count()
+        self._first = RELIABLE_SENT.labels(agent_name, "first")
+        self._retransmit = RELIABLE_SENT.labels(agent_name, "retransmit")
+        self._acks = RELIABLE_ACKS.labels(agent_name, "in")
+        self._retries_exhausted = RELIABLE_GIVEN_UP.labels(agent_name, "retries")
+        self._backlog_full = RELIABLE_GIVEN_UP.labels(agent_name, "backlog")
+
+    def _conversation(self, msg):
+        key = (str(msg.to), msg.thread)
+        conversation = self._conversations.pop(key, None)
+        if conversation is None:
+            if len(self._conversations) >= self.max_conversations:
+                self._forget_idle()
+            conversation = _Conversation()
+            self._by_id[conversation.id] = conversation
+        self._conversations[key] = conversation
+        return conversation
+
+    def _forget_idle(self):
+        # Drop the least recently used conversation with nothing in flight;
+        # its next message simply opens a new one
+        for key, conversation in self._conversations.items():
+            if not conversation.unacked and not conversation.backlog:
+                break
+        else:
+            return
+        del self._conversations[key]
+        del self._by_id[conversation.id]
+
+    async def send(self, behaviour, msg):
+        """Send `msg` now if its conversation's window has room, else queue it"""
+        conversation = self._conversation(msg)
+        if len(conversation.unacked) < self.window and not conversation.backlog:
+            await self._transmit(behaviour, conversation, msg)
+            return
+        if len(conversation.backlog) >= self.backlog:
+            conversation.backlog.popleft()
+            self._backlog_full.inc()
+        conversation.backlog.append(msg)
+
+    async def wait_for_window(self, to, thread=None):
+        """Wait until a message to `to` would be sent at once rather than queued"""
+        conversation = self._conversations.get((str(to), thread))
+        while conversation is not None and (len(conversation.unacked) >= self.window
+                                            or conversation.backlog):
+            waiter = asyncio.get_running_loop().create_future()
+            conversation.waiters.append(waiter)
+            await waiter
+
+    async def _transmit(self, behaviour, conversation, msg):
+        now = self.clock()
+        seq = conversation.next_seq
+        conversation.next_seq += 1
+        pending = _Pending(seq, msg, now, now + conversation.timeout(self.timeout))
+        conversation.unacked[seq] = pending
+        heapq.heappush(self._timers, (pending.due, next(self._order), conversation.id, seq))
+        self._first.inc()
+        await self._send_copy(behaviour, conversation, pending)
+
+    async def _send_copy(self, behaviour, conversation, pending):
+        # The codec rewrites body and metadata, so the original is kept for retries
+        msg = pending.msg
+        wire = Message(to=str(msg.to), sender=str(msg.sender), body=msg.body,
+                       thread=msg.thread, metadata=dict(msg.metadata))
+        wire.set_metadata("rd-conversation", conversation.id)
+        wire.set_metadata("rd-seq", str(pending.seq))
+        wire.set_metadata("rd-base", str(conversation.base()))
+        await send_message(behaviour, wire)
+
+    def on_ack(self, msg, now=None):
+        """Apply an acknowledgement; False if `msg` is not one for this outbox"""
+        if msg.get_metadata("protocol") != RELIABLE_PROTOCOL:
+            return False
+        conversation = self._by_id.get(msg.get_metadata("rd-conversation"))
+        if conversation is None:
+            return False
+        try:
+            ack = int(msg.get_metadata("rd-ack"))
+            sacks = parse_ranges(msg.get_metadata("rd-sack"))
+        except (TypeError, ValueError):
+            return False
+        now = self.clock() if now is None else now
+        self._acks.inc()
+
+        unacked = conversation.unacked
+        acked = [seq for seq in unacked if seq < ack]
+        for first, last in sacks:
+            acked.extend(seq for seq in range(first, last + 1) if seq in unacked)
+        newest = None
+        for seq in acked:
+            pending = unacked.pop(seq, None)
+            if pending is None:
+                continue
+            conversation.arrived_sent_at = max(conversation.arrived_sent_at, pending.sent_at)
+            # Karn's rule: only messages sent once give a round-trip sample
+            if pending.retries == 0 and (newest is None or pending.seq > newest.seq):
+                newest = pending
+        if newest is not None:
+            conversation.sample(now - newest.sent_at)
+
+        # A message is lost, not just overtaken, once one sent more than a
+        # quarter round trip after it has arrived: retransmit it now
+        if sacks and conversation.srtt is not None:
+            lost_before = conversation.arrived_sent_at - conversation.srtt / 4
+            for seq, pending in unacked.items():
+                if pending.sent_at < lost_before and pending.due > now:
+                    pending.due = now
+                    heapq.heappush(self._timers, (now, next(self._order), conversation.id, seq))
+        return True
+
+    async def pump(self, behaviour, now=None):
+        """Retransmit messages whose timeout expired and refill open windows"""
+        now = self.clock() if now is None else now
+        timers = self._timers
+        while timers and timers[0][0] <= now + CLOCK_SLACK:
+            due, _, conversation_id, seq = heapq.heappop(timers)
+            conversation = self._by_id.get(conversation_id)
+            pending = conversation.unacked.get(seq) if conversation is not None else None
+            if pending is None or pending.due != due:
+                continue
+            if pending.retries >= self.max_retries:
+                del conversation.unacked[seq]
+                self._retries_exhausted.inc()
+                continue
+            pending.retries += 1
+            pending.sent_at = now
+            pending.due = now + min(MAX_TIMEOUT, conversation.timeout(self.timeout) * 2 ** pending.retries)
+            heapq.heappush(timers, (pending.due, next(self._order), conversation_id, seq))
+            self._retransmit.inc()
+            await self._send_copy(behaviour, conversation, pending)
+
+        for conversation in list(self._conversations.values()):
+            while conversation.backlog and len(conversation.unacked) < self.window:
+                await self._transmit(behaviour, conversation, conversation.backlog.popleft())
+            if conversation.waiters and len(conversation.unacked) < self.window:
+                for waiter in conversation.waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+                conversation.waiters.clear()
+
+    def next_timeout(self, limit, now=None):
+        """Seconds until the next retransmission, at most `limit`"""
+        timers = self._timers
+        while timers:
+            due, _, conversation_id, seq = timers[0]
+            conversation = self._by_id.get(conversation_id)
+            pending = conversation.unacked.get(seq) if conversation is not None else None
+            if pending is not None and pending.due == due:
+                break
+            heapq.heappop(timers)
+        if not timers:
+            return limit
+        now = self.clock() if now is None else now
+        return max(0.0, min(limit, timers[0][0] - now))
+
+    def pending(self):
+        """Messages sent but not acknowledged, and messages still queued"""
+        return (sum(len(c.unacked) for c in self._conversations.values()),
+                sum(len(c.backlog) for c in self._conversations.values()))
+
+
+class DeliveryBehaviour(CyclicBehaviour):
+    """Reads acknowledgements for the agent's outbox and runs its retransmissions"""
+
+    @staticmethod
+    def template():
+        return Template(metadata={"protocol": RELIABLE_PROTOCOL})
+
+    async def run(self):
+        outbox = self.agent.outbox
+        msg = await self.receive(timeout=outbox.next_timeout(10))
+        codec = getattr(self.agent, "codec", None)
+        if msg and (codec is None or codec.unpack(msg)):
+            outbox.on_ack(msg)
+        await outbox.pump(self)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# RECEIVER
+# ═══════════════════════════════════════════════════════════════════
+
+class _Stream:
+    """Receiver side of one conversation"""
+
+    __slots__ = ("sender", "thread", "expected", "ahead", "unacked", "ack_at")
+
+    def __init__(self, sender, thread, expected):
+        self.sender = sender
+        self.thread = thread
+        # Every message below `expected` has arrived; `ahead` holds later ones
+        self.expected = expected
+        self.ahead = set()
+        self.unacked = 0
+        self.ack_at = None
+
+    def advance(self):
+        while self.expected in self.ahead:
+            self.ahead.remove(self.expected)
+            self.expected += 1
+
+
+class Inbox:
+    """Drops duplicate messages and batches acknowledgements for one agent"""
+
+    def __init__(self, agent_name, ack_every=ACK_EVERY, ack_delay=ACK_DELAY,
+                 max_conversations=MAX_CONVERSATIONS, clock=time.monotonic):
+        self.agent_name = agent_name
+        self.ack_every = ack_every
+        self.ack_delay = ack_delay
+        self.max_conversations = max_conversations
+        self.clock = clock
+        # conversation id -> _Stream, least recently used first
+        self._streams = {}
+        # (due, tiebreak, conversation id), as in Outbox._timers
+        self._acks_due = []
+        self._order = itertools.count()
+        self._duplicates = RELIABLE_DUPLICATES.labels(agent_name)
+        self._acks = RELIABLE_ACKS.labels(agent_name, "out")
+
+    def accept(self, msg, now=None):
+        """True if `msg` should be handled, False if it was seen before or is an acknowledgement"""
+        if msg.get_metadata("protocol") == RELIABLE_PROTOCOL:
+            return False  # an acknowledgement, for the agent's Outbox
+        conversation = msg.get_metadata("rd-conversation")
+        if conversation is None:
+            return True
+        try:
+            seq = int(msg.get_metadata("rd-seq"))
+            base = int(msg.get_metadata("rd-base") or 0)
+        except (TypeError, ValueError):
+            return True
+        now = self.clock() if now is None else now
+
+        stream = self._streams.pop(conversation, None)
+        if stream is None:
+            if len(self._streams) >= self.max_conversations:
+                # Forget the least recently used conversation; at worst its
+                # next retransmission is handled a second time
+                del self._streams[next(iter(self._streams))]
+            stream = _Stream(str(msg.sender), msg.thread, base)
+        self._streams[conversation] = stream
+        if base > stream.expected:
+            # The sender gave up on the messages below base
+            stream.expected = base
+            stream.ahead = {s for s in stream.ahead if s >= base}
+            stream.advance()
+
+        if seq < stream.expected or seq in stream.ahead:
+            self._duplicates.inc()
+            self._schedule(conversation, stream, now)  # our ack was probably lost
+            return False
+        if seq == stream.expected:
+            urgent = bool(stream.ahead)  # fills a gap
+            stream.expected += 1
+            stream.advance()
+        else:
+            urgent = seq - 1 not in stream.ahead  # opens a gap
+            stream.ahead.add(seq)
+        stream.unacked += 1
+        if urgent or stream.unacked >= self.ack_every:
+            self._schedule(conversation, stream, now)
+        elif stream.ack_at is None:
+            self._schedule(conversation, stream, now + self.ack_delay)
+        return True
+
+    def _schedule(self, conversation, stream, at):
+        if stream.ack_at is None or at < stream.ack_at:
+            stream.ack_at = at
+            heapq.heappush(self._acks_due, (at, next(self._order), conversation))
+
+    def _prune(self):
+        due = self._acks_due
+        while due:
+            at, _, conversation = due[0]
+            stream = self._streams.get(conversation)
+            if stream is not None and stream.ack_at == at:
+                break
+            heapq.heappop(due)
+
+    def acks(self, now=None):
+        """CONFIRM messages for every conversation whose acknowledgement is due"""
+        now = self.clock() if now is None else now
+        replies = []
+        self._prune()
+        while self._acks_due and self._acks_due[0][0] <= now + CLOCK_SLACK:
+            _, _, conversation = heapq.heappop(self._acks_due)
+            stream = self._streams[conversation]
+            stream.ack_at = None
+            stream.unacked = 0
+            reply = Message(to=stream.sender, sender=self.agent_name, thread=stream.thread, metadata={
+                "performative": "confirm",
+                "protocol": RELIABLE_PROTOCOL,
+                "rd-conversation": conversation,
+                "rd-ack": str(stream.expected),
+            })
+            if stream.ahead:
+                reply.set_metadata("rd-sack", format_ranges(sorted(stream.ahead)))
+            replies.append(reply)
+            self._prune()
+        return replies
+
+    def acks_due(self, now=None):
+        """True if an acknowledgement is due"""
+        self._prune()
+        now = self.clock() if now is None else now
+        return bool(self._acks_due) and self._acks_due[0][0] <= now + CLOCK_SLACK
+
+    async def send_acks(self, behaviour, now=None, durable=None):
+        """Send the acknowledgements that are due from `behaviour`
+
+        `durable`, if given, is awaited first whenever one is due and must
+        return True once everything handled so far is safe; until then the
+        acknowledgements stay due.
+        """
+        if durable is not None and self.acks_due(now) and not await durable():
+            return
+        for reply in self.acks(now):
+            await send_message(behaviour, reply)
+            self._acks.inc()
+
+    def next_timeout(self, limit, now=None):
+        """Seconds until the next acknowledgement is due, at most `limit`"""
+        self._prune()
+        if not self._acks_due:
+            return limit
+        now = self.clock() if now is None else now
+        return max(0.0, min(limit, self._acks_due[0][0] - now))